@@ -0,0 +1,90 @@
+import mimetypes
+import os
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, Response
+
+from app.core.config import settings
+from app.services.file_storage import file_storage
+
+router = APIRouter(prefix="/resources", tags=["resources"])
+
+# 文件名可能被重新映射到新内容，浏览器每次使用前都要用ETag重新校验
+CACHE_CONTROL = "no-cache"
+
+
+def file_etag(file_path: str) -> Optional[str]:
+    """
+    文件存储中的文件以SHA-256命名，直接作为强ETag；旧版本平铺保存的文件返回None，
+    由FileResponse按修改时间和大小生成
+    """
+    if os.path.dirname(os.path.abspath(file_path)).startswith(os.path.abspath(file_storage.root) + os.sep):
+        return f'"{os.path.basename(file_path)}"'
+    return None
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match是否包含etag，按弱比较忽略W/前缀"""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
+
+
+def offload_path(file_path: str) -> Optional[str]:
+    """
+    交给前置代理发送时使用的路径
+    nginx模式下为内部location中的URI（DOWNLOAD_OFFLOAD_PREFIX对应上传目录），sendfile模式下为绝对路径；
+    文件不在上传目录中时返回None，仍由应用发送
+    """
+    file_path = os.path.abspath(file_path)
+    if settings.DOWNLOAD_OFFLOAD == "sendfile":
+        return file_path
+    if settings.DOWNLOAD_OFFLOAD == "nginx":
+        upload_dir = os.path.abspath(settings.UPLOAD_DIRECTORY)
+        if file_path.startswith(upload_dir + os.sep):
+            relative = os.path.relpath(file_path, upload_dir).replace(os.sep, "/")
+            return f"{settings.DOWNLOAD_OFFLOAD_PREFIX.rstrip('/')}/{relative}"
+    return None
+
+
+def stored_file_response(request: Request, file_path: str, media_type: str,
+                         filename: str = None) -> Response:
+    """
+    返回文件下载响应
+
+    支持Range分段请求和If-Range（由FileResponse处理），If-None-Match与ETag一致时返回304。
+    配置了DOWNLOAD_OFFLOAD时只返回X-Accel-Redirect或X-Sendfile响应头，由nginx等前置代理发送文件内容，
+    分段请求同样由代理处理，应用进程不再读写文件内容。
+    :param filename: 下载时的文件名，指定时以附件形式返回
+    """
+    headers = {"Cache-Control": CACHE_CONTROL}
+    content_etag = file_etag(file_path)
+    if content_etag:
+        headers["ETag"] = content_etag
+    response = FileResponse(file_path, media_type=media_type, filename=filename, headers=headers,
+                            stat_result=os.stat(file_path))
+    etag = response.headers["etag"]
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+    target = offload_path(file_path)
+    if target is None:
+        return response
+    headers = {key: value for key, value in response.headers.items()
+               if key in ("content-type", "content-disposition", "etag", "last-modified", "cache-control")}
+    headers["X-Accel-Redirect" if settings.DOWNLOAD_OFFLOAD == "nginx" else "X-Sendfile"] = target
+    return Response(headers=headers)
+
+
+@router.api_route("/{file_name}", methods=["GET", "HEAD"])
+async def get_resource(file_name: str, request: Request):
+    """按文件名访问上传文件和盖章结果，由文件存储解析到按内容保存的实际文件"""
+    file_path = await file_storage.resolve(file_name)
+    if file_path is None:
+        raise HTTPException(status_code=404, detail="文件未找到")
+    media_type = mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+    return stored_file_response(request, file_path, media_type)
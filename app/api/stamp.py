@@ -1,20 +1,33 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
 from stamp.stamp_processor import StampProcessor
 from stamp.stamp_config import StampConfig
 from stamp.stamp_type import StampType
+from stamp.seal_renderer import SealRenderer
+from stamp.image_encoder import ImageEncoding
 import os
-from datetime import datetime, timedelta
-import threading
+from datetime import datetime
+import shutil
+import tempfile
 from app.core.security import current_active_user
-from app.services.stamp_service import upload_stamp_images, delete_stamp_images, get_all_stamp_images
+from app.services.stamp_service import upload_stamp_images, delete_stamp_images, get_all_stamp_images, get_stamp_images_by_paths
 from app.core.security import current_active_user
 from typing import List
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import get_async_session  # 使用异步会话
 from app.core.config import settings  # 导入配置
 from app.models.response import ResponseModel  # Import the response model
-import httpx
+from app.core.executor import stamp_executor, ExecutorBusyError
+from app.services.download_service import DownloadError, url_file_name
+from app.services.smart_stamp_service import stamp_remote_files, stamp_remote_batch, plan_remote_file, result_cache_stats
+from app.services.remote_stamp_cache import remote_stamp_cache
+from app.api.resources import stored_file_response
+from app.services.file_storage import file_storage
+from app.services.upload_service import UploadError, discard_received, multipart_openapi, receive_multipart
+from app.services.temp_file_registry import temp_file_registry
+from app.services.stamp_job_service import create_stamp_job, get_stamp_job, start_stamp_job
+from app.models.stamp_job import StampJobStatus
 import logging
 
 router = APIRouter(prefix="/stamp", tags=["stamp"])
@@ -23,138 +36,283 @@ router = APIRouter(prefix="/stamp", tags=["stamp"])
 resources_dir = settings.UPLOAD_DIRECTORY  # 确保这个目录在项目中存在
 os.makedirs(resources_dir, exist_ok=True)
 
-# 清理过期临时文件的函数
-def clean_temp_files():
-    now = datetime.now()
-    for filename in os.listdir(resources_dir):
-        file_path = os.path.join(resources_dir, filename)
-        # 检查文件是否是临时文件
-        if filename.startswith("temp_"):
-            # 获取文件的创建时间
-            file_creation_time = datetime.fromtimestamp(os.path.getctime(file_path))
-            # 如果文件创建时间超过半小时，则删除
-            if now - file_creation_time > timedelta(minutes=30):
-                try:
-                    if os.path.isfile(file_path):
-                        os.remove(file_path)
-                        print(f"Deleted expired temporary file: {file_path}")
-                    else:
-                        print(f"Error: {file_path} is not a file.")
-                except Exception as e:
-                    print(f"Error deleting file {file_path}: {str(e)}")
-
-# 启动清理线程
-def start_cleaning_thread():
-    threading.Timer(60, start_cleaning_thread).start()  # 每60秒调用一次
-    clean_temp_files()
-
-# 启动清理线程
-start_cleaning_thread()
+# 印章图片允许的Content-Type及对应的文件类型
+IMAGE_CONTENT_TYPES = {"image/png": "png", "image/jpeg": "jpeg", "image/jpg": "jpeg"}
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 
+def pdf_file_response(file_path: str, file_name: str, work_dir: str) -> FileResponse:
+    """分块流式返回PDF文件，发送完成后删除工作目录，中文文件名由FileResponse按RFC 5987编码"""
+    return FileResponse(
+        file_path,
+        media_type="application/pdf",
+        filename=file_name,
+        headers={"Cache-Control": "no-store"},
+        background=BackgroundTask(shutil.rmtree, work_dir, ignore_errors=True)
+    )
+
+def build_stamp_config() -> StampConfig:
+    """接口使用的印章配置"""
+    return StampConfig(
+        stamp_size_mm=40,
+        margin_right_mm=60,
+        margin_bottom_mm=60,
+        seal_count=1,
+        seal_renderer=SealRenderer(settings.SEAL_RENDERER),
+        stamp_dpi=settings.STAMP_IMAGE_DPI,
+        image_encoding=ImageEncoding(settings.STAMP_IMAGE_ENCODING)
+    )
+
+def check_input_file(input_file: str) -> bool:
+    """检查输入文件格式"""
+    return url_file_name(input_file).lower().endswith(('.pdf', '.docx', '.doc'))
+
 @router.post("/smart-stamp", response_model=ResponseModel)
 async def smart_stamp(
     input_file: str,
     stamp_file: str,
     stamp_type: StampType = StampType.BOTH,
+    stream: bool = False,  # 为True时直接流式返回盖章后的PDF，不生成下载链接
     user=Depends(current_active_user)  # 确保用户已登录
 ):
     """处理印章"""
 
     # 1. 检查文件格式
-    if not (input_file.endswith('.pdf') or input_file.endswith('.docx') or input_file.endswith('.doc')):
+    if not check_input_file(input_file):
         return ResponseModel(code=2001, message="传入文件格式错误")
 
-    try:
-        # 下载输入文件
-        async with httpx.AsyncClient() as client:
-            input_file_response = await client.get(input_file)
-            if input_file_response.status_code != 200:
-                return ResponseModel(code=2002, message="无法下载输入文件")
-
-            stamp_file_response = await client.get(stamp_file)
-            if stamp_file_response.status_code != 200:
-                return ResponseModel(code=2002, message="无法下载印章文件")
+    # 2. 执行器已满时直接返回，避免无谓的下载
+    if stamp_executor.is_busy():
+        return ResponseModel(code=503, message="服务繁忙，请稍后重试")
 
-        # 创建唯一的临时文件路径
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # Get the file extension for input and stamp files
-        input_file_ext = os.path.splitext(input_file)[1]  # Get the extension of the input file
-        stamp_file_ext = os.path.splitext(stamp_file)[1]  # Get the extension of the stamp file
-
-        input_file_path = os.path.join(settings.UPLOAD_DIRECTORY, f"temp_input_file_{timestamp}{input_file_ext}")
-        stamp_file_path = os.path.join(settings.UPLOAD_DIRECTORY, f"temp_stamp_file_{timestamp}{stamp_file_ext}")
-        # 保存下载的文件内容到临时文件
-        with open(input_file_path, "wb") as f:
-            f.write(input_file_response.content)
-        with open(stamp_file_path, "wb") as f:
-            f.write(stamp_file_response.content)
-        # 创建印章处理器
-        config = StampConfig(
-            stamp_size_mm=40,
-            margin_right_mm=60,
-            margin_bottom_mm=60,
-            seal_count=1
-        )
-        processor = StampProcessor(config)
-
-        # 生成输出文件名
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_file = os.path.join(settings.UPLOAD_DIRECTORY, f"temp_{os.path.basename(input_file)}_stamped_{timestamp}.pdf")
+    # 下载文件和盖章结果都放在独立的工作目录中，处理完成后删除
+    work_dir = tempfile.mkdtemp(prefix="smart_stamp_")
+    try:
+        # 创建印章配置
+        config = build_stamp_config()
 
         # Log before processing
-        logging.info(f"Processing file: {input_file_path} with stamp file: {stamp_file_path}")
+        logging.info(f"Processing file: {input_file} with stamp file: {stamp_file}")
 
-        # 调用处理方法
-        processor.process(
-            input_file=input_file_path,
-            stamp_file=stamp_file_path,
-            output_file=output_file,
-            stamp_type=stamp_type
-        )
+        # 两个文件并发流式下载到磁盘，盖章和转换在执行器进程中完成，不阻塞事件循环
+        output_path = await stamp_remote_files(input_file, stamp_file, stamp_type, config, work_dir)
 
         # Log after processing
         logging.info("Processing completed successfully.")
 
-        # 清理临时文件
-        os.remove(input_file_path)
-        os.remove(stamp_file_path)
+        # 同步集成直接返回文件内容，省去再次下载，发送完成后清理工作目录
+        if stream:
+            file_name = f"{os.path.splitext(url_file_name(input_file))[0]}_stamped.pdf"
+            response = pdf_file_response(output_path, file_name, work_dir)
+            work_dir = None
+            return response
+
+        # 生成输出文件名
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_file = f"temp_{url_file_name(input_file)}_stamped_{timestamp}.pdf"
+        await file_storage.store(output_file, output_path, expires_at=temp_file_registry.register(output_file))
 
         # 返回结果
-        return ResponseModel(code=200, message="印章处理成功", data={"output_file_path": f"{settings.BASE_URL}/resources/{os.path.basename(output_file)}"})
+        return ResponseModel(code=200, message="印章处理成功", data={"output_file_path": f"{settings.BASE_URL}/resources/{output_file}"})
+
+    except DownloadError as e:
+        return ResponseModel(code=2002, message=str(e))
+
+    except ExecutorBusyError as e:
+        logging.warning(f"Stamp executor busy: {stamp_executor.stats()}")
+        return ResponseModel(code=503, message=str(e))
 
     except Exception as e:
         logging.error(f"Error processing file: {str(e)}")
         return ResponseModel(code=500, message=str(e))
 
+    finally:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+@router.post("/plan", response_model=ResponseModel)
+async def plan_stamp(
+    input_file: str,
+    stamp_type: StampType = StampType.BOTH,
+    user=Depends(current_active_user)  # 确保用户已登录
+):
+    """试运行：返回印章位置计划（JSON），不修改文档、不生成输出文件"""
+    if not check_input_file(input_file):
+        return ResponseModel(code=2001, message="传入文件格式错误")
+
+    if stamp_executor.is_busy():
+        return ResponseModel(code=503, message="服务繁忙，请稍后重试")
+
+    work_dir = tempfile.mkdtemp(prefix="stamp_plan_")
+    try:
+        plan = await plan_remote_file(input_file, stamp_type, build_stamp_config(), work_dir)
+        return ResponseModel(code=200, message="印章位置计算成功", data=plan.to_dict())
+
+    except DownloadError as e:
+        return ResponseModel(code=2002, message=str(e))
+
+    except ExecutorBusyError as e:
+        return ResponseModel(code=503, message=str(e))
+
+    except Exception as e:
+        logging.error(f"Error planning file: {str(e)}")
+        return ResponseModel(code=500, message=str(e))
+
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+@router.post("/batch-stamp", response_model=ResponseModel)
+async def batch_stamp(
+    input_files: List[str] = Query(...),
+    stamp_file: str = Query(...),
+    stamp_type: StampType = StampType.BOTH,
+    user=Depends(current_active_user)  # 确保用户已登录
+):
+    """批量处理印章，多个Word文档只启动一次LibreOffice，单个文件失败不影响其他文件"""
+    if not input_files or len(input_files) > settings.BATCH_STAMP_MAX_FILES:
+        return ResponseModel(code=2001, message=f"每次最多处理{settings.BATCH_STAMP_MAX_FILES}个文件")
+    if not all(check_input_file(input_file) for input_file in input_files):
+        return ResponseModel(code=2001, message="传入文件格式错误")
+    if stamp_executor.is_busy():
+        return ResponseModel(code=503, message="服务繁忙，请稍后重试")
+
+    work_dir = tempfile.mkdtemp(prefix="batch_stamp_")
+    try:
+        logging.info(f"Processing {len(input_files)} files with stamp file: {stamp_file}")
+        output_paths, batch_result = await stamp_remote_batch(input_files, stamp_file, stamp_type,
+                                                              build_stamp_config(), work_dir)
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        files = []
+        for index, (input_file, output_path, result) in enumerate(zip(input_files, output_paths, batch_result.results)):
+            item = {"input_file": input_file, "success": result.success, "error": result.error}
+            if result.success:
+                output_file = f"temp_{url_file_name(input_file)}_stamped_{timestamp}_{index + 1}.pdf"
+                await file_storage.store(output_file, output_path, expires_at=temp_file_registry.register(output_file))
+                item["output_file_path"] = f"{settings.BASE_URL}/resources/{output_file}"
+            files.append(item)
+
+        logging.info(f"Batch completed: {batch_result.succeeded} succeeded, {batch_result.failed} failed.")
+        return ResponseModel(code=200, message="印章处理完成", data={
+            "succeeded": batch_result.succeeded,
+            "failed": batch_result.failed,
+            "files": files,
+        })
+
+    except DownloadError as e:
+        return ResponseModel(code=2002, message=str(e))
+
+    except ExecutorBusyError as e:
+        logging.warning(f"Stamp executor busy: {stamp_executor.stats()}")
+        return ResponseModel(code=503, message=str(e))
+
+    except Exception as e:
+        logging.error(f"Error processing batch: {str(e)}")
+        return ResponseModel(code=500, message=str(e))
+
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+@router.post("/jobs", response_model=ResponseModel)
+async def submit_stamp_job(
+    input_file: str,
+    stamp_file: str,
+    stamp_type: StampType = StampType.BOTH,
+    user=Depends(current_active_user),  # 确保用户已登录
+    db: AsyncSession = Depends(get_async_session)
+):
+    """提交异步盖章任务，立即返回任务ID，适用于处理时间较长的大文档"""
+    if not check_input_file(input_file):
+        return ResponseModel(code=2001, message="传入文件格式错误")
+
+    job = await create_stamp_job(db, user.id, input_file, stamp_file, stamp_type)
+    start_stamp_job(job, build_stamp_config())
+    return ResponseModel(code=200, message="任务已提交", data={"job_id": job.id, "status": job.status})
+
+@router.get("/jobs/{job_id}", response_model=ResponseModel)
+async def get_stamp_job_status(job_id: str, user=Depends(current_active_user), db: AsyncSession = Depends(get_async_session)):
+    """查询异步盖章任务的状态和进度"""
+    job = await get_stamp_job(db, user.id, job_id)
+    if job is None:
+        return ResponseModel(code=404, message="任务不存在")
+
+    data = {
+        "job_id": job.id,
+        "status": job.status,
+        "progress": job.progress,
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+    if job.status == StampJobStatus.SUCCEEDED.value:
+        data["output_file_path"] = f"{settings.BASE_URL}/resources/{job.output_file}"
+    return ResponseModel(code=200, message="获取成功", data=data)
+
+@router.get("/jobs/{job_id}/result")
+async def get_stamp_job_result(job_id: str, request: Request, user=Depends(current_active_user), db: AsyncSession = Depends(get_async_session)):
+    """获取异步盖章任务的结果文件"""
+    job = await get_stamp_job(db, user.id, job_id)
+    if job is None:
+        return ResponseModel(code=404, message="任务不存在")
+    if job.status == StampJobStatus.FAILED.value:
+        return ResponseModel(code=500, message=job.error or "任务执行失败")
+    if job.status != StampJobStatus.SUCCEEDED.value:
+        return ResponseModel(code=202, message="任务尚未完成", data={"status": job.status, "progress": job.progress})
+
+    output_path = await file_storage.resolve(job.output_file)
+    if output_path is None:
+        return ResponseModel(code=410, message="结果文件已过期，请重新提交任务")
+    file_name = f"{os.path.splitext(os.path.basename(job.input_file))[0]}_stamped.pdf"
+    return stored_file_response(request, output_path, 'application/pdf', filename=file_name)
+
+@router.get("/executor-stats", response_model=ResponseModel)
+async def executor_stats(user=Depends(current_active_user)):  # 确保用户已登录
+    """获取盖章执行器的排队数和执行中任务数，印章缓存和盖章结果缓存的命中情况，以及待清理的临时文件数"""
+    data = stamp_executor.stats()
+    data["temp_files"] = temp_file_registry.stats()
+    data["stamp_cache"] = remote_stamp_cache.stats()
+    data["result_cache"] = dict(result_cache_stats)
+    return ResponseModel(code=200, message="获取成功", data=data)
+
 @router.get("/download/{file_name}")
-async def download_file(file_name: str, user=Depends(current_active_user)):  # 确保用户已登录
+async def download_file(file_name: str, request: Request, user=Depends(current_active_user)):  # 确保用户已登录
     """下载文件"""
-    file_path = os.path.join(resources_dir, file_name)  # 确保路径正确
-    if not os.path.exists(file_path):
+    file_path = await file_storage.resolve(file_name)
+    if file_path is None:
         raise HTTPException(status_code=404, detail="文件未找到")
-    return FileResponse(file_path, media_type='application/pdf', filename=file_name)
+    return stored_file_response(request, file_path, 'application/pdf', filename=file_name)
+
+def _image_kind(filename: str, content_type: str) -> str:
+    if content_type not in IMAGE_CONTENT_TYPES:
+        raise UploadError("只支持 PNG 和 JPEG 格式的图片")
+    return IMAGE_CONTENT_TYPES[content_type]
+
 
-@router.post("/upload-images", response_model=ResponseModel)
-async def upload_images(images: List[UploadFile] = File(...), user=Depends(current_active_user), db: AsyncSession = Depends(get_async_session)):
+@router.post("/upload-images", response_model=ResponseModel, openapi_extra=multipart_openapi("images"))
+async def upload_images(request: Request, user=Depends(current_active_user), db: AsyncSession = Depends(get_async_session)):
     """批量上传印章图片"""
     
     current_images = await get_all_stamp_images(db, user.id)
-    if len(current_images) + len(images) > 30:
+    if len(current_images) >= 30:
         raise HTTPException(status_code=400, detail="总共只能上传最多30张图片")
 
-    uploaded_paths = []
-    for image in images:
-        if image.content_type not in ["image/png", "image/jpeg", "image/jpg"]:
-            raise HTTPException(status_code=400, detail="只支持 PNG 和 JPEG 格式的图片")
+    # 直接解析请求体，边接收边校验Content-Type、图片文件头、大小和张数，不符合要求时立即停止接收；
+    # 按内容保存，相同的印章图片只保存一份，image_path仍为 resources/<文件名>
+    try:
+        images = await receive_multipart(request, "images", _image_kind, file_storage.temp_path,
+                                         max_files=30 - len(current_images),
+                                         max_files_message="总共只能上传最多30张图片")
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        file_path = os.path.join(resources_dir, image.filename)
-        with open(file_path, "wb") as f:
-            f.write(await image.read())
-        uploaded_paths.append(file_path)
+    uploaded_paths = []
+    try:
+        for image in images:
+            await file_storage.store(image.filename, image.path, sha256=image.sha256)
+            uploaded_paths.append(os.path.join(resources_dir, image.filename))
+    finally:
+        discard_received(images)
 
     await upload_stamp_images(db, user.id, uploaded_paths)
 
@@ -164,8 +322,11 @@ async def upload_images(images: List[UploadFile] = File(...), user=Depends(curre
 
 @router.post("/delete-images", response_model=ResponseModel)
 async def delete_images(image_ids: List[int], user=Depends(current_active_user), db: AsyncSession = Depends(get_async_session)):
-    """批量删除印章图片"""
-    await delete_stamp_images(db, image_ids)
+    """批量删除印章图片，不再被任何印章记录引用的图片文件一并释放"""
+    image_paths = await delete_stamp_images(db, image_ids)
+    remaining = {image.image_path for image in await get_stamp_images_by_paths(db, image_paths)}
+    for image_path in set(image_paths) - remaining:
+        await file_storage.release(os.path.basename(image_path))
     return ResponseModel(code=200, message="删除成功", data=image_ids)
 
 @router.get("/list-images", response_model=ResponseModel)
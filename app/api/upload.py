@@ -1,7 +1,9 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from app.models.response import ResponseModel
 import os
 from app.core.config import settings  # 导入配置
+from app.services.file_storage import file_storage
+from app.services.upload_service import UploadError, discard_received, file_kind, multipart_openapi, receive_multipart
 
 router = APIRouter(prefix="/upload", tags=["upload"])
 
@@ -16,26 +18,32 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'docx', 'doc', 'pdf'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-@router.post("/multiple-files", response_model=ResponseModel)
-async def upload_multiple_files(files: list[UploadFile] = File(...)):
+def _upload_kind(filename: str, content_type: str) -> str:
+    if not allowed_file(filename):
+        raise UploadError("不允许的文件类型")
+    return file_kind(filename)
+
+
+@router.post("/multiple-files", response_model=ResponseModel, openapi_extra=multipart_openapi("files"))
+async def upload_multiple_files(request: Request):
     """
     上传多个文件
     """
+    # 直接解析请求体，边接收边写入暂存文件，接收时检查扩展名、文件头和大小限制（UPLOAD_MAX_BYTES）并计算哈希，
+    # 不符合要求时立即停止接收；再按内容保存到文件存储，相同文件只保存一份，URL仍为 /resources/<文件名>
+    try:
+        files = await receive_multipart(request, "files", _upload_kind, file_storage.temp_path)
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     file_paths = []
-    
-    for file in files:
-        # 限制文件大小为 500MB
-        if file.size > 500 * 1024 * 1024:  # 500MB
-            raise HTTPException(status_code=400, detail="文件大小超过限制（500MB）")
-
-        if not allowed_file(file.filename):
-            raise HTTPException(status_code=400, detail="不允许的文件类型")
-
-        file_location = os.path.join(UPLOAD_DIRECTORY, file.filename)
-        with open(file_location, "wb") as f:
-            content = await file.read()
-            f.write(content)
-        file_paths.append(file_location)
+    try:
+        for file in files:
+            file_location = os.path.join(UPLOAD_DIRECTORY, file.filename)
+            await file_storage.store(file.filename, file.path, sha256=file.sha256)
+            file_paths.append(file_location)
+    finally:
+        discard_received(files)
 
     # 构建返回的完整路径，确保包含 /resources
     full_paths = [f"{settings.BASE_URL}/{settings.UPLOAD_DIRECTORY}/{os.path.basename(path)}" for path in file_paths]
@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings
 import secrets
 import os
+from typing import Optional
 
 def generate_secret_key() -> str:
     """生成随机密钥"""
@@ -38,6 +39,36 @@ class Settings(BaseSettings):
 
 
     UPLOAD_DIRECTORY: str = "resources"
+    TEMP_FILE_TTL_SECONDS: int = 30 * 60        # resources中temp_开头的结果文件保留时间
+    TEMP_FILE_RECONCILE_SECONDS: int = 10 * 60  # 扫描目录补登遗漏临时文件的间隔
+    STORAGE_DIRECTORY: str = "resources/blobs"  # 上传文件和盖章结果按内容哈希分片保存的目录
+    DOWNLOAD_OFFLOAD: str = ""                  # 文件下载交给前置代理发送：nginx为X-Accel-Redirect，sendfile为X-Sendfile，空为由应用发送
+    DOWNLOAD_OFFLOAD_PREFIX: str = "/_protected/"  # nginx中对应上传目录的internal location
+
+    # 盖章执行器配置
+    STAMP_EXECUTOR_WORKERS: int = 2         # 同时执行盖章/转换的进程数
+    STAMP_EXECUTOR_QUEUE_LIMIT: int = 8     # 最多排队的任务数，超过时直接返回繁忙
+    BATCH_STAMP_MAX_FILES: int = 50         # 批量盖章每次最多处理的文件数
+    STAMP_JOB_HEARTBEAT_SECONDS: int = 30   # 异步盖章任务的心跳间隔，执行进程按该间隔刷新自己任务的心跳
+    STAMP_JOB_STALE_SECONDS: int = 120      # 心跳超过该时间未刷新的任务视为执行进程已退出，标记为失败
+    SEAL_RENDERER: str = "crop"             # 骑缝章切片的绘制方式：crop为裁剪切片，clip为共享整枚印章图像
+    STAMP_IMAGE_DPI: Optional[int] = None   # 印章图像的有效打印DPI，高于该分辨率的印章按尺寸缩小，为空时不缩小
+    STAMP_IMAGE_ENCODING: str = "png"       # 印章图像的编码方式：png、palette（调色板量化）或jpeg（JPEG+透明度蒙版）
+
+    # 远程文件下载配置
+    HTTP_MAX_CONNECTIONS: int = 100                 # 共享HTTP客户端的最大连接数
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20        # 保持的空闲连接数
+    HTTP_TIMEOUT_SECONDS: float = 60.0              # 连接和读取超时时间
+    DOWNLOAD_MAX_BYTES: int = 500 * 1024 * 1024     # 单个下载文件的大小上限，与上传限制一致
+    UPLOAD_MAX_BYTES: int = 500 * 1024 * 1024       # 单个上传文件的大小上限
+
+    # 远程印章图片缓存配置
+    STAMP_CACHE_DIRECTORY: str = "cache/stamps"     # 缓存目录
+    STAMP_CACHE_MAX_BYTES: int = 64 * 1024 * 1024   # 缓存总大小上限，超过时淘汰最久未使用的图片
+
+    # 盖章结果缓存配置，目录为空时不缓存
+    RESULT_CACHE_DIRECTORY: str = "cache/results"        # 缓存目录，所有工作进程共享
+    RESULT_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024     # 缓存总大小上限，超过时淘汰最久未使用的结果
     class Config:
         """配置类设置"""
         env_file = ".env"  # 从.env文件加载配置
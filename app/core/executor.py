@@ -0,0 +1,103 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+from stamp.batch_processor import init_worker
+from app.core.config import settings
+
+
+class ExecutorBusyError(Exception):
+    """执行器正在处理的任务和排队任务都已达到上限"""
+
+
+class StampExecutor:
+    """
+    盖章与文档转换的有界执行器
+
+    PyMuPDF/PIL处理和LibreOffice转换都是CPU密集型操作，直接在async接口中调用会阻塞事件循环，
+    导致同一worker上的其他请求（登录、下载等）全部停顿。任务在独立的进程池中执行，
+    同时执行的任务数不超过max_workers，排队任务数不超过queue_limit，超过时立即抛出ExecutorBusyError。
+    """
+
+    def __init__(self, max_workers: int, queue_limit: int):
+        if max_workers <= 0:
+            raise ValueError("执行器工作进程数必须大于0")
+        if queue_limit < 0:
+            raise ValueError("执行器排队上限不能为负数")
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self.in_flight = 0     # 正在执行的任务数
+        self.queue_depth = 0   # 等待执行的任务数
+        self.rejected = 0      # 因繁忙被拒绝的任务数
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        在进程池中执行任务并等待结果
+        :param fn: 可被pickle的模块级函数
+        :return: 任务返回值
+        :raises ExecutorBusyError: 执行器已满时
+        """
+        if self.is_busy():
+            self.rejected += 1
+            raise ExecutorBusyError("服务繁忙，请稍后重试")
+        return await self.run_queued(fn, *args, **kwargs)
+
+    async def run_queued(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        在进程池中执行任务并等待结果，执行器已满时排队等待而不是拒绝，用于已持久化的异步任务
+        :param fn: 可被pickle的模块级函数
+        :return: 任务返回值
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        self.queue_depth += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queue_depth -= 1
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_pool(), partial(fn, *args, **kwargs))
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def is_busy(self) -> bool:
+        """执行中和排队的任务是否已达到上限"""
+        return self.in_flight + self.queue_depth >= self.max_workers + self.queue_limit
+
+    def stats(self) -> dict:
+        """返回执行器当前状态"""
+        return {
+            "max_workers": self.max_workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        """关闭进程池"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """首次使用时创建进程池，使用spawn避免在多线程进程中fork"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker
+            )
+        return self._pool
+
+
+# 全局盖章执行器
+stamp_executor = StampExecutor(settings.STAMP_EXECUTOR_WORKERS, settings.STAMP_EXECUTOR_QUEUE_LIMIT)
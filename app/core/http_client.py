@@ -0,0 +1,31 @@
+from typing import Optional
+
+import httpx
+
+from app.core.config import settings
+
+# 应用生命周期内共享的HTTP客户端，复用连接池，避免每个请求都重新建立TCP/TLS连接
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """获取共享的HTTP客户端，首次使用时创建"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS
+            ),
+            timeout=httpx.Timeout(settings.HTTP_TIMEOUT_SECONDS),
+            follow_redirects=True
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    """关闭共享的HTTP客户端"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
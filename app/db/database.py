@@ -1,4 +1,5 @@
 from typing import AsyncGenerator
+from sqlalchemy import inspect, text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
@@ -15,6 +16,18 @@ async_session_maker = sessionmaker(
 # 创建 Base 类
 Base = declarative_base()
 
+def add_missing_columns(sync_conn) -> None:
+    """create_all不会修改已存在的表：为已存在的表补充模型中新增的可空列，通过conn.run_sync调用"""
+    inspector = inspect(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                column_type = column.type.compile(dialect=sync_conn.dialect)
+                sync_conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
 # 获取异步数据库会话
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
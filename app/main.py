@@ -1,10 +1,14 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from app.api.user import router as user_router
 from app.api.stamp import router as stamp_router
-from app.db.database import engine, Base
+from app.api.resources import router as resources_router
+from app.db.database import engine, Base, add_missing_columns
 from app.api import upload  # 确保导入 upload 路由
+from app.core.executor import stamp_executor
+from app.core.http_client import get_http_client, close_http_client
+from app.services.stamp_job_service import fail_stale_jobs, start_job_monitor, stop_job_monitor
+from app.services.temp_file_registry import temp_file_registry
 
 app = FastAPI(
     title="FastAPI Users Demo",
@@ -17,6 +21,19 @@ app = FastAPI(
 async def startup():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(add_missing_columns)
+    await fail_stale_jobs()
+    start_job_monitor()
+    get_http_client()
+    temp_file_registry.start()
+
+# 关闭共享HTTP客户端、任务心跳、临时文件清理任务和盖章执行器
+@app.on_event("shutdown")
+async def shutdown():
+    await close_http_client()
+    await stop_job_monitor()
+    await temp_file_registry.stop()
+    stamp_executor.shutdown()
 
 # 配置CORS
 app.add_middleware(
@@ -27,8 +44,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 提供静态文件服务
-app.mount("/resources", StaticFiles(directory="resources"), name="resources")
+# 上传文件和盖章结果按文件名访问，由文件存储解析到按内容保存的文件
+app.include_router(resources_router)
 
 # 注册路由
 app.include_router(user_router)
@@ -0,0 +1,29 @@
+from enum import Enum
+from sqlalchemy import Column, Float, Integer, String, Text
+from app.db.database import Base
+
+
+class StampJobStatus(str, Enum):
+    """异步盖章任务状态"""
+    PENDING = "pending"      # 已提交，等待执行
+    RUNNING = "running"      # 执行中
+    SUCCEEDED = "succeeded"  # 执行成功，可获取结果
+    FAILED = "failed"        # 执行失败
+
+
+class StampJob(Base):
+    __tablename__ = "stamp_jobs"
+
+    id = Column(String(32), primary_key=True, index=True)  # 任务ID（uuid4 hex）
+    user_id = Column(Integer, nullable=False, index=True)
+    input_file = Column(String(1024), nullable=False)   # 输入文件URL
+    stamp_file = Column(String(1024), nullable=False)   # 印章文件URL
+    stamp_type = Column(String(16), nullable=False)
+    status = Column(String(16), nullable=False, default=StampJobStatus.PENDING.value)
+    progress = Column(Integer, nullable=False, default=0)  # 进度百分比 0-100
+    output_file = Column(String(1024), nullable=True)   # 结果文件名，位于上传目录中
+    error = Column(Text, nullable=True)
+    owner = Column(String(128), nullable=True, index=True)  # 执行任务的进程：主机名:进程号:启动标识
+    heartbeat_at = Column(Float, nullable=True)             # 执行进程最近一次确认任务仍在执行的时间（Unix时间戳）
+    created_at = Column(String(32), nullable=False)
+    updated_at = Column(String(32), nullable=False)
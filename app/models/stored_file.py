@@ -0,0 +1,22 @@
+from sqlalchemy import BigInteger, Column, Float, Integer, String
+from app.db.database import Base
+
+
+class StoredBlob(Base):
+    __tablename__ = "stored_blobs"
+
+    sha256 = Column(String(64), primary_key=True)           # 文件内容的SHA-256
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)  # 指向该内容的文件名数量，为0时删除
+    created_at = Column(String(32), nullable=False)
+
+
+class StoredFile(Base):
+    __tablename__ = "stored_files"
+
+    name = Column(String(255), primary_key=True)             # 对外的文件名，即 /resources/<name>
+    sha256 = Column(String(64), nullable=False, index=True)
+    size = Column(BigInteger, nullable=False)
+    expires_at = Column(Float, nullable=True, index=True)    # 临时文件的过期时间（Unix时间戳），长期文件为空
+    created_at = Column(String(32), nullable=False)
+    updated_at = Column(String(32), nullable=False)
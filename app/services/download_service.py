@@ -0,0 +1,53 @@
+import os
+from urllib.parse import urlparse
+
+from app.core.config import settings
+from app.core.http_client import get_http_client
+
+# 每次从网络读取并写入磁盘的字节数
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class DownloadError(Exception):
+    """文件下载失败或超过大小限制"""
+
+
+def url_file_name(url: str) -> str:
+    """从URL中取出文件名，忽略查询参数"""
+    return os.path.basename(urlparse(url).path)
+
+
+async def download_to_file(url: str, dest_path: str, max_bytes: int = None, name: str = "文件") -> int:
+    """
+    将URL内容分块流式写入磁盘，下载过程中检查大小限制，内存中最多只保留一个分块
+    :param url: 文件URL
+    :param dest_path: 保存路径
+    :param max_bytes: 最大字节数，默认使用配置中的DOWNLOAD_MAX_BYTES
+    :param name: 错误信息中使用的文件描述
+    :return: 写入的字节数
+    :raises DownloadError: 下载失败或超过大小限制时，已写入的部分文件会被删除
+    """
+    max_bytes = max_bytes or settings.DOWNLOAD_MAX_BYTES
+    written = 0
+    try:
+        async with get_http_client().stream("GET", url) as response:
+            if response.status_code != 200:
+                raise DownloadError(f"无法下载{name}")
+            content_length = response.headers.get("Content-Length")
+            if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+                raise DownloadError(f"{name}超过大小限制（{max_bytes // (1024 * 1024)}MB）")
+
+            with open(dest_path, "wb") as f:
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    written += len(chunk)
+                    if written > max_bytes:
+                        raise DownloadError(f"{name}超过大小限制（{max_bytes // (1024 * 1024)}MB）")
+                    f.write(chunk)
+        return written
+
+    except Exception as e:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        if isinstance(e, DownloadError):
+            raise
+        raise DownloadError(f"无法下载{name}: {str(e)}")
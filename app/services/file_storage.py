@@ -0,0 +1,265 @@
+import asyncio
+import hashlib
+import os
+import uuid
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from app.core.config import settings
+from app.db.database import async_session_maker
+from app.models.stored_file import StoredBlob, StoredFile
+
+# 计算文件哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 1024 * 1024
+# 可以重试的MySQL错误：1205锁等待超时，1213死锁（并发的SELECT ... FOR UPDATE间隙锁可能互相等待）
+RETRYABLE_MYSQL_ERRORS = (1205, 1213)
+
+
+def file_digest(path: str) -> Tuple[str, int]:
+    """计算文件的SHA-256和字节数"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+class FileStorage:
+    """
+    按内容哈希分片存储的文件存储
+
+    上传文件和盖章结果原先以原文件名平铺在resources目录中，目录越大目录操作越慢，相同的文件也会重复保存。
+    文件内容按SHA-256保存在 <root>/ab/cd/<sha256> 的两级分片目录中，相同内容只保存一份，
+    数据库中记录文件名到内容的映射（stored_files）和每份内容被多少个文件名引用（stored_blobs），
+    引用数降为0的内容由collect_garbage删除。对外的URL仍为 /resources/<文件名>，由映射解析到实际文件。
+
+    文件只在事务提交后放置，提交失败时源文件仍在，重试不受影响；内容文件只在回收时持有行锁删除，
+    删除后提交失败时引用数为0的行保留，下次回收时重试，期间再次保存同一内容会重新放置文件。
+    """
+
+    # 写入冲突（并发插入同一内容或同一文件名）或死锁时的重试次数
+    MAX_RETRIES = 3
+
+    def __init__(self, root: str, session_maker=async_session_maker, legacy_dir: str = None):
+        """
+        :param root: 内容存储根目录
+        :param session_maker: 数据库会话工厂，每次操作使用独立的会话
+        :param legacy_dir: 旧版本平铺保存文件的目录，映射中找不到时按文件名在其中查找
+        """
+        self.root = root
+        self.session_maker = session_maker
+        self.legacy_dir = legacy_dir
+        self.temp_dir = os.path.join(root, "tmp")
+
+    def blob_path(self, sha256: str) -> str:
+        """内容的存储路径"""
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def temp_path(self, suffix: str = "") -> str:
+        """
+        与存储目录位于同一文件系统的暂存文件路径
+        先把上传内容写到这里再调用store，入库时通过重命名移动而不是复制
+        """
+        os.makedirs(self.temp_dir, exist_ok=True)
+        return os.path.join(self.temp_dir, f"{uuid.uuid4().hex}{suffix}")
+
+    async def store(self, name: str, src_path: str, expires_at: float = None, sha256: str = None) -> StoredFile:
+        """
+        以name保存文件，同名文件已存在时替换为新内容
+
+        :param name: 对外的文件名，不能包含目录
+        :param src_path: 待保存的文件，保存后被移动或删除，保存失败时同样删除
+        :param expires_at: 临时文件的过期时间（Unix时间戳），由临时文件索引到期后释放
+        :param sha256: 已知的内容哈希，如上传时边接收边计算的结果，为空时读取文件计算
+        :return: 文件名映射
+        """
+        try:
+            return await self._store(name, src_path, expires_at, sha256)
+        finally:
+            if os.path.exists(src_path):
+                os.remove(src_path)
+
+    async def _store(self, name: str, src_path: str, expires_at: Optional[float], sha256: Optional[str]) -> StoredFile:
+        if not name or name != os.path.basename(name) or name in (".", ".."):
+            raise ValueError(f"非法的文件名: {name}")
+        size = os.path.getsize(src_path)
+        if sha256 is None:
+            sha256, size = await asyncio.to_thread(file_digest, src_path)
+
+        mapping, released = await self._retry(lambda: self._store_mapping(name, sha256, size, expires_at))
+        # 提交后放置文件：新映射已持有内容的引用，回收不会删除该内容
+        await asyncio.to_thread(self._place, src_path, sha256)
+        if released:
+            await self._collect([released])
+        return mapping
+
+    async def _store_mapping(self, name: str, sha256: str, size: int,
+                             expires_at: Optional[float]) -> Tuple[StoredFile, Optional[str]]:
+        """
+        在一个事务中更新文件名映射和内容引用数
+        :return: (映射, 引用数降为0的旧内容哈希，没有时为None)
+        """
+        async with self.session_maker() as db:
+            async with db.begin():
+                now = datetime.now().isoformat(timespec="seconds")
+                mapping = (await db.execute(
+                    select(StoredFile).where(StoredFile.name == name).with_for_update()
+                )).scalar_one_or_none()
+                old_sha256 = mapping.sha256 if mapping else None
+                if old_sha256 != sha256:
+                    await self._incref(db, sha256, size, now)
+                if mapping is None:
+                    mapping = StoredFile(name=name, created_at=now)
+                    db.add(mapping)
+                mapping.sha256 = sha256
+                mapping.size = size
+                mapping.expires_at = expires_at
+                mapping.updated_at = now
+                await db.flush()
+                released = None
+                if old_sha256 and old_sha256 != sha256 and await self._decref(db, old_sha256):
+                    released = old_sha256
+        return mapping, released
+
+    async def resolve(self, name: str) -> Optional[str]:
+        """
+        解析文件名对应的本地路径
+        :return: 文件路径，不存在时返回None
+        """
+        name = os.path.basename(name)
+        async with self.session_maker() as db:
+            sha256 = (await db.execute(
+                select(StoredFile.sha256).where(StoredFile.name == name)
+            )).scalar_one_or_none()
+        if sha256 is not None:
+            path = self.blob_path(sha256)
+            if os.path.isfile(path):
+                return path
+        if self.legacy_dir and name:
+            path = os.path.join(self.legacy_dir, name)
+            if os.path.isfile(path):
+                return path
+        return None
+
+    async def release(self, name: str, expired_before: float = None) -> bool:
+        """
+        删除文件名映射，内容不再被引用时一并删除
+        :param expired_before: 只在文件的过期时间不晚于该时间时删除，用于临时文件到期清理，
+                               文件在此期间被重新保存为长期文件或延长了过期时间时保留
+        :return: 是否删除了映射
+        """
+        released = await self._retry(lambda: self._release_mapping(name, expired_before))
+        if released is None:
+            return False
+        if released:
+            await self._collect([released])
+        return True
+
+    async def _release_mapping(self, name: str, expired_before: Optional[float]) -> Optional[str]:
+        """
+        在一个事务中删除文件名映射并减少内容引用数
+        :return: 未删除映射时为None；否则为引用数降为0的内容哈希，内容仍被引用时为空字符串
+        """
+        async with self.session_maker() as db:
+            async with db.begin():
+                mapping = (await db.execute(
+                    select(StoredFile).where(StoredFile.name == name).with_for_update()
+                )).scalar_one_or_none()
+                if mapping is None:
+                    return None
+                if expired_before is not None and (mapping.expires_at is None or mapping.expires_at > expired_before):
+                    return None
+                sha256 = mapping.sha256
+                await db.delete(mapping)
+                await db.flush()
+                return sha256 if await self._decref(db, sha256) else ""
+
+    async def collect_garbage(self) -> int:
+        """删除所有引用数为0的内容，返回删除的内容数；由临时文件索引定期调用，回收之前失败遗留的内容"""
+        return await self._collect()
+
+    async def expiring(self) -> List[Tuple[float, str]]:
+        """列出所有临时文件：(过期时间, 文件名)"""
+        async with self.session_maker() as db:
+            rows = await db.execute(
+                select(StoredFile.expires_at, StoredFile.name).where(StoredFile.expires_at.is_not(None))
+            )
+            return [(expires_at, name) for expires_at, name in rows]
+
+    async def _incref(self, db, sha256: str, size: int, now: str) -> None:
+        blob = (await db.execute(
+            select(StoredBlob).where(StoredBlob.sha256 == sha256).with_for_update()
+        )).scalar_one_or_none()
+        if blob is None:
+            db.add(StoredBlob(sha256=sha256, size=size, ref_count=1, created_at=now))
+        else:
+            blob.ref_count += 1
+        await db.flush()
+
+    async def _decref(self, db, sha256: str) -> bool:
+        """减少内容的引用数，只修改数据库，返回引用数是否降为0"""
+        blob = (await db.execute(
+            select(StoredBlob).where(StoredBlob.sha256 == sha256).with_for_update()
+        )).scalar_one_or_none()
+        if blob is None:
+            return False
+        blob.ref_count -= 1
+        await db.flush()
+        return blob.ref_count <= 0
+
+    async def _collect(self, sha256s: List[str] = None) -> int:
+        """删除引用数为0的内容，sha256s为空时处理所有这样的内容"""
+        async def collect() -> int:
+            async with self.session_maker() as db:
+                async with db.begin():
+                    query = select(StoredBlob).where(StoredBlob.ref_count <= 0)
+                    if sha256s is not None:
+                        query = query.where(StoredBlob.sha256.in_(sha256s))
+                    blobs = (await db.execute(query.with_for_update())).scalars().all()
+                    for blob in blobs:
+                        await db.delete(blob)
+                    await db.flush()
+                    # 持有行锁时删除文件，并发保存同一内容的请求等待本事务结束后重新插入，提交后再放置文件
+                    for blob in blobs:
+                        try:
+                            os.remove(self.blob_path(blob.sha256))
+                        except FileNotFoundError:
+                            pass
+                    return len(blobs)
+
+        return await self._retry(collect)
+
+    async def _retry(self, operation):
+        """执行一个事务，写入冲突或死锁时重新执行"""
+        for attempt in range(self.MAX_RETRIES):
+            try:
+                return await operation()
+            except (IntegrityError, OperationalError) as e:
+                if attempt == self.MAX_RETRIES - 1 or not self._retryable(e):
+                    raise
+
+    @staticmethod
+    def _retryable(error: Exception) -> bool:
+        """唯一约束冲突（并发插入同一行）以及MySQL死锁和锁等待超时可以重试"""
+        if isinstance(error, IntegrityError):
+            return True
+        args = getattr(error.orig, "args", None)
+        return bool(args) and args[0] in RETRYABLE_MYSQL_ERRORS
+
+    def _place(self, src_path: str, sha256: str) -> None:
+        """把文件移动到内容路径，相同内容已存在时删除源文件"""
+        path = self.blob_path(sha256)
+        if os.path.exists(path):
+            os.remove(src_path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(src_path, path)
+
+
+# 全局文件存储，旧版本平铺在上传目录中的文件仍可按文件名访问
+file_storage = FileStorage(settings.STORAGE_DIRECTORY, legacy_dir=settings.UPLOAD_DIRECTORY)
@@ -0,0 +1,251 @@
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+from app.core.config import settings
+from app.core.http_client import get_http_client
+from app.services.download_service import DOWNLOAD_CHUNK_SIZE, DownloadError
+
+
+class _EntryEvicted(Exception):
+    """校验或固定缓存文件时，文件已被其他工作进程淘汰"""
+
+
+class RemoteStampCache:
+    """
+    远程印章图片的本地磁盘缓存
+
+    smart_stamp的stamp_file几乎总是CDN上同几张印章图片。缓存按URL保存图片和ETag/Last-Modified，
+    再次使用时通过If-None-Match/If-Modified-Since条件请求校验，服务端返回304时既不传输图片，
+    也因为缓存文件路径和修改时间不变，工作进程中的印章素材缓存可以直接复用已解码的图片。
+    缓存总大小超过max_bytes时按最近最少使用的顺序淘汰，正在使用中的文件不会被淘汰。
+
+    缓存目录由所有工作进程共享，索引就是目录本身：元数据文件保存ETag等信息，其修改时间记录使用顺序，
+    大小上限按整个目录计算。写入、固定和淘汰都在缓存目录的flock排他锁内进行；使用中的条目
+    对其.pin文件持有共享锁，淘汰时无法取得排他锁的条目视为正在使用而跳过，
+    因此一个工作进程不会删除其他工作进程正在使用的印章。命中、下载和淘汰次数为本进程的统计。
+    """
+
+    # 缓存文件在校验和固定之间被其他进程淘汰时的最多尝试次数
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, cache_dir: str, max_bytes: int, max_file_bytes: int = None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes or settings.DOWNLOAD_MAX_BYTES
+        self.hits = 0           # 304校验通过的次数
+        self.misses = 0         # 重新下载的次数
+        self.evictions = 0      # 淘汰的文件数
+        self._locks: Dict[str, asyncio.Lock] = {}   # 缓存键 -> 本进程内合并同一URL下载的锁
+        self._users: Dict[str, int] = {}            # 缓存键 -> 本进程内正在使用的请求数
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load()
+
+    @asynccontextmanager
+    async def fetch(self, url: str, name: str = "印章文件") -> AsyncIterator[str]:
+        """
+        获取URL对应的本地缓存文件，缓存不存在或已变化时重新下载
+        使用期间文件不会被任何工作进程淘汰：async with cache.fetch(url) as path: ...
+        :param url: 印章图片URL
+        :param name: 错误信息中使用的文件描述
+        :return: 本地文件路径
+        :raises DownloadError: 下载失败或超过大小限制时
+        """
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._users[key] = self._users.get(key, 0) + 1
+        pin = None
+        try:
+            for _ in range(self.MAX_ATTEMPTS):
+                try:
+                    async with lock:
+                        await self._revalidate(key, url, name)
+                except _EntryEvicted:
+                    continue
+                pin = self._pin(key)
+                if pin is not None:
+                    break
+            if pin is None:
+                raise DownloadError(f"无法下载{name}: 缓存文件被反复淘汰")
+            yield self._image_path(key)
+        finally:
+            if pin is not None:
+                os.close(pin)   # 关闭文件即释放共享锁
+            self._users[key] -= 1
+            if self._users[key] == 0:
+                del self._users[key]
+                del self._locks[key]
+            self._evict()
+
+    def stats(self) -> dict:
+        """返回缓存目录的条目数和大小，以及本进程的命中、下载和淘汰次数"""
+        entries = self._scan()
+        return {
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    async def _revalidate(self, key: str, url: str, name: str) -> None:
+        """发送条件请求，304时复用缓存，200时流式写入临时文件后替换缓存文件"""
+        meta = self._read_meta(key)
+        headers = {}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        # 临时文件名包含进程号，多个工作进程同时下载同一URL时互不干扰
+        temp_path = f"{self._image_path(key)}.{os.getpid()}.part"
+        try:
+            async with get_http_client().stream("GET", url, headers=headers) as response:
+                if response.status_code == 304 and headers:
+                    with self._index_lock():
+                        if not os.path.exists(self._image_path(key)):
+                            raise _EntryEvicted()
+                        # 只更新元数据文件的时间记录使用顺序，图片文件的修改时间保持不变
+                        self._touch(key)
+                    self.hits += 1
+                    return
+                if response.status_code != 200:
+                    raise DownloadError(f"无法下载{name}")
+
+                size = 0
+                with open(temp_path, "wb") as f:
+                    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > self.max_file_bytes:
+                            raise DownloadError(f"{name}超过大小限制（{self.max_file_bytes // (1024 * 1024)}MB）")
+                        f.write(chunk)
+
+            meta = {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "size": size,
+            }
+            meta_temp_path = f"{self._meta_path(key)}.{os.getpid()}.part"
+            with open(meta_temp_path, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            with self._index_lock():
+                os.replace(temp_path, self._image_path(key))
+                os.replace(meta_temp_path, self._meta_path(key))
+                self._touch(key)
+            self.misses += 1
+
+        except Exception as e:
+            for path in (temp_path, f"{self._meta_path(key)}.{os.getpid()}.part"):
+                if os.path.exists(path):
+                    os.remove(path)
+            if isinstance(e, (DownloadError, _EntryEvicted)):
+                raise
+            raise DownloadError(f"无法下载{name}: {str(e)}")
+
+    def _pin(self, key: str) -> Optional[int]:
+        """
+        对条目的.pin文件加共享锁，使其在使用期间不被淘汰
+        :return: 持有共享锁的文件描述符；条目已被淘汰时返回None
+        """
+        with self._index_lock():
+            if not os.path.exists(self._image_path(key)):
+                return None
+            fd = os.open(self._pin_path(key), os.O_RDONLY | os.O_CREAT, 0o644)
+            # 淘汰只在持有目录锁时对.pin文件加排他锁，此处不会等待
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            return fd
+
+    def _evict(self) -> None:
+        """目录总大小超过上限时从最久未使用的条目开始淘汰，跳过任何进程正在使用的条目"""
+        with self._index_lock():
+            entries = sorted(self._scan())
+            total = sum(size for _, size, _ in entries)
+            for _, size, key in entries:
+                if total <= self.max_bytes:
+                    break
+                if self._remove_entry(key):
+                    total -= size
+                    self.evictions += 1
+
+    def _remove_entry(self, key: str) -> bool:
+        """删除条目的所有文件，调用方需持有目录锁；条目正在使用时不删除并返回False"""
+        fd = os.open(self._pin_path(key), os.O_RDONLY | os.O_CREAT, 0o644)
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            for path in (self._image_path(key), self._meta_path(key), self._pin_path(key)):
+                if os.path.exists(path):
+                    os.remove(path)
+            return True
+        finally:
+            os.close(fd)
+
+    def _load(self) -> None:
+        """启动时清理元数据损坏或图片缺失的条目，并按大小上限淘汰"""
+        with self._index_lock():
+            for file_name in os.listdir(self.cache_dir):
+                if not file_name.endswith(".json"):
+                    continue
+                key = file_name[:-len(".json")]
+                if self._read_meta(key) is None or not os.path.exists(self._image_path(key)):
+                    self._remove_entry(key)
+        self._evict()
+
+    def _scan(self) -> list:
+        """列出目录中的条目：(元数据修改时间, 图片字节数, 缓存键)，按修改时间排序即为使用顺序"""
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith(".json"):
+                continue
+            key = file_name[:-len(".json")]
+            try:
+                entries.append((os.path.getmtime(self._meta_path(key)), os.path.getsize(self._image_path(key)), key))
+            except OSError:
+                continue  # 已被其他进程淘汰
+        return entries
+
+    def _touch(self, key: str) -> None:
+        """以纳秒精度记录使用时间，文件系统默认的时间戳粒度较粗，连续使用的条目会得到相同的时间"""
+        now = time.time_ns()
+        os.utime(self._meta_path(key), ns=(now, now))
+
+    def _read_meta(self, key: str) -> Optional[dict]:
+        """读取条目的元数据，不存在或已损坏时返回None"""
+        try:
+            with open(self._meta_path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @contextmanager
+    def _index_lock(self) -> Iterator[None]:
+        """缓存目录的排他锁，所有工作进程的写入、固定和淘汰互斥进行"""
+        fd = os.open(self.cache_dir, os.O_RDONLY)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _image_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.img")
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _pin_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pin")
+
+
+# 全局远程印章缓存
+remote_stamp_cache = RemoteStampCache(settings.STAMP_CACHE_DIRECTORY, settings.STAMP_CACHE_MAX_BYTES)
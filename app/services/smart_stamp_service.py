@@ -0,0 +1,102 @@
+import asyncio
+import os
+from contextlib import AsyncExitStack
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.executor import stamp_executor
+from app.services.download_service import download_to_file, url_file_name
+from app.services.remote_stamp_cache import remote_stamp_cache
+from app.services.stamp_tasks import stamp_files, stamp_batch, plan_file
+from stamp.batch_processor import BatchResult
+from stamp.placement_planner import PlacementPlan
+from stamp.stamp_config import StampConfig
+from stamp.stamp_type import StampType
+
+# 盖章结果缓存的命中和未命中次数
+result_cache_stats = {"hits": 0, "misses": 0}
+
+
+async def stamp_remote_files(input_url: str, stamp_url: str, stamp_type: StampType, config: StampConfig,
+                             work_dir: str, queued: bool = False,
+                             on_downloaded: Optional[Callable[[], Awaitable[None]]] = None) -> str:
+    """
+    并发下载输入文件和印章文件到工作目录，在执行器进程中盖章
+    :param input_url: 输入文件URL
+    :param stamp_url: 印章文件URL
+    :param stamp_type: 印章类型
+    :param config: 印章配置
+    :param work_dir: 工作目录，下载文件和结果文件都保存在其中，由调用方负责清理
+    :param queued: 为True时执行器已满也排队等待（异步任务），否则立即抛出ExecutorBusyError
+    :param on_downloaded: 下载完成后调用的回调，用于更新任务进度
+    :return: 盖章后PDF的路径
+    """
+    # 使用固定文件名保存，避免不同请求的同名文件互相覆盖
+    input_path = os.path.join(work_dir, f"input{os.path.splitext(url_file_name(input_url))[1].lower()}")
+    output_path = os.path.join(work_dir, "output.pdf")
+
+    async with AsyncExitStack() as stack:
+        # 印章图片通过本地缓存获取，与输入文件的下载并发进行；使用期间缓存文件不会被淘汰
+        stamp_path, _ = await _gather(
+            stack.enter_async_context(remote_stamp_cache.fetch(stamp_url)),
+            download_to_file(input_url, input_path, name="输入文件")
+        )
+        if on_downloaded is not None:
+            await on_downloaded()
+
+        run = stamp_executor.run_queued if queued else stamp_executor.run
+        save_result = await run(stamp_files, config, input_path, stamp_path, output_path, stamp_type,
+                                settings.RESULT_CACHE_DIRECTORY, settings.RESULT_CACHE_MAX_BYTES)
+    # 工作进程中的缓存统计无法直接读取，由结果中的from_cache在主进程中汇总
+    if save_result.from_cache:
+        result_cache_stats["hits"] += 1
+    else:
+        result_cache_stats["misses"] += 1
+    return output_path
+
+
+async def plan_remote_file(input_url: str, stamp_type: StampType, config: StampConfig,
+                           work_dir: str) -> PlacementPlan:
+    """
+    下载输入文件到工作目录，在执行器进程中计算印章位置（试运行，不需要印章图片）
+    :param work_dir: 工作目录，由调用方负责清理
+    :return: 整份文档的印章位置
+    """
+    input_path = os.path.join(work_dir, f"input{os.path.splitext(url_file_name(input_url))[1].lower()}")
+    await download_to_file(input_url, input_path, name="输入文件")
+    return await stamp_executor.run(plan_file, config, input_path, stamp_type)
+
+
+async def stamp_remote_batch(input_urls: List[str], stamp_url: str, stamp_type: StampType, config: StampConfig,
+                             work_dir: str) -> Tuple[List[str], BatchResult]:
+    """
+    并发下载多个输入文件，在一个执行器任务中批量盖章，Word文档在一次LibreOffice调用中统一转换
+    :param input_urls: 输入文件URL列表
+    :param stamp_url: 印章文件URL
+    :param stamp_type: 印章类型
+    :param config: 印章配置
+    :param work_dir: 工作目录，由调用方负责清理
+    :return: (与输入顺序一致的输出PDF路径, 批量处理结果)
+    :raises ExecutorBusyError: 执行器已满时
+    """
+    input_paths = [os.path.join(work_dir, f"input_{index}{os.path.splitext(url_file_name(url))[1].lower()}")
+                   for index, url in enumerate(input_urls)]
+    output_paths = [os.path.join(work_dir, f"output_{index}.pdf") for index in range(len(input_urls))]
+
+    async with AsyncExitStack() as stack:
+        stamp_path, *_ = await _gather(
+            stack.enter_async_context(remote_stamp_cache.fetch(stamp_url)),
+            *(download_to_file(url, path, name=f"输入文件{url_file_name(url)}")
+              for url, path in zip(input_urls, input_paths))
+        )
+        batch_result = await stamp_executor.run(stamp_batch, config, input_paths, stamp_path, output_paths, stamp_type)
+    return output_paths, batch_result
+
+
+async def _gather(*aws) -> list:
+    """并发等待所有任务结束，任一任务失败时在全部结束后抛出第一个错误，避免留下仍在写文件的任务"""
+    results = await asyncio.gather(*aws, return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
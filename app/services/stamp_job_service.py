@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.db.database import async_session_maker
+from app.models.stamp_job import StampJob, StampJobStatus
+from app.services.smart_stamp_service import stamp_remote_files
+from app.services.file_storage import file_storage
+from app.services.temp_file_registry import temp_file_registry
+from stamp.stamp_config import StampConfig
+from stamp.stamp_type import StampType
+
+# 正在运行的后台任务，保存引用避免被垃圾回收
+_running_tasks = set()
+# 刷新心跳并清理失效任务的后台任务，由应用启动时start_job_monitor启动
+_monitor_task: Optional[asyncio.Task] = None
+
+# 当前进程的标识：主机名:进程号:启动时生成的随机串，进程号被复用时也不会与已退出的进程混淆
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+# 尚未结束的任务状态
+ACTIVE_STATUSES = [StampJobStatus.PENDING.value, StampJobStatus.RUNNING.value]
+
+
+async def create_stamp_job(db: AsyncSession, user_id: int, input_file: str, stamp_file: str,
+                           stamp_type: StampType) -> StampJob:
+    """创建盖章任务记录"""
+    now = datetime.now().isoformat(timespec="seconds")
+    job = StampJob(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        input_file=input_file,
+        stamp_file=stamp_file,
+        stamp_type=stamp_type.value,
+        status=StampJobStatus.PENDING.value,
+        progress=0,
+        owner=WORKER_ID,
+        heartbeat_at=time.time(),
+        created_at=now,
+        updated_at=now
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+
+async def get_stamp_job(db: AsyncSession, user_id: int, job_id: str) -> Optional[StampJob]:
+    """获取用户的盖章任务，任务不存在或不属于该用户时返回None"""
+    result = await db.execute(select(StampJob).filter(StampJob.id == job_id, StampJob.user_id == user_id))
+    return result.scalars().first()
+
+
+async def update_stamp_job(job_id: str, **values) -> None:
+    """使用独立会话更新任务状态，后台任务不能复用请求的会话"""
+    values["updated_at"] = datetime.now().isoformat(timespec="seconds")
+    values["heartbeat_at"] = time.time()
+    async with async_session_maker() as db:
+        await db.execute(update(StampJob).where(StampJob.id == job_id).values(**values))
+        await db.commit()
+
+
+async def heartbeat_jobs(now: float = None) -> int:
+    """刷新当前进程所执行任务的心跳，返回刷新的任务数"""
+    async with async_session_maker() as db:
+        result = await db.execute(
+            update(StampJob)
+            .where(StampJob.owner == WORKER_ID, StampJob.status.in_(ACTIVE_STATUSES))
+            .values(heartbeat_at=now or time.time())
+        )
+        await db.commit()
+        return result.rowcount
+
+
+async def fail_stale_jobs(now: float = None) -> int:
+    """
+    将执行进程已退出的未完成任务标记为失败，返回标记的任务数
+
+    多个工作进程共用任务表，只处理其他进程的任务：同一主机上进程号已不存在的立即处理，
+    其余的在心跳超过STAMP_JOB_STALE_SECONDS未刷新后处理，仍在执行的进程的任务不受影响。
+    """
+    now = now or time.time()
+    cutoff = now - settings.STAMP_JOB_STALE_SECONDS
+    async with async_session_maker() as db:
+        result = await db.execute(
+            select(StampJob.id, StampJob.owner, StampJob.heartbeat_at, StampJob.updated_at)
+            .where(StampJob.status.in_(ACTIVE_STATUSES))
+        )
+        stale_ids = [job_id for job_id, owner, heartbeat_at, updated_at in result.all()
+                     if owner != WORKER_ID and _owner_gone(owner, heartbeat_at, updated_at, cutoff)]
+        if stale_ids:
+            await db.execute(
+                update(StampJob)
+                .where(StampJob.id.in_(stale_ids), StampJob.status.in_(ACTIVE_STATUSES))
+                .values(status=StampJobStatus.FAILED.value, error="执行任务的服务进程已停止，任务已中断，请重新提交",
+                        updated_at=datetime.fromtimestamp(now).isoformat(timespec="seconds"))
+            )
+            await db.commit()
+    return len(stale_ids)
+
+
+def _owner_gone(owner: Optional[str], heartbeat_at: Optional[float], updated_at: str, cutoff: float) -> bool:
+    """判断任务的执行进程是否已退出"""
+    if owner is None or heartbeat_at is None:
+        # 增加心跳之前创建的任务，按最后更新时间判断
+        return updated_at < datetime.fromtimestamp(cutoff).isoformat(timespec="seconds")
+    host, pid = owner.split(":")[:2]
+    if host == socket.gethostname() and not _pid_alive(int(pid)):
+        return True
+    return heartbeat_at < cutoff
+
+
+def _pid_alive(pid: int) -> bool:
+    """本机上的进程是否存在"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # 进程存在但属于其他用户
+    return True
+
+
+def start_job_monitor() -> None:
+    """在当前事件循环中启动心跳任务：定期刷新本进程任务的心跳，并清理其他进程遗留的任务"""
+    global _monitor_task
+    if _monitor_task is None:
+        _monitor_task = asyncio.get_running_loop().create_task(_run_job_monitor())
+
+
+async def stop_job_monitor() -> None:
+    """停止心跳任务"""
+    global _monitor_task
+    task, _monitor_task = _monitor_task, None
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+async def _run_job_monitor() -> None:
+    while True:
+        try:
+            await heartbeat_jobs()
+            failed = await fail_stale_jobs()
+            if failed:
+                logging.warning(f"Marked {failed} stamp jobs of stopped workers as failed.")
+        except Exception as e:
+            logging.warning(f"Error refreshing stamp job heartbeats: {str(e)}")
+        await asyncio.sleep(settings.STAMP_JOB_HEARTBEAT_SECONDS)
+
+
+def start_stamp_job(job: StampJob, config: StampConfig) -> None:
+    """在后台执行盖章任务，接口无需等待任务完成"""
+    task = asyncio.create_task(run_stamp_job(job.id, job.input_file, job.stamp_file, StampType(job.stamp_type), config))
+    _running_tasks.add(task)
+    task.add_done_callback(_running_tasks.discard)
+
+
+async def run_stamp_job(job_id: str, input_file: str, stamp_file: str, stamp_type: StampType,
+                        config: StampConfig) -> None:
+    """下载文件、在执行器中盖章并保存结果，每个阶段更新任务进度"""
+    work_dir = tempfile.mkdtemp(prefix="stamp_job_")
+    try:
+        await update_stamp_job(job_id, status=StampJobStatus.RUNNING.value, progress=10)
+        output_path = await stamp_remote_files(input_file, stamp_file, stamp_type, config, work_dir, queued=True,
+                                                 on_downloaded=lambda: update_stamp_job(job_id, progress=30))
+
+        await update_stamp_job(job_id, progress=90)
+        output_file = f"temp_job_{job_id}.pdf"
+        await file_storage.store(output_file, output_path, expires_at=temp_file_registry.register(output_file))
+
+        await update_stamp_job(job_id, status=StampJobStatus.SUCCEEDED.value, progress=100, output_file=output_file)
+        logging.info(f"Stamp job {job_id} completed successfully.")
+
+    except Exception as e:
+        logging.error(f"Stamp job {job_id} failed: {str(e)}")
+        await update_stamp_job(job_id, status=StampJobStatus.FAILED.value, error=str(e))
+
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
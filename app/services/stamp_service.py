@@ -26,11 +26,19 @@ async def upload_stamp_images(db: AsyncSession, user_id: int, image_paths: list)
     return stamp_images
 
 async def delete_stamp_images(db: AsyncSession, image_ids: list):
-    """批量删除印章图片"""
+    """批量删除印章图片，返回被删除记录的图片路径"""
+    result = await db.execute(select(StampImage.image_path).filter(StampImage.id.in_(image_ids)))
+    image_paths = list(result.scalars().all())
     await db.execute(delete(StampImage).where(StampImage.id.in_(image_ids)))  # Use delete for async queries
     await db.commit()
+    return image_paths
 
 async def get_all_stamp_images(db: AsyncSession, user_id: int):
     """获取用户所有印章图片"""
     result = await db.execute(select(StampImage).filter(StampImage.user_id == user_id))  # Use select for async queries
-    return result.scalars().all()  # Use scalars() to get the results 
\ No newline at end of file
+    return result.scalars().all()  # Use scalars() to get the results
+
+async def get_stamp_images_by_paths(db: AsyncSession, image_paths: list):
+    """获取引用指定图片路径的印章图片记录"""
+    result = await db.execute(select(StampImage).filter(StampImage.image_path.in_(image_paths)))
+    return result.scalars().all()
@@ -0,0 +1,51 @@
+"""
+在执行器工作进程中运行的盖章任务
+
+这些函数会被pickle后发送到工作进程，只能依赖stamp和convert包，不能引用数据库或配置等应用对象。
+"""
+from typing import Dict, List
+
+from stamp.batch_processor import BatchResult, StampJob
+from stamp.placement_planner import PlacementPlan
+from stamp.result_cache import StampResultCache
+from stamp.save_profile import SaveResult
+from stamp.stamp_config import StampConfig
+from stamp.stamp_processor import StampProcessor
+from stamp.stamp_type import StampType
+
+# 工作进程内的盖章结果缓存，按缓存目录复用
+_result_caches: Dict[str, StampResultCache] = {}
+
+
+def stamp_files(config: StampConfig, input_file: str, stamp_file: str, output_file: str,
+                stamp_type: StampType, result_cache_dir: str = None,
+                result_cache_max_bytes: int = StampResultCache.DEFAULT_MAX_BYTES) -> SaveResult:
+    """
+    对已下载到本地的文件盖章，Word文档会先转换为PDF，结果直接写入output_file
+    指定result_cache_dir时，相同的输入直接复制上次的结果，缓存目录由所有工作进程共享
+    """
+    result_cache = None
+    if result_cache_dir:
+        result_cache = _result_caches.get(result_cache_dir)
+        if result_cache is None:
+            result_cache = _result_caches[result_cache_dir] = StampResultCache(result_cache_dir, result_cache_max_bytes)
+    return StampProcessor(config, result_cache=result_cache).process(
+        input_file=input_file,
+        stamp_file=stamp_file,
+        output_file=output_file,
+        stamp_type=stamp_type
+    )
+
+
+def stamp_batch(config: StampConfig, input_files: List[str], stamp_file: str, output_files: List[str],
+                stamp_type: StampType) -> BatchResult:
+    """批量盖章，Word文档在一次LibreOffice调用中统一转换，单个文件失败记录在结果中"""
+    jobs = [StampJob(input_file, stamp_file, output_file, stamp_type)
+            for input_file, output_file in zip(input_files, output_files)]
+    # 已经运行在执行器的工作进程中，批次内顺序处理
+    return StampProcessor(config).process_many(jobs, max_workers=1)
+
+
+def plan_file(config: StampConfig, input_file: str, stamp_type: StampType) -> PlacementPlan:
+    """试运行：只计算印章位置，不修改文档"""
+    return StampProcessor(config).plan(input_file, stamp_type)
@@ -0,0 +1,209 @@
+import asyncio
+import fcntl
+import heapq
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.file_storage import FileStorage, file_storage
+
+
+class TempFileRegistry:
+    """
+    临时结果文件的过期索引
+
+    原先每个工作进程每60秒启动一个新的Timer线程，列出整个resources目录并逐个读取temp_文件的创建时间，
+    文件数量多时每分钟都会产生一次目录扫描。现在生成临时文件时登记其过期时间，
+    清理任务按到期时间维护一个最小堆，只在最早的文件到期时醒来并删除已到期的文件。
+    临时文件保存在文件存储中时到期后释放其文件名映射，旧版本平铺在目录中的文件直接删除。
+
+    部署中的多个进程通过目录下锁文件的fcntl排他锁选出一个负责对账的进程，
+    它在启动时和每隔reconcile_interval用os.scandir扫描一次目录、查询一次文件存储中的临时文件，
+    把其他进程生成、进程重启前遗留或已退出进程未能删除的临时文件补登到索引中，
+    并回收文件存储中引用数为0的内容；其余进程只清理自己登记的文件。
+    register以外的方法都需要在事件循环中调用。
+    """
+
+    # 选举对账进程使用的锁文件，不以prefix开头，不会被清理
+    LOCK_FILE_NAME = ".temp_file_registry.lock"
+
+    def __init__(self, directory: str, ttl_seconds: float, prefix: str = "temp_",
+                 reconcile_interval: float = 600.0, storage: FileStorage = None):
+        """
+        :param directory: 旧版本临时文件所在目录，同时存放对账锁文件
+        :param ttl_seconds: 文件生成后保留的时间，单位秒
+        :param prefix: 临时文件名前缀，对账时只处理该前缀的文件
+        :param reconcile_interval: 对账扫描的间隔，单位秒
+        :param storage: 保存临时文件的文件存储，为空时只处理目录中的文件
+        """
+        if ttl_seconds <= 0:
+            raise ValueError("临时文件保留时间必须大于0")
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.reconcile_interval = reconcile_interval
+        self.storage = storage
+        self.deleted = 0        # 已删除的文件数
+        self.reconciled = 0     # 对账时补登的文件数
+        self._heap: List[Tuple[float, str]] = []    # (到期时间, 文件名)
+        self._deadlines: Dict[str, float] = {}     # 文件名 -> 当前到期时间，堆中与之不一致的条目已失效
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._lock_fd: Optional[int] = None
+
+    def register(self, path: str, ttl_seconds: float = None) -> float:
+        """
+        登记一个临时文件，到期后删除
+        :param path: 文件名或目录中的文件路径
+        :param ttl_seconds: 保留时间，默认使用ttl_seconds
+        :return: 到期时间（Unix时间戳），保存到文件存储时作为expires_at
+        """
+        deadline = time.time() + (ttl_seconds or self.ttl_seconds)
+        self._push(os.path.basename(path), deadline)
+        return deadline
+
+    async def sweep(self, now: float = None) -> int:
+        """
+        删除已到期的文件
+        :param now: 当前时间，默认time.time()
+        :return: 删除的文件数
+        """
+        now = time.time() if now is None else now
+        deleted = 0
+        while self._heap and self._heap[0][0] <= now:
+            deadline, name = heapq.heappop(self._heap)
+            if self._deadlines.get(name) != deadline:
+                continue
+            del self._deadlines[name]
+            try:
+                if await self._remove(name, now):
+                    deleted += 1
+            except Exception as e:
+                logging.warning(f"Error deleting temporary file {name}: {str(e)}")
+        self.deleted += deleted
+        return deleted
+
+    async def reconcile(self, now: float = None) -> int:
+        """
+        扫描目录和文件存储，登记尚未登记的临时文件；目录中的文件按ctime计算到期时间
+        :return: 补登的文件数
+        """
+        found = await asyncio.to_thread(self._scan)
+        if self.storage is not None:
+            found.extend(await self.storage.expiring())
+
+        added = 0
+        for deadline, name in found:
+            if name not in self._deadlines:
+                self._push(name, deadline)
+                added += 1
+        self.reconciled += added
+        return added
+
+    def start(self) -> None:
+        """在当前事件循环中启动后台清理任务"""
+        if self._task is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台清理任务并释放对账锁"""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def is_reconciler(self) -> bool:
+        """当前进程是否持有对账锁，未持有时尝试获取"""
+        if self._lock_fd is not None:
+            return True
+        fd = os.open(os.path.join(self.directory, self.LOCK_FILE_NAME), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    def stats(self) -> dict:
+        """返回索引中的文件数和清理统计"""
+        return {
+            "pending": len(self._deadlines),
+            "next_deadline": self._heap[0][0] if self._heap else None,
+            "deleted": self.deleted,
+            "reconciled": self.reconciled,
+            "reconciler": self._lock_fd is not None,
+        }
+
+    def _push(self, name: str, deadline: float) -> None:
+        self._deadlines[name] = deadline
+        heapq.heappush(self._heap, (deadline, name))
+        if self._heap[0][0] == deadline:
+            # 新文件比当前最早的到期时间还早，唤醒清理任务重新计算等待时间
+            self._wakeup.set()
+
+    async def _remove(self, name: str, now: float) -> bool:
+        """删除一个到期文件：优先释放文件存储中的映射，否则删除目录中的旧文件"""
+        if self.storage is not None and await self.storage.release(name, expired_before=now):
+            return True
+        try:
+            await asyncio.to_thread(os.remove, os.path.join(self.directory, name))
+            return True
+        except FileNotFoundError:
+            return False  # 已被其他进程删除
+
+    def _scan(self) -> List[Tuple[float, str]]:
+        """列出目录中的旧临时文件：(到期时间, 文件名)"""
+        found = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.startswith(self.prefix):
+                    continue
+                try:
+                    if entry.is_file():
+                        found.append((entry.stat().st_ctime + self.ttl_seconds, entry.name))
+                except FileNotFoundError:
+                    continue
+        return found
+
+    async def _run(self) -> None:
+        next_reconcile = 0.0
+        while True:
+            now = time.time()
+            if now >= next_reconcile:
+                next_reconcile = now + self.reconcile_interval
+                try:
+                    if self.is_reconciler():
+                        await self.reconcile(now)
+                        if self.storage is not None:
+                            # 回收之前删除失败遗留的、引用数为0的内容
+                            await self.storage.collect_garbage()
+                except Exception as e:
+                    logging.warning(f"Error reconciling temporary files: {str(e)}")
+            await self.sweep(now)
+
+            wake_at = min(next_reconcile, self._heap[0][0]) if self._heap else next_reconcile
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(wake_at - time.time(), 0))
+            except asyncio.TimeoutError:
+                pass
+
+
+# 全局临时文件索引，由应用启动时start
+temp_file_registry = TempFileRegistry(
+    settings.UPLOAD_DIRECTORY,
+    settings.TEMP_FILE_TTL_SECONDS,
+    reconcile_interval=settings.TEMP_FILE_RECONCILE_SECONDS,
+    storage=file_storage
+)
@@ -0,0 +1,305 @@
+import asyncio
+import hashlib
+import os
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+from fastapi import Request, UploadFile
+from multipart.multipart import MultipartParser, parse_options_header
+
+from app.core.config import settings
+
+# 每次从上传文件读取并写入磁盘的字节数
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# 文件类型 -> 允许的文件头，接收第一个分块时校验，扩展名或Content-Type与内容不符的文件直接拒绝
+FILE_SIGNATURES = {
+    "pdf": (b"%PDF-",),
+    "png": (b"\x89PNG\r\n\x1a\n",),
+    "jpg": (b"\xff\xd8\xff",),
+    "jpeg": (b"\xff\xd8\xff",),
+    "docx": (b"PK\x03\x04",),
+    "doc": (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1",),
+}
+
+# 校验文件头需要的字节数
+SIGNATURE_BYTES = max(len(signature) for signatures in FILE_SIGNATURES.values() for signature in signatures)
+
+# multipart分段头（Content-Disposition等）的大小上限
+MAX_PART_HEADER_BYTES = 16 * 1024
+# 非文件字段内容的大小上限
+MAX_FIELD_BYTES = 64 * 1024
+
+
+class UploadError(Exception):
+    """上传文件类型与内容不符或超过大小限制"""
+
+
+@dataclass
+class ReceivedFile:
+    """
+    从multipart请求中接收的文件
+
+    属性:
+        filename (str): 客户端提供的文件名（已去掉路径部分）
+        content_type (str): 分段声明的Content-Type，未声明时为None
+        path (str): 暂存文件路径
+        sha256 (str): 十六进制SHA-256
+        size (int): 字节数
+    """
+    filename: str
+    content_type: Optional[str]
+    path: str
+    sha256: str = ""
+    size: int = 0
+
+
+def file_kind(file_name: str) -> str:
+    """按扩展名取文件类型，如 report.PDF -> pdf"""
+    return os.path.splitext(file_name)[1].lstrip(".").lower()
+
+
+class UploadSink:
+    """
+    单个上传文件的写入端
+
+    数据到达时逐块写入磁盘并计算SHA-256，收到足够的字节后立即校验文件头，累计大小超过上限时立即拒绝，
+    内存中最多只保留当前分块。
+    """
+
+    def __init__(self, dest_path: str, kind: str, max_bytes: int = None):
+        """
+        :param dest_path: 保存路径
+        :param kind: 期望的文件类型，FILE_SIGNATURES中的键
+        :param max_bytes: 最大字节数，默认使用配置中的UPLOAD_MAX_BYTES
+        :raises UploadError: 文件类型不允许时
+        """
+        self.signatures = FILE_SIGNATURES.get(kind)
+        if self.signatures is None:
+            raise UploadError("不允许的文件类型")
+        self.dest_path = dest_path
+        self.max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+        self.limit_message = f"文件大小超过限制（{self.max_bytes // (1024 * 1024)}MB）"
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._head = b""    # 文件头校验前暂存的数据，校验后为None
+        self._file = None
+
+    async def write(self, chunk: bytes) -> None:
+        """写入一个分块，类型不符或超过大小限制时抛出UploadError"""
+        if not chunk:
+            return
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadError(self.limit_message)
+        self._digest.update(chunk)
+        if self._head is not None:
+            self._head += chunk
+            if len(self._head) < SIGNATURE_BYTES:
+                return
+            chunk = self._check_head()
+        await self._write(chunk)
+
+    async def finish(self) -> Tuple[str, int]:
+        """
+        完成写入
+        :return: (十六进制SHA-256, 写入的字节数)
+        """
+        if self.size == 0:
+            raise UploadError("文件内容为空")
+        if self._head is not None:
+            await self._write(self._check_head())
+        await asyncio.to_thread(self._file.close)
+        return self._digest.hexdigest(), self.size
+
+    async def abort(self) -> None:
+        """放弃写入并删除已写入的部分文件"""
+        if self._file is not None:
+            self._file.close()
+        if os.path.exists(self.dest_path):
+            os.remove(self.dest_path)
+
+    def _check_head(self) -> bytes:
+        head, self._head = self._head, None
+        if not head.startswith(self.signatures):
+            raise UploadError("文件内容与文件类型不符")
+        return head
+
+    async def _write(self, chunk: bytes) -> None:
+        if self._file is None:
+            self._file = await asyncio.to_thread(open, self.dest_path, "wb")
+        await asyncio.to_thread(self._file.write, chunk)
+
+
+async def receive_upload(file: UploadFile, dest_path: str, kind: str, max_bytes: int = None) -> Tuple[str, int]:
+    """
+    将上传文件分块写入磁盘，边接收边计算SHA-256并检查大小限制和文件头，内存中最多只保留一个分块
+    :param file: 上传文件
+    :param dest_path: 保存路径
+    :param kind: 期望的文件类型，FILE_SIGNATURES中的键
+    :param max_bytes: 最大字节数，默认使用配置中的UPLOAD_MAX_BYTES
+    :return: (十六进制SHA-256, 写入的字节数)
+    :raises UploadError: 类型不符或超过大小限制时，已写入的部分文件会被删除
+    """
+    sink = UploadSink(dest_path, kind, max_bytes)
+    # 客户端声明了大小时不必接收就能拒绝
+    if file.size is not None and file.size > sink.max_bytes:
+        raise UploadError(sink.limit_message)
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            await sink.write(chunk)
+        return await sink.finish()
+    except BaseException:
+        await sink.abort()
+        raise
+
+
+class _MultipartEvents:
+    """把MultipartParser的同步回调整理为事件列表，由异步代码依次处理（写文件需要在线程中进行）"""
+
+    def __init__(self):
+        self.events: List[tuple] = []
+        self._headers = {}
+        self._field = b""
+        self._value = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._part_begin,
+            "on_header_field": self._header_field,
+            "on_header_value": self._header_value,
+            "on_header_end": self._header_end,
+            "on_headers_finished": lambda: self.events.append(("headers", self._headers)),
+            "on_part_data": lambda data, start, end: self.events.append(("data", bytes(data[start:end]))),
+            "on_part_end": lambda: self.events.append(("end", None)),
+        }
+
+    def drain(self) -> List[tuple]:
+        events, self.events = self.events, []
+        return events
+
+    def _part_begin(self) -> None:
+        self._headers = {}
+
+    def _header_field(self, data: bytes, start: int, end: int) -> None:
+        self._field += data[start:end]
+        self._check_header_size()
+
+    def _header_value(self, data: bytes, start: int, end: int) -> None:
+        self._value += data[start:end]
+        self._check_header_size()
+
+    def _header_end(self) -> None:
+        self._headers[self._field.lower()] = self._value
+        self._field = self._value = b""
+
+    def _check_header_size(self) -> None:
+        if len(self._field) + len(self._value) > MAX_PART_HEADER_BYTES:
+            raise UploadError("上传请求格式错误：分段头过大")
+
+
+async def receive_multipart(request: Request, field_name: str, kind_of: Callable[[str, Optional[str]], str],
+                            dest_factory: Callable[[], str], max_bytes: int = None, max_files: int = None,
+                            max_files_message: str = None) -> List[ReceivedFile]:
+    """
+    直接解析请求体中的multipart数据，逐个文件边接收边写入磁盘
+
+    FastAPI的UploadFile参数要等Starlette把整个请求体接收并暂存到临时文件后才交给接口处理，
+    超大或类型不符的文件只能在全部接收之后才被拒绝，暂存还会让磁盘写入量加倍。这里在数据到达时
+    就确定文件类型、校验文件头和累计大小，不符合要求时立即停止读取请求体。
+    :param request: 请求
+    :param field_name: 文件字段名，其他字段被忽略
+    :param kind_of: 根据文件名和Content-Type返回FILE_SIGNATURES中的文件类型，不允许时抛出UploadError，
+                    在接收文件内容之前调用
+    :param dest_factory: 生成暂存文件路径
+    :param max_bytes: 单个文件的最大字节数，默认使用配置中的UPLOAD_MAX_BYTES
+    :param max_files: 文件数上限，None表示不限制
+    :param max_files_message: 超过文件数上限时的错误信息
+    :return: 按上传顺序排列的文件
+    :raises UploadError: 请求格式错误、类型不符、超过大小或数量限制时，已接收的文件全部删除
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not params.get(b"boundary"):
+        raise UploadError("上传请求必须是multipart/form-data格式")
+    max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+    max_files_message = max_files_message or f"最多只能上传{max_files}个文件"
+    # 请求体声明的长度超过全部文件的上限时不必接收就能拒绝
+    content_length = request.headers.get("content-length", "")
+    if max_files is not None and content_length.isdigit() and \
+            int(content_length) > (max_bytes + MAX_PART_HEADER_BYTES) * max_files + MAX_FIELD_BYTES:
+        raise UploadError(f"文件大小超过限制（{max_bytes // (1024 * 1024)}MB）")
+
+    events = _MultipartEvents()
+    parser = MultipartParser(params[b"boundary"], events.callbacks())
+    received: List[ReceivedFile] = []
+    current: Optional[ReceivedFile] = None
+    sink: Optional[UploadSink] = None
+    field_bytes = 0
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for event, value in events.drain():
+                if event == "headers":
+                    _, disposition = parse_options_header(value.get(b"content-disposition", b""))
+                    filename = disposition.get(b"filename")
+                    if disposition.get(b"name", b"").decode("utf-8", "replace") != field_name or filename is None:
+                        continue
+                    if max_files is not None and len(received) >= max_files:
+                        raise UploadError(max_files_message)
+                    part_type = value.get(b"content-type", b"").decode("latin-1").strip() or None
+                    current = ReceivedFile(filename=os.path.basename(filename.decode("utf-8", "replace")),
+                                           content_type=part_type, path=dest_factory())
+                    sink = UploadSink(current.path, kind_of(current.filename, part_type), max_bytes)
+                elif event == "data":
+                    if sink is not None:
+                        await sink.write(value)
+                    else:
+                        field_bytes += len(value)
+                        if field_bytes > MAX_FIELD_BYTES:
+                            raise UploadError("上传请求格式错误：表单字段过大")
+                elif sink is not None:
+                    current.sha256, current.size = await sink.finish()
+                    received.append(current)
+                    current = sink = None
+        parser.finalize()
+        if sink is not None:
+            raise UploadError("上传数据不完整")
+        if not received:
+            raise UploadError("没有上传文件")
+        return received
+
+    except BaseException:
+        if sink is not None:
+            await sink.abort()
+        discard_received(received)
+        raise
+
+
+def discard_received(files: List[ReceivedFile]) -> None:
+    """删除尚未保存到文件存储的暂存文件"""
+    for file in files:
+        if os.path.exists(file.path):
+            os.remove(file.path)
+
+
+def multipart_openapi(field_name: str) -> dict:
+    """接口直接解析请求体时，在OpenAPI文档中声明multipart文件字段"""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": [field_name],
+                        "properties": {
+                            field_name: {"type": "array", "items": {"type": "string", "format": "binary"}},
+                        },
+                    },
+                },
+            },
+        },
+    }
@@ -1,7 +1,9 @@
 import pytest
+import pytest_asyncio
 from fastapi.testclient import TestClient
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from app.main import app
 from app.db.database import Base, get_async_session
@@ -44,4 +46,16 @@ def client(test_db):
             await test_db.close()
             
     app.dependency_overrides[get_async_session] = override_get_db
-    return TestClient(app) 
\ No newline at end of file
+    return TestClient(app)
+
+
+@pytest_asyncio.fixture
+async def sqlite_session_maker():
+    """内存SQLite数据库的会话工厂，服务层测试不依赖MySQL"""
+    sqlite_engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with sqlite_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    try:
+        yield sessionmaker(sqlite_engine, class_=AsyncSession, expire_on_commit=False)
+    finally:
+        await sqlite_engine.dispose()
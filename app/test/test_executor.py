@@ -0,0 +1,80 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import pytest_asyncio
+
+from app.core.executor import ExecutorBusyError, StampExecutor
+
+
+async def _until(condition, timeout: float = 5.0) -> None:
+    """等待条件成立"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "等待超时"
+        await asyncio.sleep(0.01)
+
+
+@pytest_asyncio.fixture
+async def executor():
+    """1个工作线程、排队上限1的执行器，任务在线程池中执行以便用Event阻塞"""
+    executor = StampExecutor(max_workers=1, queue_limit=1)
+    executor._pool = ThreadPoolExecutor(max_workers=1)
+    executor.gate = threading.Event()
+    yield executor
+    executor.gate.set()
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_full(executor):
+    """执行中和排队的任务达到上限后run立即拒绝，run_queued继续排队"""
+    first = asyncio.create_task(executor.run(executor.gate.wait, 10))
+    await _until(lambda: executor.in_flight == 1)
+    assert not executor.is_busy()
+
+    second = asyncio.create_task(executor.run(executor.gate.wait, 10))
+    await _until(lambda: executor.queue_depth == 1)
+    assert executor.is_busy()
+    assert executor.stats() == {"max_workers": 1, "queue_limit": 1, "in_flight": 1, "queue_depth": 1, "rejected": 0}
+
+    with pytest.raises(ExecutorBusyError):
+        await executor.run(executor.gate.wait, 10)
+    assert executor.stats()["rejected"] == 1
+
+    third = asyncio.create_task(executor.run_queued(executor.gate.wait, 10))
+    await _until(lambda: executor.queue_depth == 2)
+    assert executor.stats()["rejected"] == 1
+
+    executor.gate.set()
+    assert await asyncio.gather(first, second, third) == [True, True, True]
+    assert executor.stats() == {"max_workers": 1, "queue_limit": 1, "in_flight": 0, "queue_depth": 0, "rejected": 1}
+    assert not executor.is_busy()
+
+
+@pytest.mark.asyncio
+async def test_failed_task_releases_slot(executor):
+    with pytest.raises(ZeroDivisionError):
+        await executor.run(divmod, 1, 0)
+    assert executor.stats()["in_flight"] == 0
+    assert await executor.run(divmod, 7, 2) == (3, 1)
+
+
+@pytest.mark.asyncio
+async def test_runs_in_process_pool():
+    """任务在独立的工作进程中执行"""
+    executor = StampExecutor(max_workers=1, queue_limit=0)
+    try:
+        assert await executor.run(os.getpid) != os.getpid()
+    finally:
+        executor.shutdown()
+
+
+def test_invalid_limits():
+    with pytest.raises(ValueError):
+        StampExecutor(max_workers=0, queue_limit=1)
+    with pytest.raises(ValueError):
+        StampExecutor(max_workers=1, queue_limit=-1)
@@ -0,0 +1,76 @@
+import os
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.api.resources import stored_file_response
+from app.core.config import settings
+from app.services.file_storage import file_storage
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/files/{path:path}")
+    async def get_file(path: str, request: Request):
+        return stored_file_response(request, path, "application/pdf", filename="result.pdf")
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def blob_file(tmp_path, monkeypatch):
+    """文件存储中的文件，以内容的SHA-256命名；上传目录和存储目录都在临时目录中"""
+    monkeypatch.setattr(settings, "UPLOAD_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(settings, "STORAGE_DIRECTORY", str(tmp_path / "blobs"))
+    monkeypatch.setattr(file_storage, "root", str(tmp_path / "blobs"))
+    sha256 = "ab" * 32
+    path = file_storage.blob_path(sha256)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(bytes(range(256)) * 40)
+    return path, sha256
+
+
+def test_range_request(client, blob_file):
+    """分段请求返回206和对应的字节"""
+    path, _ = blob_file
+    response = client.get(f"/files/{path}", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.content == (bytes(range(256)) * 40)[100:200]
+    assert response.headers["content-range"] == "bytes 100-199/10240"
+
+
+def test_strong_etag_and_not_modified(client, blob_file, tmp_path):
+    """文件存储中的文件以SHA-256作为强ETag，If-None-Match一致时返回304"""
+    path, sha256 = blob_file
+    response = client.get(f"/files/{path}")
+    assert response.headers["etag"] == f'"{sha256}"'
+    assert response.headers["cache-control"] == "no-cache"
+
+    response = client.get(f"/files/{path}", headers={"If-None-Match": f'"other", W/"{sha256}"'})
+    assert response.status_code == 304 and response.content == b""
+
+    # 旧版本平铺保存的文件使用FileResponse按修改时间和大小生成的ETag
+    legacy = tmp_path / "legacy.pdf"
+    legacy.write_bytes(b"%PDF-legacy")
+    etag = client.get(f"/files/{legacy}").headers["etag"]
+    assert client.get(f"/files/{legacy}", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_offload_to_proxy(client, blob_file, monkeypatch):
+    """nginx模式只返回X-Accel-Redirect，不发送文件内容"""
+    path, sha256 = blob_file
+    monkeypatch.setattr(settings, "DOWNLOAD_OFFLOAD", "nginx")
+    response = client.get(f"/files/{path}", headers={"Range": "bytes=0-9"})
+    assert response.status_code == 200 and response.content == b""
+    assert response.headers["x-accel-redirect"] == f"/_protected/blobs/ab/ab/{sha256}"
+    # nginx配置中以add_header转发该ETag
+    assert response.headers["etag"] == f'"{sha256}"'
+    assert response.headers["content-type"] == "application/pdf"
+    assert "result.pdf" in response.headers["content-disposition"]
+
+    monkeypatch.setattr(settings, "DOWNLOAD_OFFLOAD", "sendfile")
+    assert client.get(f"/files/{path}").headers["x-sendfile"] == os.path.abspath(path)
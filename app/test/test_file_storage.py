@@ -0,0 +1,200 @@
+import os
+from datetime import datetime
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import event, select
+from sqlalchemy.exc import OperationalError
+
+from app.api import stamp as stamp_api
+from app.core.security import current_active_user
+from app.db.database import get_async_session
+from app.models.stamp_image import StampImage
+from app.models.stored_file import StoredBlob, StoredFile
+from app.services.file_storage import FileStorage
+
+
+class FlakySessions:
+    """前failures次会话的提交抛出error，模拟提交失败或MySQL死锁"""
+
+    def __init__(self, session_maker, failures: int, error: Exception):
+        self.session_maker = session_maker
+        self.failures = failures
+        self.error = error
+
+    def __call__(self):
+        session = self.session_maker()
+        if self.failures > 0:
+            self.failures -= 1
+
+            def fail(_):
+                raise self.error
+
+            event.listen(session.sync_session, "before_commit", fail)
+        return session
+
+
+def deadlock() -> OperationalError:
+    return OperationalError("COMMIT", {}, Exception(1213, "Deadlock found when trying to get lock"))
+
+
+@pytest.fixture
+def storage(sqlite_session_maker, tmp_path):
+    return FileStorage(str(tmp_path / "blobs"), session_maker=sqlite_session_maker, legacy_dir=str(tmp_path / "legacy"))
+
+
+def _source(storage: FileStorage, content: bytes) -> str:
+    path = storage.temp_path()
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+
+async def _ref_counts(storage: FileStorage) -> dict:
+    async with storage.session_maker() as db:
+        return dict((await db.execute(select(StoredBlob.sha256, StoredBlob.ref_count))).all())
+
+
+def test_directories_created_lazily(tmp_path):
+    """创建文件存储不会创建目录，第一次取暂存路径时才创建"""
+    storage = FileStorage(str(tmp_path / "blobs"))
+    assert not os.path.exists(storage.root)
+    storage.temp_path()
+    assert os.path.isdir(storage.temp_dir)
+
+
+@pytest.mark.asyncio
+async def test_same_content_stored_once(storage):
+    """相同内容只保存一份，引用数等于文件名数，源文件被移动或删除"""
+    first = _source(storage, b"same")
+    second = _source(storage, b"same")
+    a = await storage.store("a.pdf", first)
+    b = await storage.store("b.pdf", second)
+
+    assert a.sha256 == b.sha256
+    assert not os.path.exists(first) and not os.path.exists(second)
+    assert await storage.resolve("a.pdf") == await storage.resolve("b.pdf") == storage.blob_path(a.sha256)
+    assert await _ref_counts(storage) == {a.sha256: 2}
+
+    assert await storage.release("a.pdf")
+    assert os.path.exists(storage.blob_path(a.sha256))
+    assert await storage.release("b.pdf")
+    assert not os.path.exists(storage.blob_path(a.sha256))
+    assert await _ref_counts(storage) == {}
+
+
+@pytest.mark.asyncio
+async def test_replace_releases_old_content(storage):
+    """同名文件保存新内容时替换映射，旧内容不再被引用时删除"""
+    old = await storage.store("a.pdf", _source(storage, b"old"))
+    new = await storage.store("a.pdf", _source(storage, b"new"))
+
+    assert not os.path.exists(storage.blob_path(old.sha256))
+    with open(await storage.resolve("a.pdf"), "rb") as f:
+        assert f.read() == b"new"
+    assert await _ref_counts(storage) == {new.sha256: 1}
+    # 保存相同内容不改变引用数
+    await storage.store("a.pdf", _source(storage, b"new"))
+    assert await _ref_counts(storage) == {new.sha256: 1}
+
+
+@pytest.mark.asyncio
+async def test_release_only_expired(storage):
+    """到期清理只删除过期时间不晚于指定时间的临时文件"""
+    await storage.store("temp_a.pdf", _source(storage, b"a"), expires_at=100.0)
+    assert await storage.expiring() == [(100.0, "temp_a.pdf")]
+    assert not await storage.release("temp_a.pdf", expired_before=50.0)
+
+    # 重新保存为长期文件后不再到期
+    await storage.store("temp_a.pdf", _source(storage, b"a"))
+    assert not await storage.release("temp_a.pdf", expired_before=200.0)
+    assert await storage.release("temp_a.pdf")
+    assert not await storage.release("temp_a.pdf")
+
+
+@pytest.mark.asyncio
+async def test_resolve_falls_back_to_legacy_dir(storage):
+    os.makedirs(storage.legacy_dir)
+    with open(os.path.join(storage.legacy_dir, "old.pdf"), "wb") as f:
+        f.write(b"legacy")
+    assert await storage.resolve("resources/old.pdf") == os.path.join(storage.legacy_dir, "old.pdf")
+    assert await storage.resolve("missing.pdf") is None
+    with pytest.raises(ValueError):
+        await storage.store("../a.pdf", _source(storage, b"x"))
+
+
+@pytest.mark.asyncio
+async def test_deadlock_is_retried(storage, sqlite_session_maker):
+    """死锁时重新执行事务，源文件在提交成功前保持原位"""
+    storage.session_maker = FlakySessions(sqlite_session_maker, 1, deadlock())
+    mapping = await storage.store("a.pdf", _source(storage, b"content"))
+    assert os.path.exists(storage.blob_path(mapping.sha256))
+    assert await _ref_counts(storage) == {mapping.sha256: 1}
+
+
+@pytest.mark.asyncio
+async def test_failed_replace_keeps_old_content(storage, sqlite_session_maker):
+    """替换的事务提交失败时，旧映射和旧内容文件都保留，新内容不会被放置"""
+    old = await storage.store("a.pdf", _source(storage, b"old"))
+    storage.session_maker = FlakySessions(sqlite_session_maker, FileStorage.MAX_RETRIES, deadlock())
+    source = _source(storage, b"new")
+    with pytest.raises(OperationalError):
+        await storage.store("a.pdf", source)
+
+    storage.session_maker = sqlite_session_maker
+    assert not os.path.exists(source)
+    assert await storage.resolve("a.pdf") == storage.blob_path(old.sha256)
+    assert os.listdir(os.path.dirname(storage.blob_path(old.sha256))) == [old.sha256]
+    assert await _ref_counts(storage) == {old.sha256: 1}
+
+
+@pytest.mark.asyncio
+async def test_collect_garbage_removes_unreferenced(storage):
+    """回收之前删除失败遗留的、引用数为0的内容"""
+    kept = await storage.store("a.pdf", _source(storage, b"kept"))
+    orphan = await storage.store("b.pdf", _source(storage, b"orphan"))
+    async with storage.session_maker() as db:
+        async with db.begin():
+            await db.execute(StoredFile.__table__.delete().where(StoredFile.name == "b.pdf"))
+            blob = (await db.execute(select(StoredBlob).where(StoredBlob.sha256 == orphan.sha256))).scalar_one()
+            blob.ref_count = 0
+
+    assert await storage.collect_garbage() == 1
+    assert not os.path.exists(storage.blob_path(orphan.sha256))
+    assert os.path.exists(storage.blob_path(kept.sha256))
+    assert await storage.collect_garbage() == 0
+
+
+@pytest.mark.asyncio
+async def test_delete_images_releases_unreferenced_files(storage, sqlite_session_maker, monkeypatch):
+    """删除印章记录后只释放不再被任何记录引用的图片"""
+    shared = await storage.store("shared.png", _source(storage, b"shared"))
+    single = await storage.store("single.png", _source(storage, b"single"))
+    now = datetime.now().isoformat(timespec="seconds")
+    async with sqlite_session_maker() as db:
+        db.add_all([
+            StampImage(id=1, user_id=1, image_path="resources/shared.png", created_at=now, updated_at=now),
+            StampImage(id=2, user_id=2, image_path="resources/shared.png", created_at=now, updated_at=now),
+            StampImage(id=3, user_id=1, image_path="resources/single.png", created_at=now, updated_at=now),
+        ])
+        await db.commit()
+
+    app = FastAPI()
+    app.include_router(stamp_api.router)
+
+    async def override_session():
+        async with sqlite_session_maker() as db:
+            yield db
+
+    app.dependency_overrides[get_async_session] = override_session
+    app.dependency_overrides[current_active_user] = lambda: SimpleNamespace(id=1)
+    monkeypatch.setattr(stamp_api, "file_storage", storage)
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        response = (await client.post("/stamp/delete-images", json=[1, 3])).json()
+
+    assert response["code"] == 200
+    assert await storage.resolve("shared.png") == storage.blob_path(shared.sha256)
+    assert await storage.resolve("single.png") is None
+    assert not os.path.exists(storage.blob_path(single.sha256))
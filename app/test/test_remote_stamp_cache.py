@@ -0,0 +1,187 @@
+import hashlib
+import os
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.core.http_client import close_http_client
+from app.services.download_service import DownloadError
+from app.services.remote_stamp_cache import RemoteStampCache
+
+
+class StampServer:
+    """模拟CDN的本地HTTP服务，支持ETag和Last-Modified条件请求"""
+
+    def __init__(self):
+        self.files = {}         # 路径 -> (内容, 是否返回ETag)
+        self.requests = []      # (路径, 状态码, 请求头)
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in server.files:
+                    self.send_response(404)
+                    self.end_headers()
+                    server.requests.append((self.path, 404, dict(self.headers)))
+                    return
+                content, use_etag = server.files[self.path]
+                etag = f'"{hashlib.md5(content).hexdigest()}"'
+                last_modified = formatdate(1700000000 + len(content), usegmt=True)
+                if (use_etag and self.headers.get("If-None-Match") == etag) or \
+                        (not use_etag and self.headers.get("If-Modified-Since") == last_modified):
+                    self.send_response(304)
+                    self.end_headers()
+                    server.requests.append((self.path, 304, dict(self.headers)))
+                    return
+                self.send_response(200)
+                if use_etag:
+                    self.send_header("ETag", etag)
+                else:
+                    self.send_header("Last-Modified", last_modified)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+                server.requests.append((self.path, 200, dict(self.headers)))
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}{path}"
+
+    def statuses(self) -> list:
+        return [status for _, status, _ in self.requests]
+
+
+@pytest.fixture
+def server():
+    server = StampServer()
+    yield server
+    server.httpd.shutdown()
+
+
+@pytest.fixture
+async def http_client():
+    yield
+    # 共享客户端绑定在当前事件循环上，每个测试结束后关闭
+    await close_http_client()
+
+
+@pytest.mark.asyncio
+async def test_revalidates_with_etag(server, tmp_path, http_client):
+    """ETag未变化时返回304，缓存文件内容和修改时间保持不变"""
+    server.files["/seal.png"] = (b"seal-v1" * 100, True)
+    cache = RemoteStampCache(str(tmp_path), max_bytes=1024 * 1024)
+
+    async with cache.fetch(server.url("/seal.png")) as path:
+        first_mtime = os.path.getmtime(path)
+        with open(path, "rb") as f:
+            assert f.read() == b"seal-v1" * 100
+
+    async with cache.fetch(server.url("/seal.png")) as path:
+        assert os.path.getmtime(path) == first_mtime
+
+    assert server.statuses() == [200, 304]
+    assert server.requests[1][2]["If-None-Match"] == f'"{hashlib.md5(b"seal-v1" * 100).hexdigest()}"'
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_refreshes_changed_image(server, tmp_path, http_client):
+    """远程图片变化后重新下载"""
+    server.files["/seal.png"] = (b"seal-v1", True)
+    cache = RemoteStampCache(str(tmp_path), max_bytes=1024 * 1024)
+    async with cache.fetch(server.url("/seal.png")):
+        pass
+
+    server.files["/seal.png"] = (b"seal-v2-changed", True)
+    async with cache.fetch(server.url("/seal.png")) as path:
+        with open(path, "rb") as f:
+            assert f.read() == b"seal-v2-changed"
+    assert server.statuses() == [200, 200]
+
+
+@pytest.mark.asyncio
+async def test_revalidates_with_last_modified_after_restart(server, tmp_path, http_client):
+    """没有ETag时使用If-Modified-Since，重新创建缓存后仍能复用磁盘上的文件"""
+    server.files["/seal.png"] = (b"seal" * 10, False)
+    async with RemoteStampCache(str(tmp_path), max_bytes=1024).fetch(server.url("/seal.png")):
+        pass
+
+    cache = RemoteStampCache(str(tmp_path), max_bytes=1024)
+    async with cache.fetch(server.url("/seal.png")):
+        pass
+    assert server.statuses() == [200, 304]
+    assert "If-Modified-Since" in server.requests[1][2]
+
+
+@pytest.mark.asyncio
+async def test_evicts_least_recently_used(server, tmp_path, http_client):
+    """超过大小上限时淘汰最久未使用的图片"""
+    for name in ("a", "b", "c"):
+        server.files[f"/{name}.png"] = (name.encode() * 100, True)
+    cache = RemoteStampCache(str(tmp_path), max_bytes=250)
+
+    for name in ("a", "b", "a", "c"):
+        async with cache.fetch(server.url(f"/{name}.png")):
+            pass
+
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["evictions"] == 1
+    # b最久未使用，已被淘汰，需要重新下载；a仍在缓存中
+    server.requests.clear()
+    async with cache.fetch(server.url("/a.png")):
+        pass
+    async with cache.fetch(server.url("/b.png")):
+        pass
+    assert server.statuses() == [304, 200]
+    # 每个条目包含图片、元数据和.pin文件
+    assert len(os.listdir(tmp_path)) == 6
+
+
+@pytest.mark.asyncio
+async def test_shared_directory_respects_other_instance(server, tmp_path, http_client):
+    """两个实例（模拟两个工作进程）共用一个目录：共享索引和大小上限，淘汰不会删除另一实例正在使用的文件"""
+    server.files["/a.png"] = (b"a" * 200, True)
+    server.files["/b.png"] = (b"b" * 200, True)
+    first = RemoteStampCache(str(tmp_path), max_bytes=300)
+    second = RemoteStampCache(str(tmp_path), max_bytes=300)
+
+    async with first.fetch(server.url("/a.png")) as path:
+        # a最久未使用，但正在被第一个实例使用，第二个实例超出上限时只能淘汰自己刚用完的b
+        async with second.fetch(server.url("/b.png")):
+            pass
+        assert second.stats()["evictions"] == 1
+        with open(path, "rb") as f:
+            assert f.read() == b"a" * 200
+
+        # 第二个实例直接复用第一个实例下载的文件
+        async with second.fetch(server.url("/a.png")) as second_path:
+            assert second_path == path
+    assert server.statuses() == [200, 200, 304]
+
+    # 使用结束后目录总大小在上限之内
+    stats = first.stats()
+    assert stats["entries"] == 1 and stats["bytes"] <= 300
+    assert second.stats()["entries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_download_errors(server, tmp_path, http_client):
+    """下载失败或超过大小限制时抛出DownloadError且不留下文件"""
+    server.files["/big.png"] = (b"x" * 2048, True)
+    cache = RemoteStampCache(str(tmp_path), max_bytes=1024 * 1024, max_file_bytes=1024)
+
+    with pytest.raises(DownloadError):
+        async with cache.fetch(server.url("/missing.png")):
+            pass
+    with pytest.raises(DownloadError):
+        async with cache.fetch(server.url("/big.png")):
+            pass
+    assert os.listdir(tmp_path) == []
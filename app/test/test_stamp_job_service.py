@@ -0,0 +1,150 @@
+import os
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.future import select
+
+from app.api import stamp as stamp_api
+from app.core.security import current_active_user
+from app.db.database import add_missing_columns, get_async_session
+from app.models.stamp_job import StampJob, StampJobStatus
+from app.services import stamp_job_service
+from app.services.stamp_job_service import WORKER_ID, fail_stale_jobs, heartbeat_jobs
+
+
+@pytest.fixture
+def session_maker(sqlite_session_maker, monkeypatch):
+    """任务服务使用内存SQLite"""
+    monkeypatch.setattr(stamp_job_service, "async_session_maker", sqlite_session_maker)
+    return sqlite_session_maker
+
+
+async def _add_job(session_maker, job_id: str, owner, heartbeat_at, status=StampJobStatus.RUNNING,
+                   updated_at: str = None, user_id: int = 1, output_file: str = None) -> None:
+    now = datetime.now().isoformat(timespec="seconds")
+    async with session_maker() as db:
+        db.add(StampJob(id=job_id, user_id=user_id, input_file="http://example.com/a.pdf",
+                        stamp_file="http://example.com/s.png", stamp_type="both", status=status.value, progress=0,
+                        owner=owner, heartbeat_at=heartbeat_at, output_file=output_file,
+                        created_at=now, updated_at=updated_at or now))
+        await db.commit()
+
+
+async def _statuses(session_maker) -> dict:
+    async with session_maker() as db:
+        result = await db.execute(select(StampJob.id, StampJob.status))
+        return dict(result.all())
+
+
+@pytest.mark.asyncio
+async def test_only_jobs_of_stopped_workers_fail(session_maker):
+    """启动清理只处理已退出进程的任务，其他仍在执行的进程的任务不受影响"""
+    now = time.time()
+    host = WORKER_ID.split(":")[0]
+    await _add_job(session_maker, "mine", WORKER_ID, now - 1000)
+    await _add_job(session_maker, "live_peer", "other-host:123:abcd", now - 10)
+    await _add_job(session_maker, "stale_peer", "other-host:456:abcd", now - 1000)
+    await _add_job(session_maker, "dead_local", f"{host}:{2 ** 22 + 1}:abcd", now)  # 超出pid_max，进程一定不存在
+    await _add_job(session_maker, "legacy", None, None, status=StampJobStatus.PENDING, updated_at="2000-01-01T00:00:00")
+    await _add_job(session_maker, "finished", "other-host:456:abcd", now - 1000, status=StampJobStatus.SUCCEEDED)
+
+    assert await fail_stale_jobs(now) == 3
+    assert await _statuses(session_maker) == {
+        "mine": "running", "live_peer": "running", "stale_peer": "failed",
+        "dead_local": "failed", "legacy": "failed", "finished": "succeeded",
+    }
+
+
+def test_existing_table_gets_new_columns():
+    """已存在的旧版任务表在启动时补充owner和heartbeat_at列"""
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE stamp_jobs (id VARCHAR(32) PRIMARY KEY, status VARCHAR(16))"))
+        add_missing_columns(conn)
+        columns = {column["name"] for column in inspect(conn).get_columns("stamp_jobs")}
+    assert {"owner", "heartbeat_at", "error", "output_file"} <= columns
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_refreshes_own_active_jobs(session_maker):
+    await _add_job(session_maker, "mine", WORKER_ID, 1.0)
+    await _add_job(session_maker, "peer", "other-host:1:abcd", 1.0)
+    await _add_job(session_maker, "done", WORKER_ID, 1.0, status=StampJobStatus.FAILED)
+
+    assert await heartbeat_jobs(500.0) == 1
+    async with session_maker() as db:
+        result = await db.execute(select(StampJob.id, StampJob.heartbeat_at))
+        assert dict(result.all()) == {"mine": 500.0, "peer": 1.0, "done": 1.0}
+
+
+@pytest_asyncio.fixture
+async def api_client(session_maker, monkeypatch):
+    """只包含盖章路由的应用，登录用户为1号用户，任务不实际执行"""
+    app = FastAPI()
+    app.include_router(stamp_api.router)
+
+    async def override_session():
+        async with session_maker() as db:
+            yield db
+
+    app.dependency_overrides[get_async_session] = override_session
+    app.dependency_overrides[current_active_user] = lambda: SimpleNamespace(id=1)
+    started = []
+    monkeypatch.setattr(stamp_api, "start_stamp_job", lambda job, config: started.append(job.id))
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        client.started = started
+        yield client
+
+
+@pytest.mark.asyncio
+async def test_submit_and_status(api_client, session_maker):
+    response = (await api_client.post("/stamp/jobs", params={"input_file": "http://example.com/a.pdf",
+                                                            "stamp_file": "http://example.com/s.png"})).json()
+    assert response["code"] == 200
+    job_id = response["data"]["job_id"]
+    assert api_client.started == [job_id]
+
+    async with session_maker() as db:
+        job = (await db.execute(select(StampJob).filter(StampJob.id == job_id))).scalars().one()
+        assert job.owner == WORKER_ID and job.heartbeat_at is not None
+
+    status = (await api_client.get(f"/stamp/jobs/{job_id}")).json()
+    assert status["code"] == 200
+    assert status["data"]["status"] == "pending" and "output_file_path" not in status["data"]
+
+    bad_input = (await api_client.post("/stamp/jobs", params={"input_file": "http://example.com/a.txt",
+                                                             "stamp_file": "http://example.com/s.png"})).json()
+    assert bad_input["code"] == 2001
+
+
+@pytest.mark.asyncio
+async def test_result_by_status(api_client, session_maker, monkeypatch, tmp_path):
+    output_path = tmp_path / "result.pdf"
+    output_path.write_bytes(b"%PDF-result")
+
+    async def resolve(name):
+        return str(output_path) if name == "temp_job_done.pdf" else None
+
+    monkeypatch.setattr(stamp_api.file_storage, "resolve", resolve)
+    await _add_job(session_maker, "pending", WORKER_ID, time.time(), status=StampJobStatus.PENDING)
+    await _add_job(session_maker, "failed", WORKER_ID, time.time(), status=StampJobStatus.FAILED)
+    await _add_job(session_maker, "done", WORKER_ID, time.time(), status=StampJobStatus.SUCCEEDED,
+                   output_file="temp_job_done.pdf")
+    await _add_job(session_maker, "expired", WORKER_ID, time.time(), status=StampJobStatus.SUCCEEDED,
+                   output_file="temp_job_gone.pdf")
+    await _add_job(session_maker, "other_user", WORKER_ID, time.time(), user_id=2)
+
+    assert (await api_client.get("/stamp/jobs/pending/result")).json()["code"] == 202
+    assert (await api_client.get("/stamp/jobs/failed/result")).json()["code"] == 500
+    assert (await api_client.get("/stamp/jobs/expired/result")).json()["code"] == 410
+    assert (await api_client.get("/stamp/jobs/other_user/result")).json()["code"] == 404
+    response = await api_client.get("/stamp/jobs/done/result")
+    assert response.status_code == 200 and response.content == b"%PDF-result"
+    assert "a_stamped.pdf" in response.headers["content-disposition"]
+    assert os.path.exists(output_path)
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from app.services.temp_file_registry import TempFileRegistry
+
+
+def _touch(directory, name: str) -> str:
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(b"%PDF")
+    return path
+
+
+@pytest.mark.asyncio
+async def test_sweep_deletes_only_due_files(tmp_path):
+    """只删除已到期的文件，重新登记的文件以最新的到期时间为准"""
+    registry = TempFileRegistry(str(tmp_path), ttl_seconds=60)
+    now = time.time()
+    registry.register(_touch(tmp_path, "temp_a.pdf"), ttl_seconds=10)
+    registry.register(_touch(tmp_path, "temp_b.pdf"), ttl_seconds=100)
+    registry.register(_touch(tmp_path, "temp_c.pdf"), ttl_seconds=10)
+    registry.register(os.path.join(tmp_path, "temp_c.pdf"), ttl_seconds=100)
+
+    assert await registry.sweep(now + 50) == 1
+    assert sorted(os.listdir(tmp_path)) == ["temp_b.pdf", "temp_c.pdf"]
+    assert await registry.sweep(now + 200) == 2
+    assert registry.stats()["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_reconcile_registers_unknown_temp_files(tmp_path):
+    """对账时按ctime补登其他进程生成的临时文件，非temp_文件和已登记的文件不受影响"""
+    registry = TempFileRegistry(str(tmp_path), ttl_seconds=60)
+    _touch(tmp_path, "temp_other_worker.pdf")
+    _touch(tmp_path, "stamp.png")
+    registry.register(_touch(tmp_path, "temp_mine.pdf"), ttl_seconds=1000)
+
+    assert await registry.reconcile() == 1
+    assert await registry.reconcile() == 0
+    assert await registry.sweep(time.time() + 120) == 1
+    assert sorted(os.listdir(tmp_path)) == ["stamp.png", "temp_mine.pdf"]
+
+
+@pytest.mark.asyncio
+async def test_single_reconciler(tmp_path):
+    """同一目录只有一个进程持有对账锁，释放后其他进程可以接替"""
+    first = TempFileRegistry(str(tmp_path), ttl_seconds=60)
+    second = TempFileRegistry(str(tmp_path), ttl_seconds=60)
+    try:
+        assert first.is_reconciler()
+        assert not second.is_reconciler()
+        await first.stop()
+        assert second.is_reconciler()
+    finally:
+        await first.stop()
+        await second.stop()
+
+
+@pytest.mark.asyncio
+async def test_background_task_wakes_for_earlier_deadline(tmp_path):
+    """清理任务在等待较晚的到期时间时，新登记的较早文件也能按时删除"""
+    registry = TempFileRegistry(str(tmp_path), ttl_seconds=3600)
+    registry.start()
+    try:
+        registry.register(_touch(tmp_path, "temp_late.pdf"))
+        registry.register(_touch(tmp_path, "temp_soon.pdf"), ttl_seconds=0.2)
+        deadline = time.time() + 5
+        while os.path.exists(os.path.join(tmp_path, "temp_soon.pdf")) and time.time() < deadline:
+            await asyncio.sleep(0.05)
+        assert os.path.exists(os.path.join(tmp_path, "temp_late.pdf"))
+        assert not os.path.exists(os.path.join(tmp_path, "temp_soon.pdf"))
+    finally:
+        await registry.stop()
@@ -0,0 +1,152 @@
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import UploadFile
+from starlette.requests import Request
+
+from app.services import upload_service
+from app.services.upload_service import UploadError, file_kind, receive_multipart, receive_upload
+
+
+def _upload(content: bytes, size: int = None) -> UploadFile:
+    return UploadFile(io.BytesIO(content), size=size, filename="file")
+
+
+@pytest.mark.asyncio
+async def test_streams_in_chunks_and_hashes(tmp_path, monkeypatch):
+    """分块写入磁盘，返回的哈希与文件内容一致"""
+    monkeypatch.setattr(upload_service, "UPLOAD_CHUNK_SIZE", 1024)
+    content = b"%PDF-1.7\n" + os.urandom(10 * 1024)
+    dest = str(tmp_path / "upload")
+    reads = []
+    upload = _upload(content)
+    original_read = upload.read
+
+    async def read(size=-1):
+        reads.append(size)
+        return await original_read(size)
+
+    upload.read = read
+    sha256, size = await receive_upload(upload, dest, "pdf")
+    assert (sha256, size) == (hashlib.sha256(content).hexdigest(), len(content))
+    assert open(dest, "rb").read() == content
+    assert reads and all(size == 1024 for size in reads)
+
+
+@pytest.mark.asyncio
+async def test_rejects_wrong_signature(tmp_path):
+    """文件头与类型不符时拒绝，不留下部分文件"""
+    dest = str(tmp_path / "upload")
+    with pytest.raises(UploadError):
+        await receive_upload(_upload(b"<html>not a png</html>"), dest, "png")
+    assert not os.path.exists(dest)
+    with pytest.raises(UploadError):
+        await receive_upload(_upload(b"%PDF-1.7"), dest, "exe")
+
+
+@pytest.mark.asyncio
+async def test_enforces_size_limit_while_receiving(tmp_path, monkeypatch):
+    """未声明大小时在接收过程中超限即停止，声明了大小时直接拒绝"""
+    monkeypatch.setattr(upload_service, "UPLOAD_CHUNK_SIZE", 1024)
+    dest = str(tmp_path / "upload")
+    content = b"\x89PNG\r\n\x1a\n" + bytes(8 * 1024)
+    with pytest.raises(UploadError, match="超过限制"):
+        await receive_upload(_upload(content), dest, "png", max_bytes=4096)
+    assert not os.path.exists(dest)
+    with pytest.raises(UploadError, match="超过限制"):
+        await receive_upload(_upload(b"", size=10 * 1024), dest, "png", max_bytes=4096)
+
+
+BOUNDARY = "testboundary"
+
+
+def _part(name: str, filename: str, content_type: str, content: bytes) -> bytes:
+    return (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"{name}\"; filename=\"{filename}\"\r\n"
+            f"Content-Type: {content_type}\r\n\r\n").encode() + content + b"\r\n"
+
+
+def _request(body: bytes, chunk_size: int = 1024):
+    """按chunk_size分块送出请求体的Request，返回(请求, 已送出的分块数列表)"""
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+    sent = []
+
+    async def receive():
+        sent.append(1)
+        return {"type": "http.request", "body": chunks[len(sent) - 1], "more_body": len(sent) < len(chunks)}
+
+    scope = {"type": "http", "method": "POST", "path": "/", "query_string": b"",
+             "headers": [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]}
+    return Request(scope, receive), chunks, sent
+
+
+def _dest_factory(tmp_path):
+    paths = iter(str(tmp_path / f"part{i}") for i in range(100))
+    return lambda: next(paths)
+
+
+@pytest.mark.asyncio
+async def test_multipart_streams_files_and_hashes(tmp_path):
+    """逐个文件写入暂存路径，忽略其他字段，返回的哈希与内容一致"""
+    pdf = b"%PDF-1.7\n" + os.urandom(5000)
+    png = b"\x89PNG\r\n\x1a\n" + os.urandom(3000)
+    body = (_part("files", "../a.pdf", "application/pdf", pdf) + _part("other", "x.pdf", "application/pdf", pdf)
+            + _part("files", "b.png", "image/png", png) + f"--{BOUNDARY}--\r\n".encode())
+    request, _, _ = _request(body)
+    files = await receive_multipart(request, "files", lambda name, _: file_kind(name), _dest_factory(tmp_path))
+    assert [(f.filename, f.size, f.sha256) for f in files] == [
+        ("a.pdf", len(pdf), hashlib.sha256(pdf).hexdigest()),
+        ("b.png", len(png), hashlib.sha256(png).hexdigest()),
+    ]
+    assert open(files[0].path, "rb").read() == pdf
+    assert open(files[1].path, "rb").read() == png
+
+
+@pytest.mark.asyncio
+async def test_multipart_stops_reading_once_limit_crossed(tmp_path):
+    """超过大小限制时立即停止读取请求体，已接收的文件和部分文件都被删除"""
+    small = b"%PDF-1.7\n" + bytes(1000)
+    big = b"%PDF-1.7\n" + bytes(64 * 1024)
+    body = (_part("files", "a.pdf", "application/pdf", small) + _part("files", "b.pdf", "application/pdf", big)
+            + f"--{BOUNDARY}--\r\n".encode())
+    request, chunks, sent = _request(body)
+    with pytest.raises(UploadError, match="超过限制"):
+        await receive_multipart(request, "files", lambda name, _: file_kind(name), _dest_factory(tmp_path),
+                                max_bytes=8 * 1024)
+    assert len(sent) < len(chunks) // 2
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.asyncio
+async def test_multipart_rejects_before_reading_file_content(tmp_path):
+    """文件类型和数量在接收文件内容之前检查"""
+    content = b"\x89PNG\r\n\x1a\n" + bytes(32 * 1024)
+
+    def image_kind(name, content_type):
+        if content_type != "image/png":
+            raise UploadError("只支持 PNG 和 JPEG 格式的图片")
+        return "png"
+
+    request, chunks, sent = _request(_part("images", "a.gif", "image/gif", content) + f"--{BOUNDARY}--\r\n".encode())
+    with pytest.raises(UploadError, match="只支持"):
+        await receive_multipart(request, "images", image_kind, _dest_factory(tmp_path))
+    assert len(sent) == 1
+
+    body = (_part("images", "a.png", "image/png", b"\x89PNG\r\n\x1a\n")
+            + _part("images", "b.png", "image/png", content) + f"--{BOUNDARY}--\r\n".encode())
+    request, chunks, sent = _request(body)
+    with pytest.raises(UploadError, match="最多"):
+        await receive_multipart(request, "images", image_kind, _dest_factory(tmp_path), max_files=1)
+    assert len(sent) == 1
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.asyncio
+async def test_multipart_rejects_truncated_body(tmp_path):
+    """请求体在文件中途结束时拒绝，不留下部分文件"""
+    body = _part("files", "a.pdf", "application/pdf", b"%PDF-1.7\n" + bytes(5000))[:3000]
+    request, _, _ = _request(body)
+    with pytest.raises(UploadError, match="不完整"):
+        await receive_multipart(request, "files", lambda name, _: file_kind(name), _dest_factory(tmp_path))
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,72 @@
+"""
+BOTH模式基准测试
+
+对比两种同时添加电子章和骑缝章的处理方式：
+- legacy: 先盖骑缝章，完整保存临时文件后重新打开，再盖电子章并保存
+- fused: 在内存中一次遍历页面盖两种章，只保存一次（StampProcessor当前实现）
+
+用法:
+    python benchmarks/bench_both_mode.py [页数 ...]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import fitz
+
+# 获取项目根目录
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(current_dir))
+
+from stamp.stamp_config import StampConfig
+from stamp.stamp_processor import StampProcessor
+from stamp.stamp_type import StampType
+from synthetic import make_pdf, make_seal
+
+
+def run_legacy(processor: StampProcessor, input_file: str, stamp_file: str, output_file: str) -> int:
+    """按旧流程处理BOTH模式，返回写盘字节数"""
+    temp_output = output_file.replace('.pdf', '_temp.pdf')
+    pdf_doc = fitz.open(input_file)
+    processor.seal_stamper.apply_stamp(pdf_doc, stamp_file)
+    pdf_doc.save(temp_output, garbage=4, deflate=True)
+    pdf_doc.close()
+    pdf_doc = fitz.open(temp_output)
+    processor.electronic_stamper.apply_stamp(pdf_doc, stamp_file)
+    pdf_doc.save(output_file, garbage=4, deflate=True)
+    pdf_doc.close()
+    bytes_written = os.path.getsize(temp_output) + os.path.getsize(output_file)
+    os.remove(temp_output)
+    return bytes_written
+
+
+def run_fused(processor: StampProcessor, input_file: str, stamp_file: str, output_file: str) -> int:
+    """按单次遍历流程处理BOTH模式，返回写盘字节数"""
+    processor.process(input_file, stamp_file, output_file, StampType.BOTH)
+    return os.path.getsize(output_file)
+
+
+def main():
+    """主函数"""
+    page_counts = [int(arg) for arg in sys.argv[1:]] or [50, 300, 1000]
+    processor = StampProcessor(StampConfig(seal_count=3, pages_per_seal=12))
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        stamp_file = make_seal(os.path.join(work_dir, "seal.png"))
+        print(f"{'页数':>6} {'模式':>8} {'耗时(s)':>10} {'写盘(KB)':>10}")
+        for page_count in page_counts:
+            input_file = make_pdf(os.path.join(work_dir, f"input_{page_count}.pdf"), page_count)
+            for name, runner in (("legacy", run_legacy), ("fused", run_fused)):
+                output_file = os.path.join(work_dir, f"output_{name}_{page_count}.pdf")
+                start = time.perf_counter()
+                bytes_written = runner(processor, input_file, stamp_file, output_file)
+                elapsed = time.perf_counter() - start
+                print(f"{page_count:>6} {name:>8} {elapsed:>10.3f} {bytes_written / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
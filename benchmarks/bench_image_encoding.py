@@ -0,0 +1,61 @@
+"""
+印章图像编码基准测试
+
+使用3000×3000的扫描件风格印章，对比不同DPI和编码方式下的输出大小、耗时和图像编码节省的字节数。
+首次处理包含原图解码、缩放、编码和节省字节数的基准测量，再次处理时这些结果已在进程内缓存：
+- png: 全彩PNG（原有行为）
+- palette: 调色板量化，单色印章只保留一种颜色
+- jpeg: JPEG颜色+透明度软蒙版
+
+用法:
+    python benchmarks/bench_image_encoding.py [页数]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 获取项目根目录
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(current_dir))
+
+from stamp.image_encoder import ImageEncoding
+from stamp.stamp_asset_cache import stamp_asset_cache
+from stamp.stamp_config import StampConfig
+from stamp.stamp_processor import StampProcessor
+from stamp.stamp_type import StampType
+from synthetic import make_pdf, make_scanned_seal
+
+# 对比的有效打印DPI，None表示不缩小
+DPI_OPTIONS = [None, 300, 150]
+
+
+def main():
+    """主函数"""
+    page_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        stamp_file = make_scanned_seal(os.path.join(work_dir, "seal.png"))
+        input_file = make_pdf(os.path.join(work_dir, "input.pdf"), page_count)
+        print(f"页数: {page_count}，印章文件: {os.path.getsize(stamp_file) / 1024:.1f}KB")
+        print(f"{'DPI':>6} {'编码':>8} {'首次(s)':>10} {'再次(s)':>10} {'输出(KB)':>10} {'节省(KB)':>10}")
+        for dpi in DPI_OPTIONS:
+            for encoding in ImageEncoding:
+                config = StampConfig(seal_count=3, pages_per_seal=12, stamp_dpi=dpi, image_encoding=encoding)
+                output_file = os.path.join(work_dir, f"output_{dpi}_{encoding.value}.pdf")
+                # 每种配置都从解码原图开始计时
+                stamp_asset_cache.clear()
+                elapsed = []
+                for _ in range(2):
+                    start = time.perf_counter()
+                    save_result = StampProcessor(config).process(input_file, stamp_file, output_file, StampType.BOTH)
+                    elapsed.append(time.perf_counter() - start)
+                print(f"{dpi or '-':>6} {encoding.value:>8} {elapsed[0]:>10.3f} {elapsed[1]:>10.3f} "
+                      f"{os.path.getsize(output_file) / 1024:>10.1f} {save_result.image_bytes_saved / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
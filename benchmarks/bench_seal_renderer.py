@@ -0,0 +1,66 @@
+"""
+骑缝章绘制方式基准测试
+
+对比两种骑缝章切片的绘制方式：
+- crop: 按组页数裁剪出多张切片PNG，每种切片分别嵌入
+- clip: 整枚印章只嵌入一次，各页通过表单XObject的裁剪区域显示切片
+
+每组页数分别为12、50、200页，文档恰好为一组。骑缝章切片宽度为印章宽度除以组页数后取整，
+为使200页一组时切片宽度不为0，印章尺寸使用80mm。
+
+用法:
+    python benchmarks/bench_seal_renderer.py [每组页数 ...]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import fitz
+
+# 获取项目根目录
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(current_dir))
+
+from stamp.seal_renderer import SealRenderer
+from stamp.stamp_config import StampConfig
+from stamp.stamp_processor import StampProcessor
+from stamp.stamp_type import StampType
+from synthetic import make_pdf, make_seal
+
+# 印章尺寸（毫米）
+STAMP_SIZE_MM = 80
+
+
+def count_images(path: str) -> int:
+    """统计输出文件中的图像对象数量（含透明度蒙版）"""
+    with fitz.open(path) as doc:
+        return sum(1 for xref in range(1, doc.xref_length())
+                   if doc.xref_get_key(xref, "Subtype") == ("name", "/Image"))
+
+
+def main():
+    """主函数"""
+    group_sizes = [int(arg) for arg in sys.argv[1:]] or [12, 50, 200]
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        stamp_file = make_seal(os.path.join(work_dir, "seal.png"))
+        print(f"{'每组页数':>8} {'方式':>6} {'耗时(s)':>10} {'输出(KB)':>10} {'图像数':>6}")
+        for group_size in group_sizes:
+            input_file = make_pdf(os.path.join(work_dir, f"input_{group_size}.pdf"), group_size)
+            for renderer in SealRenderer:
+                config = StampConfig(stamp_size_mm=STAMP_SIZE_MM, seal_count=3, pages_per_seal=group_size,
+                                     seal_renderer=renderer)
+                output_file = os.path.join(work_dir, f"output_{renderer.value}_{group_size}.pdf")
+                start = time.perf_counter()
+                StampProcessor(config).process(input_file, stamp_file, output_file, StampType.SEAL)
+                elapsed = time.perf_counter() - start
+                print(f"{group_size:>8} {renderer.value:>6} {elapsed:>10.3f} "
+                      f"{os.path.getsize(output_file) / 1024:>10.1f} {count_images(output_file):>6}")
+
+
+if __name__ == "__main__":
+    main()
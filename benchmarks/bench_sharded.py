@@ -0,0 +1,55 @@
+"""
+分片并行盖章基准测试
+
+对同一份大文档分别使用process（单进程）和不同工作进程数的process_sharded处理，
+输出耗时和相对单进程的加速比，用于观察随CPU核数增加的扩展性。
+
+用法:
+    python benchmarks/bench_sharded.py [页数] [工作进程数 ...]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 获取项目根目录
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(current_dir))
+
+from stamp.stamp_config import StampConfig
+from stamp.stamp_processor import StampProcessor
+from stamp.stamp_type import StampType
+from synthetic import make_pdf, make_seal
+
+
+def main():
+    """主函数"""
+    page_count = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    cpu_count = os.cpu_count() or 1
+    worker_counts = [int(arg) for arg in sys.argv[2:]] or sorted({1, 2, 4, 8, cpu_count})
+    processor = StampProcessor(StampConfig(seal_count=3, pages_per_seal=12))
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        stamp_file = make_seal(os.path.join(work_dir, "seal.png"))
+        input_file = make_pdf(os.path.join(work_dir, "input.pdf"), page_count)
+
+        print(f"页数: {page_count}，CPU核数: {cpu_count}")
+        print(f"{'进程数':>6} {'耗时(s)':>10} {'加速比':>8}")
+        baseline = None
+        for workers in worker_counts:
+            output_file = os.path.join(work_dir, f"output_{workers}.pdf")
+            start = time.perf_counter()
+            if workers == 1:
+                processor.process(input_file, stamp_file, output_file, StampType.BOTH)
+            else:
+                processor.process_sharded(input_file, stamp_file, output_file, StampType.BOTH, max_workers=workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{workers:>6} {elapsed:>10.3f} {baseline / elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
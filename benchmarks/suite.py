@@ -0,0 +1,347 @@
+"""
+盖章基准测试套件
+
+用合成数据（纯文本/扫描件、混合页面尺寸、多种分辨率的印章）逐项测量：
+- both / stamp / seal: StampProcessor.process的三种印章类型
+- insert_image: ImageInserter.insert_image
+- save_fast / save_compact / save_incremental: 不盖章，只打开文档并按各保存方式保存
+
+每项在独立的新进程中执行，记录耗时、每秒页数、进程峰值内存（RSS，base_rss_mb为导入模块后的内存）、
+输出字节数和保存步骤耗时。
+结果写入JSON文件，并按阈值文件检查；指定--baseline时还与上次的结果比较，超出容差视为性能回退。
+存在违反阈值或回退的项目时以退出码1结束，可直接用于CI。
+
+阈值文件格式（默认benchmarks/thresholds.json）:
+    {"rules": [{"match": "text-100-mixed/*/both", "max_seconds": 2, "max_output_bytes": 500000}, ...]}
+match为项目名的通配符，项目名为"文档/印章/操作"，同一项目匹配的所有规则都会检查。
+支持的限制: max_seconds、max_save_seconds、min_pages_per_second、max_peak_rss_mb、max_output_bytes
+
+用法:
+    python benchmarks/suite.py [--suite quick|full] [--output 结果.json] [--baseline 上次结果.json]
+                               [--thresholds 阈值.json] [--data-dir 合成数据目录] [--filter 通配符]
+"""
+import argparse
+import contextlib
+import fnmatch
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import List, Optional
+
+# 获取项目根目录
+current_dir = Path(__file__).parent
+project_root = current_dir.parent
+sys.path.insert(0, str(project_root))
+sys.path.insert(0, str(current_dir))
+
+import fitz
+
+from stamp.image_inserter import ImageInserter
+from stamp.save_profile import SaveProfile
+from stamp.stamp_config import StampConfig
+from stamp.stamp_processor import StampProcessor
+from stamp.stamp_type import StampType
+from stamp.stamp_utils import StampUtils
+from synthetic import A4_PORTRAIT, MIXED_PAGE_SIZES, make_pdf, make_scanned_seal, make_seal
+
+# 与基线比较时，输出字节数允许的相对增长；输出是确定的，超过即说明嵌入内容变化
+BYTES_TOLERANCE = 0.01
+# 与基线比较时，耗时增加不超过该秒数的不视为回退，避免毫秒级项目的计时抖动造成误报
+MIN_SECONDS_DELTA = 0.05
+
+# 盖章操作对应的印章类型
+STAMP_OPERATIONS = {"both": StampType.BOTH, "stamp": StampType.STAMP, "seal": StampType.SEAL}
+# 保存操作对应的保存方式
+SAVE_OPERATIONS = {f"save_{profile.value}": profile for profile in SaveProfile}
+
+# 阈值名称 -> (指标, 是否为上限)
+LIMITS = {
+    "max_seconds": ("seconds", True),
+    "max_save_seconds": ("save_seconds", True),
+    "min_pages_per_second": ("pages_per_second", False),
+    "max_peak_rss_mb": ("peak_rss_mb", True),
+    "max_output_bytes": ("output_bytes", True),
+}
+# 与基线比较的指标 -> 是否越大越差
+BASELINE_METRICS = {"seconds": True, "peak_rss_mb": True, "output_bytes": True, "pages_per_second": False}
+
+
+@dataclass(frozen=True)
+class DocumentSpec:
+    """合成文档规格"""
+    name: str
+    page_count: int
+    page_sizes: tuple = (A4_PORTRAIT,)
+    scanned: bool = False
+
+
+@dataclass(frozen=True)
+class SealSpec:
+    """合成印章规格，scanned为True时生成扫描件风格（抗锯齿、带噪声）的印章"""
+    name: str
+    size_px: int
+    scanned: bool = False
+
+
+@dataclass(frozen=True)
+class BenchCase:
+    """一个测量项目，保存操作与印章无关，seal为None"""
+    document: DocumentSpec
+    seal: Optional[SealSpec]
+    operation: str
+
+    @property
+    def name(self) -> str:
+        return f"{self.document.name}/{self.seal.name if self.seal else '-'}/{self.operation}"
+
+
+def _documents(page_counts: List[int], scanned_page_counts: List[int]) -> List[DocumentSpec]:
+    """纯文本文档使用混合页面尺寸，扫描件使用A4纵向"""
+    return ([DocumentSpec(f"text-{count}-mixed", count, MIXED_PAGE_SIZES) for count in page_counts]
+            + [DocumentSpec(f"scan-{count}", count, scanned=True) for count in scanned_page_counts])
+
+
+SUITES = {
+    "quick": (_documents([10, 100], [10]),
+              [SealSpec("seal-600", 600), SealSpec("scan-seal-3000", 3000, scanned=True)]),
+    "full": (_documents([10, 100, 1000, 5000], [10, 100, 1000]),
+             [SealSpec("seal-600", 600), SealSpec("seal-1500", 1500),
+              SealSpec("scan-seal-3000", 3000, scanned=True)]),
+}
+
+# 盖章配置：与接口服务的默认配置一致
+CONFIG = StampConfig(seal_count=3, pages_per_seal=12)
+
+
+def build_cases(suite: str, pattern: str = "*") -> List[BenchCase]:
+    """
+    生成测量项目：每份文档对每枚印章执行各盖章操作和insert_image，各保存方式每份文档只执行一次
+
+    Args:
+        suite (str): 套件名称，见SUITES
+        pattern (str): 项目名通配符，只保留匹配的项目
+
+    Returns:
+        list: 测量项目
+    """
+    documents, seals = SUITES[suite]
+    cases = []
+    for document in documents:
+        for seal in seals:
+            cases.extend(BenchCase(document, seal, operation) for operation in [*STAMP_OPERATIONS, "insert_image"])
+        cases.extend(BenchCase(document, None, operation) for operation in SAVE_OPERATIONS)
+    return [case for case in cases if fnmatch.fnmatch(case.name, pattern)]
+
+
+def prepare_inputs(cases: List[BenchCase], data_dir: str) -> dict:
+    """
+    生成测量项目用到的合成文档和印章，已存在的文件直接复用
+
+    Returns:
+        dict: 规格 -> 文件路径
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    paths = {}
+    for case in cases:
+        for spec in filter(None, [case.document, case.seal]):
+            if spec in paths:
+                continue
+            suffix = "pdf" if isinstance(spec, DocumentSpec) else "png"
+            path = os.path.join(data_dir, f"{spec.name}.{suffix}")
+            if not os.path.exists(path):
+                print(f"生成合成数据: {path}")
+                if isinstance(spec, DocumentSpec):
+                    make_pdf(path, spec.page_count, spec.page_sizes, scanned=spec.scanned)
+                elif spec.scanned:
+                    make_scanned_seal(path, spec.size_px)
+                else:
+                    make_seal(path, spec.size_px)
+            paths[spec] = path
+    return paths
+
+
+def peak_rss_mb() -> float:
+    """
+    当前进程的峰值内存
+
+    Linux上ru_maxrss在exec后保留父进程的峰值，新进程读到的是启动它的进程的内存，
+    因此优先读取/proc/self/status中按地址空间统计的VmHWM；其他系统使用ru_maxrss（macOS上以字节为单位）。
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def run_case(operation: str, page_count: int, input_file: str, stamp_file: Optional[str], output_dir: str) -> dict:
+    """
+    在工作进程中执行一个测量项目，每个项目使用新进程，峰值内存互不影响
+
+    Returns:
+        dict: 测量指标
+    """
+    output_file = os.path.join(output_dir, f"{operation}.pdf")
+    # 导入模块后的内存，峰值内存减去它即为本项目实际使用的内存
+    base_rss = peak_rss_mb()
+    # 处理器的完成提示会淹没测量结果，执行期间丢弃标准输出
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        if operation in STAMP_OPERATIONS:
+            save_result = StampProcessor(CONFIG).process(input_file, stamp_file, output_file,
+                                                         STAMP_OPERATIONS[operation])
+        elif operation == "insert_image":
+            save_result = ImageInserter.insert_image(input_file, stamp_file, output_file, page_number=0,
+                                                     size_mm=CONFIG.stamp_size_mm, margin_right_mm=20,
+                                                     margin_bottom_mm=20)
+        else:
+            profile = SAVE_OPERATIONS[operation]
+            with StampUtils.open_pdf(input_file, output_file, profile) as pdf_doc:
+                save_result = StampUtils.save_pdf(pdf_doc, output_file, profile)
+        seconds = time.perf_counter() - start
+
+    metrics = {
+        "seconds": round(seconds, 4),
+        "pages_per_second": round(page_count / seconds, 1),
+        "save_seconds": round(save_result.elapsed_seconds, 4),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "base_rss_mb": round(base_rss, 1),
+        "output_bytes": os.path.getsize(output_file),
+    }
+    os.remove(output_file)
+    return metrics
+
+
+def check_thresholds(name: str, metrics: dict, rules: List[dict]) -> List[str]:
+    """
+    按阈值规则检查一个项目的指标
+
+    Returns:
+        list: 违反阈值的说明，未违反时为空
+    """
+    violations = []
+    for rule in rules:
+        if not fnmatch.fnmatch(name, rule["match"]):
+            continue
+        for limit_name, limit in rule.items():
+            if limit_name == "match":
+                continue
+            if limit_name not in LIMITS:
+                raise ValueError(f"未知的阈值: {limit_name}")
+            metric, is_max = LIMITS[limit_name]
+            value = metrics[metric]
+            if (value > limit) if is_max else (value < limit):
+                violations.append(f"{metric}={value} {'超过上限' if is_max else '低于下限'}{limit}（规则 {rule['match']}）")
+    return violations
+
+
+def compare_baseline(metrics: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    与基线结果中的同名项目比较，耗时、吞吐和内存按tolerance、输出字节数按BYTES_TOLERANCE判断回退，
+    耗时增加不超过MIN_SECONDS_DELTA时不比较耗时和吞吐
+
+    Returns:
+        list: 回退的说明，未回退时为空
+    """
+    regressions = []
+    timing_stable = metrics["seconds"] - baseline["seconds"] <= MIN_SECONDS_DELTA
+    for metric, larger_is_worse in BASELINE_METRICS.items():
+        old, new = baseline[metric], metrics[metric]
+        allowed = BYTES_TOLERANCE if metric == "output_bytes" else tolerance
+        if old <= 0 or (metric in ("seconds", "pages_per_second") and timing_stable):
+            continue
+        change = (new - old) / old if larger_is_worse else (old - new) / old
+        if change > allowed:
+            regressions.append(f"{metric}: {old} -> {new}（回退{change:.0%}，容差{allowed:.0%}）")
+    return regressions
+
+
+def load_json(path: Optional[str]) -> Optional[dict]:
+    """读取JSON文件，路径为空时返回None"""
+    if not path:
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main() -> int:
+    """主函数，返回退出码"""
+    parser = argparse.ArgumentParser(description="盖章基准测试套件")
+    parser.add_argument("--suite", choices=sorted(SUITES), default="quick", help="测量项目集合")
+    parser.add_argument("--filter", default="*", help="只执行名称匹配该通配符的项目，如 '*/both'")
+    parser.add_argument("--output", default="bench_results.json", help="结果JSON文件")
+    parser.add_argument("--thresholds", default=str(current_dir / "thresholds.json"), help="阈值文件，为空时不检查")
+    parser.add_argument("--baseline", help="上次的结果JSON文件，用于检查回退")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="与基线比较时耗时、吞吐和内存允许的相对变化")
+    parser.add_argument("--data-dir", help="合成数据目录，指定后生成的数据可在多次运行间复用，默认使用临时目录")
+    args = parser.parse_args()
+
+    cases = build_cases(args.suite, args.filter)
+    if not cases:
+        parser.error(f"没有匹配 {args.filter} 的项目")
+    rules = (load_json(args.thresholds) or {}).get("rules", [])
+    baseline = {result["name"]: result for result in (load_json(args.baseline) or {}).get("results", [])}
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        inputs = prepare_inputs(cases, args.data_dir or os.path.join(work_dir, "data"))
+        print(f"{'项目':<40} {'耗时(s)':>9} {'页/秒':>9} {'保存(s)':>9} {'峰值内存(MB)':>12} {'输出(KB)':>10}")
+        # spawn启动的新进程不继承本进程的内存，max_tasks_per_child=1保证每个项目都在新进程中执行
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                                 max_tasks_per_child=1) as pool:
+            for case in cases:
+                stamp_file = inputs[case.seal] if case.seal else None
+                metrics = pool.submit(run_case, case.operation, case.document.page_count,
+                                      inputs[case.document], stamp_file, work_dir).result()
+                violations = check_thresholds(case.name, metrics, rules)
+                if case.name in baseline:
+                    violations += compare_baseline(metrics, baseline[case.name], args.tolerance)
+                results.append({
+                    "name": case.name,
+                    "document": asdict(case.document),
+                    "seal": asdict(case.seal) if case.seal else None,
+                    "operation": case.operation,
+                    **metrics,
+                    "violations": violations,
+                })
+                print(f"{case.name:<40} {metrics['seconds']:>9.3f} {metrics['pages_per_second']:>9.1f} "
+                      f"{metrics['save_seconds']:>9.3f} {metrics['peak_rss_mb']:>12.1f} "
+                      f"{metrics['output_bytes'] / 1024:>10.1f}")
+                for violation in violations:
+                    print(f"    ! {violation}")
+
+    failed = [result["name"] for result in results if result["violations"]]
+    report = {
+        "suite": args.suite,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": {
+            "python": platform.python_version(),
+            "pymupdf": fitz.VersionBind,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "passed": not failed,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"共{len(results)}项，{len(failed)}项违反阈值或回退，结果已写入 {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
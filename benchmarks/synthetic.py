@@ -0,0 +1,121 @@
+"""
+基准测试用的合成数据生成工具
+生成指定页数的PDF文档和透明背景的印章图片，不依赖resources目录下的样例文件
+"""
+import io
+
+import fitz
+from PIL import Image, ImageChops, ImageDraw, ImageFilter
+
+# A4纵向尺寸（点）
+A4_PORTRAIT = (595, 842)
+# 混合页面尺寸：A4纵向、A4横向、Letter、A3
+MIXED_PAGE_SIZES = (A4_PORTRAIT, (842, 595), (612, 792), (842, 1191))
+
+
+def make_pdf(path: str, page_count: int, page_sizes: tuple = (A4_PORTRAIT,), scanned: bool = False,
+             scan_dpi: int = 100) -> str:
+    """
+    生成测试PDF
+
+    Args:
+        path (str): 输出文件路径
+        page_count (int): 页数
+        page_sizes (tuple): 页面宽高（点）的列表，按页循环使用，如MIXED_PAGE_SIZES
+        scanned (bool): 是否生成扫描件，扫描件每页是一张铺满页面的灰度JPEG，否则为纯文本
+        scan_dpi (int): 扫描件图像的分辨率
+
+    Returns:
+        str: 生成的文件路径
+    """
+    doc = fitz.open()
+    scan_bases = {}
+    for index in range(page_count):
+        width, height = page_sizes[index % len(page_sizes)]
+        page = doc.new_page(width=width, height=height)
+        if scanned:
+            if (width, height) not in scan_bases:
+                scan_bases[(width, height)] = _scan_base((width, height), scan_dpi)
+            page.insert_image(page.rect, stream=_scan_page(scan_bases[(width, height)], index))
+        else:
+            page.insert_text((72, 72), f"Page {index + 1}", fontsize=14)
+    doc.save(path, deflate=True)
+    doc.close()
+    return path
+
+
+def _scan_base(page_size: tuple, dpi: int) -> Image.Image:
+    """生成某种页面尺寸的扫描底图：带轻微噪声的纸张和若干行灰色文字块"""
+    size = (round(page_size[0] / 72 * dpi), round(page_size[1] / 72 * dpi))
+    paper = Image.effect_noise(size, 8).point(lambda value: min(255, value + 110))
+    draw = ImageDraw.Draw(paper)
+    line_height = max(dpi // 6, 2)
+    margin = dpi
+    for top in range(margin, size[1] - margin, line_height * 2):
+        # 行长按行号变化，模拟段落
+        right = size[0] - margin - (top * 7 % (size[0] // 3))
+        draw.rectangle((margin, top, right, top + line_height), fill=60)
+    return paper.filter(ImageFilter.GaussianBlur(1))
+
+
+def _scan_page(base: Image.Image, index: int) -> bytes:
+    """在底图上写入页码后编码为JPEG，使每页图像都不相同"""
+    img = base.copy()
+    ImageDraw.Draw(img).text((img.width // 2, img.height - img.height // 20), f"- {index + 1} -", fill=0)
+    buffer = io.BytesIO()
+    img.save(buffer, format="JPEG", quality=75)
+    return buffer.getvalue()
+
+
+def make_seal(path: str, size_px: int = 600) -> str:
+    """
+    生成红色圆形印章图片（RGBA，透明背景）
+
+    Args:
+        path (str): 输出文件路径
+        size_px (int): 图片边长，单位为像素
+
+    Returns:
+        str: 生成的文件路径
+    """
+    img = Image.new('RGBA', (size_px, size_px), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    border = max(size_px // 20, 1)
+    draw.ellipse((border, border, size_px - border, size_px - border),
+                 outline=(220, 0, 0, 255), width=border)
+    center = size_px // 2
+    star = size_px // 8
+    draw.regular_polygon((center, center, star), 5, fill=(220, 0, 0, 255))
+    img.save(path)
+    return path
+
+
+def make_scanned_seal(path: str, size_px: int = 3000) -> str:
+    """
+    生成接近用户上传扫描件的印章图片（RGBA，透明背景）
+    边缘抗锯齿、墨迹浓淡不均，颜色带有轻微噪声，压缩难度接近真实印章
+
+    Args:
+        path (str): 输出文件路径
+        size_px (int): 图片边长，单位为像素
+
+    Returns:
+        str: 生成的文件路径
+    """
+    size = (size_px, size_px)
+    shape = Image.new('L', size, 0)
+    draw = ImageDraw.Draw(shape)
+    border = max(size_px // 20, 1)
+    draw.ellipse((border, border, size_px - border, size_px - border), outline=255, width=border)
+    center = size_px // 2
+    draw.regular_polygon((center, center, size_px // 8), 5, fill=255)
+    shape = shape.filter(ImageFilter.GaussianBlur(max(size_px / 600, 1)))
+
+    # 墨迹浓淡：透明度乘以偏亮的噪声
+    ink = Image.effect_noise(size, 40).point(lambda value: min(255, value + 100))
+    alpha = ImageChops.multiply(shape, ink)
+    red = Image.effect_noise(size, 12).point(lambda value: min(255, value + 92))
+    other = Image.effect_noise(size, 12).point(lambda value: max(0, value - 118))
+    img = Image.merge('RGBA', (red, other, other, alpha))
+    img.save(path)
+    return path
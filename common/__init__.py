@@ -0,0 +1,3 @@
+from .disk_cache import DiskLRUCache
+
+__all__ = ['DiskLRUCache']
@@ -0,0 +1,138 @@
+import hashlib
+import os
+import shutil
+import threading
+from typing import Optional
+
+
+class DiskLRUCache:
+    """
+    按磁盘预算进行LRU淘汰的文件缓存
+
+    以缓存键为文件名保存结果文件，子类只需提供各自的make_key。
+    缓存目录可由多个进程共享：写入先落到临时文件再原子替换，淘汰以目录中文件的修改时间为准，
+    命中时更新修改时间，总大小超过max_bytes时删除最久未使用的结果。
+    """
+
+    # 默认磁盘预算：1GB
+    DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+    # 计算文件哈希时每次读取的字节数
+    READ_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, cache_dir: str, max_bytes: Optional[int] = None, suffix: str = ".pdf"):
+        """
+        :param cache_dir: 缓存目录
+        :param max_bytes: 磁盘预算，默认使用DEFAULT_MAX_BYTES
+        :param suffix: 结果文件的扩展名，只有该扩展名的文件计入缓存
+        """
+        if max_bytes is None:
+            max_bytes = self.DEFAULT_MAX_BYTES
+        if max_bytes <= 0:
+            raise ValueError("缓存磁盘预算必须大于0")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, key: str, output_path: str) -> bool:
+        """
+        查找缓存结果并复制到输出路径
+
+        Returns:
+            bool: 是否命中
+        """
+        path = self._path(key)
+        try:
+            shutil.copyfile(path, output_path)
+            os.utime(path)  # 记录使用时间，用于LRU淘汰
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return False
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def put(self, key: str, source_path: str) -> None:
+        """保存结果文件，超出磁盘预算时淘汰最久未使用的结果"""
+        temp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            shutil.copyfile(source_path, temp_path)
+            os.replace(temp_path, self._path(key))
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        self._evict()
+
+    def stats(self) -> dict:
+        """返回缓存统计信息"""
+        entries = self._scan()
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries),
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        """删除所有缓存结果并清空统计"""
+        for _, _, path in self._scan():
+            self._remove(path)
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
+
+    @classmethod
+    def file_digest(cls, path: str, digest=None) -> str:
+        """
+        分块计算文件内容哈希
+        :param digest: 已写入其他内容的哈希对象，默认新建SHA-256
+        """
+        digest = digest or hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(cls.READ_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _evict(self) -> None:
+        """总大小超出预算时按修改时间从旧到新删除，至少保留最新的一个"""
+        entries = sorted(self._scan())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            if self._remove(path):
+                total -= size
+                with self._lock:
+                    self.evictions += 1
+
+    def _scan(self) -> list:
+        """列出缓存目录中的结果：(修改时间, 字节数, 路径)"""
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(self.suffix):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return entries
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        """删除缓存文件，其他进程已删除时返回False"""
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}{self.suffix}")
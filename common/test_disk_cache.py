@@ -0,0 +1,33 @@
+import pytest
+
+from convert.conversion_cache import ConversionCache
+from common.disk_cache import DiskLRUCache
+from stamp.result_cache import StampResultCache
+
+
+def test_get_put_clear(tmp_path):
+    """命中时复制结果，只统计指定扩展名的文件，clear删除结果并清空统计"""
+    cache = DiskLRUCache(str(tmp_path / "cache"), max_bytes=1000, suffix=".bin")
+    source = tmp_path / "source.bin"
+    source.write_bytes(b"result")
+    (tmp_path / "cache" / "other.pdf").write_bytes(b"ignored")
+
+    assert not cache.get("key", str(tmp_path / "out.bin"))
+    cache.put("key", str(source))
+    assert cache.get("key", str(tmp_path / "out.bin"))
+    assert (tmp_path / "out.bin").read_bytes() == b"result"
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "entries": 1, "bytes": 6, "max_bytes": 1000}
+
+    cache.clear()
+    assert cache.stats()["entries"] == 0 and cache.stats()["hits"] == 0
+    assert (tmp_path / "cache" / "other.pdf").exists()
+
+
+def test_subclasses_share_storage(tmp_path):
+    """两种缓存使用同一套存储实现，只有缓存键和默认预算不同"""
+    conversion = ConversionCache(str(tmp_path / "a"))
+    result = StampResultCache(str(tmp_path / "b"))
+    assert conversion.max_bytes == ConversionCache.DEFAULT_MAX_BYTES != result.max_bytes
+    assert type(conversion).get is type(result).get is DiskLRUCache.get
+    with pytest.raises(ValueError):
+        StampResultCache(str(tmp_path / "c"), max_bytes=0)
@@ -0,0 +1,48 @@
+import os
+import stat
+import sys
+
+import pytest
+
+from convert.conversion_cache import converter_version
+
+# 模拟libreoffice命令行：记录每次调用，为内容不以broken开头的文档生成一页PDF，内容写入首行；
+# 内容以slow开头的文档模拟卡死
+FAKE_LIBREOFFICE = f"""#!{sys.executable}
+import os, sys, time, fitz
+args = sys.argv[1:]
+if args == ["--version"]:
+    print(os.environ.get("FAKE_LIBREOFFICE_VERSION", "LibreOffice 7.0.4.2 fake"))
+    sys.exit(0)
+with open(os.environ["FAKE_LIBREOFFICE_LOG"], "a") as log:
+    log.write(" ".join(args) + "\\n")
+outdir = args[args.index("--outdir") + 1]
+os.makedirs(outdir, exist_ok=True)
+for path in [arg for arg in args[args.index("--convert-to") + 2:] if arg not in ("--outdir", outdir)]:
+    content = open(path, "rb").read()
+    if content.startswith(b"broken"):
+        continue
+    if content.startswith(b"slow"):
+        time.sleep(60)
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), content.decode())
+    doc.save(os.path.join(outdir, os.path.splitext(os.path.basename(path))[0] + ".pdf"))
+"""
+
+
+@pytest.fixture
+def fake_libreoffice(tmp_path, monkeypatch):
+    """在PATH中放入模拟的libreoffice，返回调用记录文件路径"""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "libreoffice"
+    script.write_text(FAKE_LIBREOFFICE)
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    log_file = str(tmp_path / "libreoffice.log")
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_LIBREOFFICE_LOG", log_file)
+    monkeypatch.delenv("SOFFICE_POOL_SIZE", raising=False)
+    monkeypatch.delenv("CONVERSION_CACHE_DIR", raising=False)
+    converter_version.cache_clear()
+    yield log_file
+    converter_version.cache_clear()
@@ -0,0 +1,74 @@
+import functools
+import hashlib
+import os
+import subprocess
+import threading
+from typing import Optional
+
+from common.disk_cache import DiskLRUCache
+
+
+class ConversionCache(DiskLRUCache):
+    """
+    Word转PDF结果的磁盘缓存
+
+    同一份标书在修改印章配置或更换印章后重新盖章时，文档内容没有变化，却要再次启动LibreOffice转换。
+    缓存以文档内容哈希和转换器版本为键保存转换结果，命中时直接复制PDF，完全跳过LibreOffice。
+    存储和淘汰由DiskLRUCache负责。
+    """
+
+    # 默认磁盘预算：2GB
+    DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+    # 缓存键版本，转换参数变化时递增，使旧结果失效
+    KEY_VERSION = 1
+
+    @classmethod
+    def make_key(cls, input_path: str, version: str = None) -> str:
+        """
+        计算缓存键
+
+        Args:
+            input_path: Word文档路径
+            version: 转换器版本，默认使用converter_version()
+
+        Returns:
+            str: 十六进制SHA-256缓存键
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{cls.KEY_VERSION}\0{version or converter_version()}\0".encode("utf-8"))
+        return cls.file_digest(input_path, digest)
+
+
+@functools.lru_cache(maxsize=1)
+def converter_version() -> str:
+    """
+    LibreOffice版本号，作为缓存键的一部分，升级LibreOffice后旧的转换结果自动失效
+    无法获取时返回unknown
+    """
+    try:
+        completed = subprocess.run(['libreoffice', '--version'], capture_output=True, text=True, timeout=60)
+        version = completed.stdout.strip().splitlines()
+        return version[0] if version else "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+# 进程内共享的转换缓存，由get_conversion_cache按环境变量创建
+_default_cache: Optional[ConversionCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_conversion_cache() -> Optional[ConversionCache]:
+    """
+    获取进程内共享的转换缓存
+    设置CONVERSION_CACHE_DIR时启用，CONVERSION_CACHE_MAX_BYTES为磁盘预算；未设置时返回None
+    """
+    global _default_cache
+    cache_dir = os.environ.get("CONVERSION_CACHE_DIR")
+    if not cache_dir:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None or _default_cache.cache_dir != cache_dir:
+            max_bytes = int(os.environ.get("CONVERSION_CACHE_MAX_BYTES", ConversionCache.DEFAULT_MAX_BYTES))
+            _default_cache = ConversionCache(cache_dir, max_bytes)
+        return _default_cache
@@ -0,0 +1,59 @@
+"""
+不依赖LibreOffice的转换进程替身
+
+与soffice_worker.py使用相同的启动方式和JSON协议，用于在没有LibreOffice的环境中测试SofficePool：
+转换时生成一页写有源文件名的PDF；源文件名包含"crash"时模拟soffice崩溃，进程直接退出。
+指定--spawn-child时像soffice_worker.py一样启动一个长期运行的子进程代替soffice，pid写入配置目录的child.pid。
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import fitz
+
+from soffice_worker import exit_on_sigterm, serve
+
+
+def convert(input_path: str, output_path: str) -> None:
+    """生成一页写有源文件名的PDF"""
+    if not os.path.exists(input_path):
+        raise FileNotFoundError(f"输入文件不存在: {input_path}")
+    if "crash" in os.path.basename(input_path):
+        os._exit(1)
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), f"converted {os.path.basename(input_path)} by {os.getpid()}")
+    doc.save(output_path)
+    doc.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="LibreOffice转换进程替身")
+    parser.add_argument("--soffice", default="soffice", help="忽略，与soffice_worker.py保持一致")
+    parser.add_argument("--profile-dir", required=True, help="用户配置目录，启动时写入标记文件")
+    parser.add_argument("--startup-delay", type=float, default=0.0, help="模拟soffice启动耗时，单位秒")
+    parser.add_argument("--spawn-child", action="store_true", help="启动代替soffice的子进程")
+    args = parser.parse_args()
+
+    exit_on_sigterm()
+    time.sleep(args.startup_delay)
+    os.makedirs(args.profile_dir, exist_ok=True)
+    with open(os.path.join(args.profile_dir, "owner.pid"), "w") as f:
+        f.write(str(os.getpid()))
+    child = None
+    if args.spawn_child:
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(600)"])
+        with open(os.path.join(args.profile_dir, "child.pid"), "w") as f:
+            f.write(str(child.pid))
+    try:
+        serve(convert)
+    finally:
+        if child is not None:
+            child.terminate()
+            child.wait()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
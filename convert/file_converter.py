@@ -1,10 +1,38 @@
 import os
+import shutil
+import signal
 import subprocess
-from typing import Optional
+import tempfile
+from dataclasses import dataclass
+from typing import List, Optional
+
+
+@dataclass
+class ConversionResult:
+    """
+    单个文档的转换结果
+
+    属性:
+        input_path (str): 输入文档路径
+        output_path (str): 生成的PDF路径，失败时为None
+        error (str): 失败原因，成功时为None
+    """
+    input_path: str
+    output_path: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def success(self) -> bool:
+        return self.output_path is not None
+
 
 class FileConverter:
     """文件格式转换器类"""
 
+    # 命令行转换的超时时间：启动LibreOffice的固定耗时加上每个文档的转换时间，单位秒
+    START_TIMEOUT = 60
+    TIMEOUT_PER_DOCUMENT = 120
+
     @staticmethod
     def word_to_pdf(
         input_path: str, 
@@ -45,6 +73,206 @@ class FileConverter:
         if os.path.exists(output_path) and not overwrite:
             raise FileExistsError(f"输出文件已存在: {output_path}")
 
+        # 内容相同的文档直接使用缓存的转换结果，不再启动LibreOffice
+        from convert.conversion_cache import get_conversion_cache
+        cache = get_conversion_cache()
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.make_key(input_path)
+            os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+            if cache.get(cache_key, output_path):
+                print(f"转换缓存命中: {output_path}")
+                return output_path
+
+        FileConverter._convert(input_path, output_path)
+        if cache_key is not None:
+            cache.put(cache_key, output_path)
+        return output_path
+
+    @staticmethod
+    def word_to_pdf_bytes(data: bytes, suffix: str = '.docx') -> bytes:
+        """
+        将内存中的Word文档转换为PDF字节
+
+        LibreOffice只能处理文件，转换在临时目录中完成，结束后自动清理
+
+        Args:
+            data: Word文档的字节内容
+            suffix: 文档扩展名，.doc或.docx
+
+        Returns:
+            bytes: 转换后的PDF字节
+
+        Raises:
+            ValueError: 当扩展名不是.doc或.docx时
+            RuntimeError: 当转换失败时
+        """
+        if suffix.lower() not in ('.doc', '.docx'):
+            raise ValueError("输入文件必须是.doc或.docx格式")
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_path = os.path.join(temp_dir, f"document{suffix.lower()}")
+            with open(input_path, 'wb') as f:
+                f.write(data)
+            output_path = FileConverter.word_to_pdf(input_path)
+            with open(output_path, 'rb') as f:
+                return f.read()
+
+    @staticmethod
+    def word_to_pdf_batch(
+        input_paths: List[str],
+        output_dir: str,
+        overwrite: bool = False
+    ) -> List[ConversionResult]:
+        """
+        在一次LibreOffice调用中将多个Word文档转换为PDF
+
+        LibreOffice按输入文件名生成输出文件，不同目录下的同名文档或同名的.doc/.docx会互相覆盖，
+        因此先以不重复的文件名暂存输入，转换后再移动到输出目录。输出文件名为原文件名，
+        重名时依次加上_1、_2等后缀。单个文档失败不影响其他文档，失败原因记录在结果中。
+        启用了常驻转换池时逐个交给池中进程转换，同样不需要重复启动LibreOffice。
+
+        Args:
+            input_paths: Word文档路径列表
+            output_dir: PDF输出目录
+            overwrite: 输出目录中已存在同名文件时是否覆盖，为False时同样加后缀避让
+
+        Returns:
+            list: 与输入顺序一致的转换结果
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        results = [ConversionResult(input_path=path) for path in input_paths]
+
+        # 检查输入并分配不重复的输出文件名
+        pending = []
+        used_names = set()
+        for result in results:
+            if not os.path.exists(result.input_path):
+                result.error = f"输入文件不存在: {result.input_path}"
+                continue
+            if not result.input_path.lower().endswith(('.doc', '.docx')):
+                result.error = "输入文件必须是.doc或.docx格式"
+                continue
+            stem = os.path.splitext(os.path.basename(result.input_path))[0]
+            name, index = stem, 0
+            while name.lower() in used_names or \
+                    (not overwrite and os.path.exists(os.path.join(output_dir, f"{name}.pdf"))):
+                index += 1
+                name = f"{stem}_{index}"
+            used_names.add(name.lower())
+            pending.append((result, os.path.join(output_dir, f"{name}.pdf")))
+
+        # 命中转换缓存的文档不再交给LibreOffice
+        from convert.conversion_cache import get_conversion_cache
+        cache = get_conversion_cache()
+        cache_keys = {}
+        if cache is not None:
+            misses = []
+            for result, output_path in pending:
+                cache_keys[id(result)] = cache.make_key(result.input_path)
+                if cache.get(cache_keys[id(result)], output_path):
+                    result.output_path = output_path
+                else:
+                    misses.append((result, output_path))
+            pending = misses
+
+        if pending:
+            FileConverter._convert_batch(pending)
+        if cache is not None:
+            for result, _ in pending:
+                if result.success:
+                    cache.put(cache_keys[id(result)], result.output_path)
+        return results
+
+    @staticmethod
+    def _convert_batch(pending: List[tuple]) -> None:
+        """调用常驻转换池或一次LibreOffice命令行转换多个文档，结果写入对应的ConversionResult"""
+        from convert.soffice_pool import get_soffice_pool
+        pool = get_soffice_pool()
+        if pool is not None:
+            for result, output_path in pending:
+                try:
+                    result.output_path = pool.convert(result.input_path, output_path)
+                except Exception as e:
+                    result.error = str(e)
+            return
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            staging_dir = os.path.join(temp_dir, "input")
+            converted_dir = os.path.join(temp_dir, "output")
+            os.makedirs(staging_dir)
+            staged = []
+            for index, (result, output_path) in enumerate(pending):
+                # 暂存文件名只由序号组成，避免重名和特殊字符
+                staged_path = os.path.join(staging_dir, f"{index}{os.path.splitext(result.input_path)[1].lower()}")
+                try:
+                    os.link(result.input_path, staged_path)
+                except OSError:
+                    shutil.copyfile(result.input_path, staged_path)
+                staged.append(staged_path)
+
+            command = ['libreoffice', '--headless', '--convert-to', 'pdf', '--outdir', converted_dir] + staged
+            timeout = FileConverter.START_TIMEOUT + FileConverter.TIMEOUT_PER_DOCUMENT * len(staged)
+            timed_out = False
+            try:
+                # LibreOffice在部分文档失败时也可能返回0，逐个检查输出文件
+                returncode = FileConverter._run_libreoffice(command, timeout)
+            except subprocess.TimeoutExpired:
+                # 超时前已完成的文档仍然有效，其余文档标记为失败
+                timed_out = True
+            except OSError as e:
+                for result, _ in pending:
+                    result.error = f"转换失败: {str(e)}"
+                return
+
+            for index, (result, output_path) in enumerate(pending):
+                converted_path = os.path.join(converted_dir, f"{index}.pdf")
+                if timed_out and not FileConverter._is_complete_pdf(converted_path):
+                    result.error = f"转换失败: LibreOffice批量转换超时（{timeout}秒）"
+                elif os.path.exists(converted_path):
+                    shutil.move(converted_path, output_path)
+                    result.output_path = output_path
+                else:
+                    result.error = f"转换失败: 没有生成输出文件（LibreOffice返回码{returncode}）"
+
+    @staticmethod
+    def _run_libreoffice(command: List[str], timeout: float) -> int:
+        """
+        运行LibreOffice命令行并返回返回码
+        LibreOffice会再启动soffice.bin子进程，超时时结束整个进程组，避免遗留卡死的转换进程
+        :raises subprocess.TimeoutExpired: 超时时
+        """
+        process = subprocess.Popen(command, start_new_session=True)
+        try:
+            return process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            process.wait()
+            raise
+
+    @staticmethod
+    def _is_complete_pdf(path: str) -> bool:
+        """输出文件是否已完整写入（以%%EOF结尾），超时被结束时正在写入的文件不完整"""
+        try:
+            with open(path, 'rb') as f:
+                f.seek(max(os.path.getsize(path) - 1024, 0))
+                return b'%%EOF' in f.read()
+        except OSError:
+            return False
+
+    @staticmethod
+    def _convert(input_path: str, output_path: str) -> str:
+        """调用常驻转换池或LibreOffice命令行转换单个文档"""
+        # 启用了常驻转换池时交给池中的soffice进程转换，省去每次启动LibreOffice的开销
+        from convert.soffice_pool import get_soffice_pool
+        pool = get_soffice_pool()
+        if pool is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+            return pool.convert(input_path, output_path)
+
         try:
             # 使用 LibreOffice 命令行进行转换
             output_dir = os.path.dirname(output_path)
@@ -58,7 +286,10 @@ class FileConverter:
             command = ['libreoffice', '--headless', '--convert-to', 'pdf', input_path, '--outdir', output_dir]
             
             # 执行命令
-            subprocess.run(command, check=True)
+            timeout = FileConverter.START_TIMEOUT + FileConverter.TIMEOUT_PER_DOCUMENT
+            returncode = FileConverter._run_libreoffice(command, timeout)
+            if returncode != 0:
+                raise subprocess.CalledProcessError(returncode, command)
 
             # 检查转换后文件是否生成
             if not os.path.exists(output_path):
@@ -66,5 +297,7 @@ class FileConverter:
             
         except subprocess.CalledProcessError as e:
             raise RuntimeError(f"转换失败: {str(e)}")
+        except subprocess.TimeoutExpired as e:
+            raise RuntimeError(f"转换失败: LibreOffice转换超时（{e.timeout}秒）")
         
         return output_path
@@ -0,0 +1,310 @@
+import atexit
+import json
+import os
+import queue
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+from typing import Callable, List, Optional
+
+
+class ConverterWorker:
+    """
+    一个常驻转换进程
+
+    进程由command_factory生成的命令启动，启动后在标准输出写入 "READY <套接字路径>"，
+    之后通过该Unix域套接字接收JSON请求（协议见soffice_worker.py）。
+    套接字所在目录只有当前用户可访问，本机其他用户无法向转换进程提交任意路径。
+    每个工作进程使用独立的用户配置目录，避免并发转换争用同一个LibreOffice配置。
+    转换进程在独立的进程组中运行，结束时连同它启动的soffice一起结束，回收重启后不会遗留旧的soffice占用配置目录。
+    """
+
+    def __init__(self, command_factory: Callable[[str], List[str]], start_timeout: float = 60.0):
+        self.command_factory = command_factory
+        self.start_timeout = start_timeout
+        self.profile_dir = tempfile.mkdtemp(prefix="soffice_profile_")
+        self.process: Optional[subprocess.Popen] = None
+        self.address: Optional[str] = None   # 转换进程的Unix域套接字路径
+        self.jobs = 0       # 本进程已完成的转换次数
+        self.restarts = 0   # 重新启动的次数
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process else None
+
+    def start(self) -> None:
+        """启动转换进程并等待其就绪"""
+        self.process = subprocess.Popen(
+            self.command_factory(self.profile_dir),
+            stdout=subprocess.PIPE,
+            stdin=subprocess.DEVNULL,
+            text=True,
+            start_new_session=True
+        )
+        self.jobs = 0
+        # 在独立线程中读取就绪标记，超时后结束进程
+        ready = []
+        reader = threading.Thread(target=lambda: ready.append(self.process.stdout.readline()), daemon=True)
+        reader.start()
+        reader.join(self.start_timeout)
+        line = ready[0].strip() if ready else ""
+        if not line.startswith("READY "):
+            self.stop()
+            raise RuntimeError("转换进程启动失败或超时")
+        self.address = line.split(" ", 1)[1]
+
+    def stop(self) -> None:
+        """结束转换进程"""
+        if self.process is None:
+            return
+        if self.process.poll() is None:
+            # 转换进程收到SIGTERM后先关闭自己启动的soffice
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                pass
+        # 进程组中遗留的进程（未响应SIGTERM的转换进程、未能关闭的soffice）一并强制结束
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self.process.wait()
+        if self.process.stdout:
+            self.process.stdout.close()
+        if self.address:
+            # 进程被结束时来不及清理，由这里删除套接字所在的临时目录
+            shutil.rmtree(os.path.dirname(self.address), ignore_errors=True)
+        self.process = None
+        self.address = None
+
+    def restart(self, reset_profile: bool = False) -> None:
+        """
+        重新启动转换进程
+        :param reset_profile: 是否清空用户配置目录，进程崩溃后配置可能已损坏
+        """
+        self.stop()
+        if reset_profile:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            os.makedirs(self.profile_dir, exist_ok=True)
+        self.restarts += 1
+        self.start()
+
+    def is_running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def ping(self, timeout: float = 5.0) -> bool:
+        """健康检查：进程存活且能正常响应请求"""
+        if not self.is_running():
+            return False
+        try:
+            return bool(self._request({"cmd": "ping"}, timeout).get("ok"))
+        except (OSError, ValueError):
+            return False
+
+    def convert(self, input_path: str, output_path: str, timeout: float) -> None:
+        """
+        将文档转换为PDF
+        :raises RuntimeError: 转换失败时；进程崩溃或超时的情况下is_running()返回False或需要重启
+        """
+        response = self._request({
+            "cmd": "convert",
+            "input": os.path.abspath(input_path),
+            "output": os.path.abspath(output_path),
+        }, timeout)
+        self.jobs += 1
+        if not response.get("ok"):
+            raise RuntimeError(f"转换失败: {response.get('error')}")
+
+    def close(self) -> None:
+        """结束进程并删除用户配置目录"""
+        self.stop()
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+    def _request(self, request: dict, timeout: float) -> dict:
+        """发送一条请求并等待响应，连接断开时抛出ConnectionError"""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(timeout)
+            conn.connect(self.address)
+            conn.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            line = conn.makefile("r", encoding="utf-8").readline()
+        if not line:
+            raise ConnectionError("转换进程已断开")
+        return json.loads(line)
+
+
+class SofficePool:
+    """
+    常驻LibreOffice转换进程池
+
+    每次调用libreoffice --convert-to都要重新启动soffice、加载字体缓存，耗时数秒；
+    转换池预先启动size个headless soffice进程，转换请求通过本地socket分发给空闲进程。
+    取出进程时进行健康检查，进程崩溃后自动重启，每个进程完成max_jobs次转换后回收重启，
+    避免soffice长期运行导致的内存增长。
+    """
+
+    def __init__(self, size: int = 1, max_jobs: int = 200,
+                 command_factory: Callable[[str], List[str]] = None,
+                 start_timeout: float = 60.0, convert_timeout: float = 300.0):
+        """
+        :param size: 转换进程数
+        :param max_jobs: 每个进程完成多少次转换后回收重启
+        :param command_factory: 根据用户配置目录生成启动命令，默认启动soffice_worker.py
+        :param start_timeout: 等待进程就绪的最长时间，单位秒
+        :param convert_timeout: 单个文档转换的最长时间，单位秒
+        """
+        if size <= 0:
+            raise ValueError("转换进程数必须大于0")
+        if max_jobs <= 0:
+            raise ValueError("回收前的转换次数必须大于0")
+        self.max_jobs = max_jobs
+        self.convert_timeout = convert_timeout
+        self.recycled = 0   # 因达到转换次数而回收的次数
+        self.crashed = 0    # 因崩溃或健康检查失败而重启的次数
+        self._closed = False
+        self._idle: "queue.Queue[ConverterWorker]" = queue.Queue()
+        self._workers = [ConverterWorker(command_factory or soffice_command, start_timeout) for _ in range(size)]
+        try:
+            for worker in self._workers:
+                worker.start()
+                self._idle.put(worker)
+        except Exception:
+            self.close()
+            raise
+
+    def convert(self, input_path: str, output_path: str, timeout: float = None) -> str:
+        """
+        使用空闲的转换进程将文档转换为PDF，所有进程都在使用时等待
+        :param input_path: 输入文档路径
+        :param output_path: 输出PDF路径
+        :param timeout: 转换超时时间，默认使用convert_timeout
+        :return: 输出PDF路径
+        :raises RuntimeError: 转换失败时
+        """
+        if self._closed:
+            raise RuntimeError("转换池已关闭")
+        timeout = timeout or self.convert_timeout
+        worker = self._acquire()
+        try:
+            worker.convert(input_path, output_path, timeout)
+        except (OSError, ValueError) as e:
+            # 连接断开或超时：进程已崩溃或卡死，重启后交给下一个请求使用
+            self._release(worker, crashed=True)
+            raise RuntimeError(f"转换进程异常退出: {str(e)}")
+        except Exception:
+            self._release(worker, crashed=not worker.is_running())
+            raise
+        self._release(worker)
+        if not os.path.exists(output_path):
+            raise RuntimeError(f"转换失败: 没有生成输出文件 {output_path}")
+        return output_path
+
+    def stats(self) -> dict:
+        """返回转换池状态"""
+        return {
+            "size": len(self._workers),
+            "idle": self._idle.qsize(),
+            "max_jobs": self.max_jobs,
+            "recycled": self.recycled,
+            "crashed": self.crashed,
+        }
+
+    def close(self) -> None:
+        """结束所有转换进程"""
+        self._closed = True
+        for worker in self._workers:
+            worker.close()
+
+    def _acquire(self) -> ConverterWorker:
+        """取出空闲进程，健康检查失败时重启"""
+        worker = self._idle.get()
+        if not worker.ping():
+            self.crashed += 1
+            try:
+                worker.restart(reset_profile=True)
+            except Exception:
+                self._idle.put(worker)
+                raise
+        return worker
+
+    def _release(self, worker: ConverterWorker, crashed: bool = False) -> None:
+        """归还进程；崩溃或达到回收次数的进程在后台重启后再放回空闲队列"""
+        if self._closed:
+            worker.close()
+            return
+        if not crashed and worker.jobs < self.max_jobs:
+            self._idle.put(worker)
+            return
+
+        if crashed:
+            self.crashed += 1
+        else:
+            self.recycled += 1
+
+        def restart():
+            try:
+                worker.restart(reset_profile=crashed)
+            except Exception as e:
+                # 启动失败时仍放回队列，下次取出时健康检查会再次尝试重启
+                print(f"警告：转换进程重启失败: {str(e)}")
+            if self._closed:
+                worker.close()
+                return
+            self._idle.put(worker)
+
+        threading.Thread(target=restart, daemon=True).start()
+
+
+def soffice_command(profile_dir: str) -> List[str]:
+    """
+    默认的转换进程启动命令：用带有uno模块的Python运行soffice_worker.py
+    SOFFICE_PYTHON指定该Python（默认系统python3），SOFFICE_BINARY指定soffice可执行文件
+    """
+    return [
+        os.environ.get("SOFFICE_PYTHON", "/usr/bin/python3"),
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "soffice_worker.py"),
+        "--soffice", os.environ.get("SOFFICE_BINARY", "soffice"),
+        "--profile-dir", profile_dir,
+    ]
+
+
+def fake_converter_command(profile_dir: str, startup_delay: float = 0.0, spawn_child: bool = False) -> List[str]:
+    """不依赖LibreOffice的转换进程替身的启动命令，用于测试"""
+    return [
+        sys.executable,
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_converter.py"),
+        "--profile-dir", profile_dir,
+        "--startup-delay", str(startup_delay),
+    ] + (["--spawn-child"] if spawn_child else [])
+
+
+# 进程内共享的转换池，由get_soffice_pool按环境变量创建
+_default_pool: Optional[SofficePool] = None
+_default_pool_failed = False
+_default_pool_lock = threading.Lock()
+
+
+def get_soffice_pool() -> Optional[SofficePool]:
+    """
+    获取进程内共享的转换池
+    SOFFICE_POOL_SIZE大于0时启用（每个进程的转换进程数），SOFFICE_POOL_MAX_JOBS为回收前的转换次数；
+    未启用或启动失败时返回None，由调用方使用命令行转换
+    """
+    global _default_pool, _default_pool_failed
+    size = int(os.environ.get("SOFFICE_POOL_SIZE", "0"))
+    if size <= 0:
+        return None
+    with _default_pool_lock:
+        if _default_pool is None and not _default_pool_failed:
+            try:
+                _default_pool = SofficePool(size=size, max_jobs=int(os.environ.get("SOFFICE_POOL_MAX_JOBS", "200")))
+                atexit.register(_default_pool.close)
+            except Exception as e:
+                # 启动失败后本进程不再尝试，避免每次转换都等待启动超时
+                _default_pool_failed = True
+                print(f"警告：LibreOffice转换池启动失败，使用命令行转换: {str(e)}")
+        return _default_pool
@@ -0,0 +1,203 @@
+"""
+常驻LibreOffice转换进程
+
+由SofficePool启动，每个进程持有一个使用独立用户配置目录（-env:UserInstallation）的headless soffice，
+通过UNO调用完成转换，对外在Unix域套接字上提供按行分隔的JSON协议：
+
+    {"cmd": "ping"}                                   -> {"ok": true}
+    {"cmd": "convert", "input": "...", "output": "..."} -> {"ok": true} 或 {"ok": false, "error": "..."}
+
+套接字位于新建的、只有当前用户可访问（0700）的临时目录中，其他用户无法连接并提交任意路径。
+启动完成后向标准输出写入一行 "READY <套接字路径>"。本脚本需要用带有uno模块的Python运行
+（通常是系统自带的python3，而不是应用所在的Python），因此只依赖标准库和uno。
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+def exit_on_sigterm() -> None:
+    """
+    收到SIGTERM时以SystemExit正常退出，使finally中的清理（关闭soffice、删除套接字目录）得以执行
+    Python默认的SIGTERM处理会直接结束进程，转换池回收或重启转换进程时soffice将成为孤儿进程
+    """
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+
+def serve(convert, health=lambda: True) -> None:
+    """
+    在私有的Unix域套接字上提供转换服务，每个连接处理一条请求；父进程退出时自动退出
+    :param convert: 转换函数 convert(input_path, output_path)
+    :param health: 健康检查函数，返回False时ping失败
+    """
+    parent_pid = os.getppid()
+    # mkdtemp创建的目录权限为0700，只有当前用户能访问其中的套接字
+    socket_dir = tempfile.mkdtemp(prefix="soffice_worker_")
+    address = os.path.join(socket_dir, "worker.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        server.bind(address)
+        os.chmod(address, 0o600)
+        server.listen(4)
+        server.settimeout(1.0)
+        print(f"READY {address}", flush=True)
+        _serve_forever(server, parent_pid, convert, health)
+    finally:
+        server.close()
+        shutil.rmtree(socket_dir, ignore_errors=True)
+
+
+def _serve_forever(server: socket.socket, parent_pid: int, convert, health) -> None:
+    """逐个处理连接，直到父进程退出"""
+    while True:
+        if os.getppid() != parent_pid:
+            return
+        try:
+            conn, _ = server.accept()
+        except socket.timeout:
+            continue
+        with conn:
+            conn.settimeout(None)
+            reader = conn.makefile("r", encoding="utf-8")
+            line = reader.readline()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+                if request.get("cmd") == "ping":
+                    response = {"ok": bool(health())}
+                elif request.get("cmd") == "convert":
+                    convert(request["input"], request["output"])
+                    response = {"ok": True}
+                else:
+                    response = {"ok": False, "error": f"未知命令: {request.get('cmd')}"}
+            except Exception as e:
+                response = {"ok": False, "error": str(e)}
+            conn.sendall((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+
+
+class SofficeConverter:
+    """持有一个headless soffice进程，通过UNO完成转换"""
+
+    # 等待soffice启动并接受UNO连接的最长时间
+    START_TIMEOUT = 60
+
+    def __init__(self, soffice: str, profile_dir: str):
+        import uno
+        self.uno = uno
+        self.pipe_name = f"soffice_pool_{os.getpid()}"
+        self.process = subprocess.Popen(
+            [
+                soffice, "--headless", "--invisible", "--nocrashreport", "--nodefault", "--nologo",
+                "--nofirststartwizard", "--norestore", "--nolockcheck",
+                f"-env:UserInstallation={uno.systemPathToFileUrl(os.path.abspath(profile_dir))}",
+                f"--accept=pipe,name={self.pipe_name};urp;StarOffice.ComponentContext",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        self.desktop = self._connect()
+
+    def convert(self, input_path: str, output_path: str) -> None:
+        """将文档转换为PDF"""
+        from com.sun.star.beans import PropertyValue
+
+        def prop(name, value):
+            p = PropertyValue()
+            p.Name = name
+            p.Value = value
+            return p
+
+        doc = self.desktop.loadComponentFromURL(
+            self.uno.systemPathToFileUrl(os.path.abspath(input_path)), "_blank", 0,
+            (prop("Hidden", True), prop("ReadOnly", True))
+        )
+        if doc is None:
+            raise RuntimeError(f"无法打开文档: {input_path}")
+        try:
+            doc.storeToURL(self.uno.systemPathToFileUrl(os.path.abspath(output_path)),
+                           (prop("FilterName", "writer_pdf_Export"),))
+        finally:
+            doc.close(True)
+
+    def is_alive(self) -> bool:
+        """soffice进程是否存活且UNO连接可用"""
+        if self.process.poll() is not None:
+            return False
+        try:
+            self.desktop.getComponents()
+            return True
+        except Exception:
+            return False
+
+    def close(self) -> None:
+        """结束soffice进程"""
+        try:
+            self.desktop.terminate()
+        except Exception:
+            pass
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+    def _connect(self):
+        """等待soffice启动后建立UNO连接"""
+        local = self.uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local)
+        deadline = time.monotonic() + self.START_TIMEOUT
+        while True:
+            if self.process.poll() is not None:
+                raise RuntimeError("soffice进程启动失败")
+            try:
+                ctx = resolver.resolve(f"uno:pipe,name={self.pipe_name};urp;StarOffice.ComponentContext")
+                return ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+            except Exception:
+                if time.monotonic() > deadline:
+                    self.process.kill()
+                    raise RuntimeError("等待soffice启动超时")
+                time.sleep(0.2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="常驻LibreOffice转换进程")
+    parser.add_argument("--soffice", default="soffice", help="soffice可执行文件")
+    parser.add_argument("--profile-dir", required=True, help="独立的LibreOffice用户配置目录")
+    args = parser.parse_args()
+
+    exit_on_sigterm()
+    converter = SofficeConverter(args.soffice, args.profile_dir)
+    lock = threading.Lock()
+
+    def convert(input_path, output_path):
+        with lock:
+            try:
+                converter.convert(input_path, output_path)
+            except Exception:
+                if not converter.is_alive():
+                    # 转换过程中soffice崩溃，转换进程随之退出，由转换池重新启动
+                    os._exit(1)
+                raise
+
+    def health():
+        if not converter.is_alive():
+            # soffice已经退出，转换进程随之退出，由转换池重新启动
+            os._exit(1)
+        return True
+
+    try:
+        serve(convert, health)
+    finally:
+        converter.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
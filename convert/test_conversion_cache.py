@@ -0,0 +1,85 @@
+import os
+
+import fitz
+
+from convert.conversion_cache import ConversionCache, converter_version
+from convert.file_converter import FileConverter
+
+
+def _make_doc(directory, name: str, content: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    with open(path, "w") as f:
+        f.write(content)
+    return path
+
+
+def _invocations(log_file: str) -> int:
+    if not os.path.exists(log_file):
+        return 0
+    with open(log_file) as f:
+        return len(f.readlines())
+
+
+def test_hit_skips_libreoffice(tmp_path, monkeypatch, fake_libreoffice):
+    """内容相同的文档第二次转换直接使用缓存，文件名和路径不影响命中"""
+    monkeypatch.setenv("CONVERSION_CACHE_DIR", str(tmp_path / "cache"))
+    first = FileConverter.word_to_pdf(_make_doc(tmp_path / "a", "report.docx", "same content"))
+    assert _invocations(fake_libreoffice) == 1
+
+    second = FileConverter.word_to_pdf(_make_doc(tmp_path / "b", "renamed.docx", "same content"))
+    assert _invocations(fake_libreoffice) == 1
+    with open(first, "rb") as f1, open(second, "rb") as f2:
+        assert f1.read() == f2.read()
+
+    FileConverter.word_to_pdf(_make_doc(tmp_path / "c", "report.docx", "other content"))
+    assert _invocations(fake_libreoffice) == 2
+
+
+def test_converter_version_invalidates(tmp_path, monkeypatch, fake_libreoffice):
+    """升级LibreOffice后旧的转换结果不再命中"""
+    monkeypatch.setenv("CONVERSION_CACHE_DIR", str(tmp_path / "cache"))
+    FileConverter.word_to_pdf(_make_doc(tmp_path / "a", "report.docx", "content"))
+
+    monkeypatch.setenv("FAKE_LIBREOFFICE_VERSION", "LibreOffice 7.6.0.3 fake")
+    converter_version.cache_clear()
+    assert converter_version() == "LibreOffice 7.6.0.3 fake"
+    FileConverter.word_to_pdf(_make_doc(tmp_path / "b", "report.docx", "content"))
+    assert _invocations(fake_libreoffice) == 2
+
+
+def test_batch_converts_only_misses(tmp_path, monkeypatch, fake_libreoffice):
+    """批量转换时只把未命中的文档交给LibreOffice"""
+    monkeypatch.setenv("CONVERSION_CACHE_DIR", str(tmp_path / "cache"))
+    FileConverter.word_to_pdf_batch([_make_doc(tmp_path / "in", "a.docx", "chapter a")], str(tmp_path / "out1"))
+
+    inputs = [_make_doc(tmp_path / "in", "a.docx", "chapter a"), _make_doc(tmp_path / "in", "b.docx", "chapter b")]
+    results = FileConverter.word_to_pdf_batch(inputs, str(tmp_path / "out2"))
+    assert all(result.success for result in results)
+    with open(fake_libreoffice) as f:
+        calls = f.readlines()
+    assert len(calls) == 2 and calls[1].count(".docx") == 1
+    with fitz.open(results[0].output_path) as doc:
+        assert doc[0].get_text().strip() == "chapter a"
+
+    FileConverter.word_to_pdf_batch(inputs, str(tmp_path / "out3"))
+    assert _invocations(fake_libreoffice) == 2
+
+
+def test_eviction_keeps_budget(tmp_path):
+    """超出磁盘预算时淘汰最久未使用的结果"""
+    cache = ConversionCache(str(tmp_path / "cache"), max_bytes=2500)
+    keys = []
+    for index in range(3):
+        pdf = tmp_path / f"{index}.pdf"
+        pdf.write_bytes(bytes([index]) * 1000)
+        key = ConversionCache.make_key(str(pdf), version="test")
+        keys.append(key)
+        cache.put(key, str(pdf))
+        os.utime(cache._path(key), ns=(index * 10 ** 9, index * 10 ** 9))
+        cache._evict()
+
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["bytes"] <= 2500 and stats["evictions"] == 1
+    assert not cache.get(keys[0], str(tmp_path / "out.pdf"))
+    assert cache.get(keys[2], str(tmp_path / "out.pdf"))
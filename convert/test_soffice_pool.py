@@ -0,0 +1,184 @@
+import os
+import signal
+import socket
+import stat
+import threading
+import time
+from functools import partial
+
+import fitz
+import pytest
+
+from convert import soffice_pool
+from convert.file_converter import FileConverter
+from convert.soffice_pool import SofficePool, fake_converter_command
+
+
+def _make_doc(tmp_path, name: str) -> str:
+    """生成待转换的文档（替身进程不解析内容）"""
+    path = str(tmp_path / name)
+    with open(path, "wb") as f:
+        f.write(b"fake word document")
+    return path
+
+
+def _converted_by(pdf_path: str) -> int:
+    """返回生成该PDF的替身进程pid"""
+    with fitz.open(pdf_path) as doc:
+        return int(doc[0].get_text().split()[-1])
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def _make_pool(**kwargs) -> SofficePool:
+        kwargs.setdefault("command_factory", fake_converter_command)
+        pool = SofficePool(**kwargs)
+        pools.append(pool)
+        return pool
+    yield _make_pool
+    for pool in pools:
+        pool.close()
+
+
+def test_reuses_warm_worker(tmp_path, make_pool):
+    """同一个常驻进程连续处理多个文档，不再逐个启动"""
+    pool = make_pool(size=1)
+    pids = set()
+    for index in range(3):
+        output_path = pool.convert(_make_doc(tmp_path, f"doc{index}.docx"), str(tmp_path / f"doc{index}.pdf"))
+        pids.add(_converted_by(output_path))
+    assert len(pids) == 1
+
+
+def test_recycles_after_max_jobs(tmp_path, make_pool):
+    """完成max_jobs次转换后回收重启"""
+    pool = make_pool(size=1, max_jobs=2)
+    pids = [_converted_by(pool.convert(_make_doc(tmp_path, f"doc{index}.docx"), str(tmp_path / f"doc{index}.pdf")))
+            for index in range(3)]
+    assert pids[0] == pids[1] != pids[2]
+    assert pool.stats()["recycled"] == 1
+
+
+def test_restarts_after_crash(tmp_path, make_pool):
+    """转换中进程崩溃时本次转换失败，之后的转换由重启后的进程完成"""
+    pool = make_pool(size=1)
+    first = _converted_by(pool.convert(_make_doc(tmp_path, "a.docx"), str(tmp_path / "a.pdf")))
+    with pytest.raises(RuntimeError):
+        pool.convert(_make_doc(tmp_path, "crash.docx"), str(tmp_path / "crash.pdf"))
+    second = _converted_by(pool.convert(_make_doc(tmp_path, "b.docx"), str(tmp_path / "b.pdf")))
+    assert first != second
+    assert pool.stats()["crashed"] == 1
+
+
+def test_health_check_replaces_dead_worker(tmp_path, make_pool):
+    """空闲进程意外退出后，取出时健康检查失败并自动重启"""
+    pool = make_pool(size=1)
+    worker = pool._workers[0]
+    worker.process.kill()
+    worker.process.wait()
+    output_path = pool.convert(_make_doc(tmp_path, "a.docx"), str(tmp_path / "a.pdf"))
+    assert _converted_by(output_path) == worker.pid
+    assert pool.stats()["crashed"] == 1
+
+
+def test_concurrent_conversions_use_isolated_profiles(tmp_path, make_pool):
+    """多个进程并发转换，每个进程使用独立的用户配置目录"""
+    pool = make_pool(size=2)
+    profile_dirs = {worker.profile_dir for worker in pool._workers}
+    assert len(profile_dirs) == 2
+    for worker in pool._workers:
+        with open(os.path.join(worker.profile_dir, "owner.pid")) as f:
+            assert int(f.read()) == worker.pid
+
+    errors = []
+
+    def convert(index):
+        try:
+            pool.convert(_make_doc(tmp_path, f"doc{index}.docx"), str(tmp_path / f"doc{index}.pdf"))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=convert, args=(index,)) for index in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert {_converted_by(str(tmp_path / f"doc{index}.pdf")) for index in range(6)} <= {w.pid for w in pool._workers}
+
+
+def test_worker_listens_on_private_socket(tmp_path, make_pool):
+    """转换进程只在当前用户可访问的Unix域套接字上监听，关闭后删除套接字目录"""
+    pool = make_pool(size=1)
+    worker = pool._workers[0]
+    socket_dir = os.path.dirname(worker.address)
+    assert stat.S_ISSOCK(os.stat(worker.address).st_mode)
+    assert stat.S_IMODE(os.stat(socket_dir).st_mode) == 0o700
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(worker.address)
+
+    worker.restart()
+    assert not os.path.exists(socket_dir)
+    assert pool.convert(_make_doc(tmp_path, "a.docx"), str(tmp_path / "a.pdf"))
+    socket_dir = os.path.dirname(worker.address)
+    pool.close()
+    assert not os.path.exists(socket_dir)
+
+
+def _child_pid(worker) -> int:
+    with open(os.path.join(worker.profile_dir, "child.pid")) as f:
+        return int(f.read())
+
+
+def _gone(pid: int, timeout: float = 5.0) -> bool:
+    """进程在超时前退出（僵尸进程视为已退出）"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                if f.read().rsplit(")", 1)[1].split()[0] == "Z":
+                    return True
+        except FileNotFoundError:
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_restart_and_stop_end_child_process(make_pool):
+    """回收重启和关闭转换池时，转换进程启动的子进程（soffice）随之结束"""
+    pool = make_pool(size=1, command_factory=partial(fake_converter_command, spawn_child=True))
+    worker = pool._workers[0]
+    first_child = _child_pid(worker)
+    worker.restart()
+    assert _gone(first_child)
+
+    second_child = _child_pid(worker)
+    assert second_child != first_child and not _gone(second_child, timeout=0)
+    worker.stop()
+    assert _gone(second_child)
+
+
+def test_crashed_worker_child_is_killed(tmp_path, make_pool):
+    """转换进程被强制结束、来不及清理时，重启前结束进程组中遗留的子进程"""
+    pool = make_pool(size=1, command_factory=partial(fake_converter_command, spawn_child=True))
+    worker = pool._workers[0]
+    child = _child_pid(worker)
+    os.kill(worker.pid, signal.SIGKILL)
+    assert pool.convert(_make_doc(tmp_path, "a.docx"), str(tmp_path / "a.pdf"))
+    assert _gone(child)
+
+
+def test_start_timeout(make_pool):
+    """进程未在规定时间内就绪时启动失败"""
+    with pytest.raises(RuntimeError):
+        make_pool(size=1, start_timeout=0.5, command_factory=partial(fake_converter_command, startup_delay=5))
+
+
+def test_file_converter_uses_pool(tmp_path, monkeypatch, make_pool):
+    """启用转换池后FileConverter.word_to_pdf交给池中进程转换"""
+    pool = make_pool(size=1)
+    monkeypatch.setattr(soffice_pool, "get_soffice_pool", lambda: pool)
+    output_path = FileConverter.word_to_pdf(_make_doc(tmp_path, "bid.docx"), str(tmp_path / "out" / "bid.pdf"))
+    assert _converted_by(output_path) == pool._workers[0].pid
@@ -0,0 +1,109 @@
+import os
+import time
+
+import fitz
+import pytest
+from PIL import Image
+
+from convert import soffice_pool
+from convert.file_converter import FileConverter
+from convert.soffice_pool import SofficePool, fake_converter_command
+from stamp.batch_processor import StampJob, process_many
+
+
+def _make_doc(directory, name: str, content: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    with open(path, "w") as f:
+        f.write(content)
+    return path
+
+
+def _pdf_text(path: str) -> str:
+    with fitz.open(path) as doc:
+        return doc[0].get_text().strip()
+
+
+def test_batch_in_one_invocation(tmp_path, fake_libreoffice):
+    """多个文档只调用一次LibreOffice，重名文档分别输出，失败只影响对应文档"""
+    inputs = [
+        _make_doc(tmp_path / "a", "chapter.docx", "a chapter"),
+        _make_doc(tmp_path / "b", "chapter.docx", "b chapter"),
+        _make_doc(tmp_path / "a", "chapter.doc", "a chapter doc"),
+        _make_doc(tmp_path / "a", "bad.docx", "broken"),
+        str(tmp_path / "missing.docx"),
+        _make_doc(tmp_path / "a", "notes.txt", "text"),
+    ]
+    output_dir = str(tmp_path / "out")
+    results = FileConverter.word_to_pdf_batch(inputs, output_dir)
+
+    with open(fake_libreoffice) as f:
+        assert len(f.readlines()) == 1
+    assert [result.success for result in results] == [True, True, True, False, False, False]
+    assert [os.path.basename(result.output_path) for result in results[:3]] == \
+        ["chapter.pdf", "chapter_1.pdf", "chapter_2.pdf"]
+    assert [_pdf_text(result.output_path) for result in results[:3]] == ["a chapter", "b chapter", "a chapter doc"]
+    assert all(result.error for result in results[3:])
+
+
+def test_batch_timeout_fails_unfinished_documents(tmp_path, fake_libreoffice, monkeypatch):
+    """LibreOffice卡死时按文档数计算的超时后结束进程，已完成的文档保留，其余标记为失败"""
+    monkeypatch.setattr(FileConverter, "START_TIMEOUT", 1)
+    monkeypatch.setattr(FileConverter, "TIMEOUT_PER_DOCUMENT", 0.5)
+    inputs = [
+        _make_doc(tmp_path, "a.docx", "a chapter"),
+        _make_doc(tmp_path, "b.docx", "slow chapter"),
+        _make_doc(tmp_path, "c.docx", "c chapter"),
+    ]
+    start = time.monotonic()
+    results = FileConverter.word_to_pdf_batch(inputs, str(tmp_path / "out"))
+
+    assert time.monotonic() - start < 10
+    assert [result.success for result in results] == [True, False, False]
+    assert _pdf_text(results[0].output_path) == "a chapter"
+    assert all("超时" in result.error for result in results[1:])
+    assert os.listdir(tmp_path / "out") == ["a.pdf"]
+
+
+def test_batch_does_not_overwrite_existing_output(tmp_path, fake_libreoffice):
+    """输出目录中已有同名文件时默认加后缀避让"""
+    output_dir = str(tmp_path / "out")
+    _make_doc(output_dir, "report.pdf", "existing")
+    results = FileConverter.word_to_pdf_batch([_make_doc(tmp_path, "report.docx", "new")], output_dir)
+    assert os.path.basename(results[0].output_path) == "report_1.pdf"
+
+    results = FileConverter.word_to_pdf_batch([_make_doc(tmp_path, "report.docx", "new")], output_dir, overwrite=True)
+    assert os.path.basename(results[0].output_path) == "report.pdf"
+
+
+def test_batch_uses_pool(tmp_path, monkeypatch, fake_libreoffice):
+    """启用常驻转换池时不再调用libreoffice命令行"""
+    pool = SofficePool(size=1, command_factory=fake_converter_command)
+    try:
+        monkeypatch.setattr(soffice_pool, "get_soffice_pool", lambda: pool)
+        inputs = [_make_doc(tmp_path / d, "chapter.docx", d) for d in ("a", "b")]
+        results = FileConverter.word_to_pdf_batch(inputs, str(tmp_path / "out"))
+    finally:
+        pool.close()
+    assert all(result.success for result in results)
+    assert not os.path.exists(fake_libreoffice)
+
+
+def test_process_many_converts_word_once(tmp_path, fake_libreoffice):
+    """批量盖章时Word文档统一转换，转换失败的任务单独记录"""
+    stamp_file = str(tmp_path / "stamp.png")
+    Image.new('RGBA', (100, 100), (220, 0, 0, 255)).save(stamp_file)
+    jobs = [
+        StampJob(_make_doc(tmp_path / "in", f"chapter{index}.docx", f"chapter {index}"), stamp_file,
+                 str(tmp_path / "out" / f"chapter{index}.pdf"))
+        for index in range(3)
+    ]
+    jobs.append(StampJob(_make_doc(tmp_path / "in", "broken.docx", "broken"), stamp_file,
+                         str(tmp_path / "out" / "broken.pdf")))
+    result = process_many(jobs, max_workers=1)
+
+    with open(fake_libreoffice) as f:
+        assert len(f.readlines()) == 1
+    assert [r.success for r in result.results] == [True, True, True, False]
+    assert result.results[0].job is jobs[0]
+    assert _pdf_text(jobs[0].output_file).startswith("chapter 0")
@@ -1,5 +1,13 @@
 from .stamp_type import StampType
 from .stamp_config import StampConfig
+from .save_profile import SaveProfile, SaveResult
+from .seal_renderer import SealRenderer
+from .image_encoder import ImageEncoding
+from .stamp_asset_cache import StampAssetCache, stamp_asset_cache
+from .result_cache import StampResultCache
+from .placement_planner import PlacementPlan, PlacementPlanner
 from .stamp_processor import StampProcessor
+from .batch_processor import StampJob, StampJobResult, BatchResult
 
-__all__ = ['StampType', 'StampConfig', 'StampProcessor'] 
\ No newline at end of file
+__all__ = ['StampType', 'StampConfig', 'SaveProfile', 'SaveResult', 'SealRenderer', 'ImageEncoding', 'StampAssetCache', 'stamp_asset_cache',
+           'StampResultCache', 'PlacementPlan', 'PlacementPlanner', 'StampProcessor', 'StampJob', 'StampJobResult', 'BatchResult'] 
\ No newline at end of file
@@ -1,18 +1,50 @@
 from abc import ABC, abstractmethod
+from typing import Union
 import fitz
 from .stamp_config import StampConfig
+from .placement_planner import PlacementPlan
 
 class BaseStamper(ABC):
     """印章处理器基类"""
     
     def __init__(self, config: StampConfig):
         self.config = config
+        # 最近一次盖章中，印章图像编码相比按原样嵌入节省的字节数
+        self.image_bytes_saved = 0
     
-    @abstractmethod
-    def apply_stamp(self, pdf_doc: fitz.Document, stamp_file: str) -> None:
+    def apply_stamp(self, pdf_doc: fitz.Document, stamp_file: Union[str, bytes]) -> None:
         """
         应用印章到PDF文档
         :param pdf_doc: PDF文档对象
-        :param stamp_file: 印章图片文件路径
+        :param stamp_file: 印章图片文件路径或图片字节
+        """
+        self.prepare(pdf_doc, stamp_file)
+        try:
+            for page in pdf_doc:
+                self.stamp_page(page)
+        finally:
+            self.close()
+
+    @abstractmethod
+    def prepare(self, pdf_doc: fitz.Document, stamp_file: Union[str, bytes], plan: PlacementPlan = None) -> None:
+        """
+        准备印章图像并读取版面，在逐页盖章之前调用一次
+        :param pdf_doc: PDF文档对象
+        :param stamp_file: 印章图片文件路径或图片字节
+        :param plan: 整份文档的印章位置，为None时由处理器自行规划
+        """
+        pass
+
+    @abstractmethod
+    def stamp_page(self, page: fitz.Page) -> None:
+        """
+        在单个页面上盖章，调用前必须先执行prepare
+        :param page: 页面对象
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        释放prepare创建的资源，逐页盖章全部完成后调用，处理器可再次prepare
         """
-        pass 
\ No newline at end of file
+        pass
@@ -0,0 +1,209 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional
+from .stamp_type import StampType
+from .stamp_config import StampConfig
+from .save_profile import SaveResult
+
+
+@dataclass
+class StampJob:
+    """
+    批量盖章任务
+
+    属性:
+        input_file (str): 输入文件路径（支持PDF或Word文档）
+        stamp_file (str): 印章图片文件路径
+        output_file (str): 输出PDF文件路径
+        stamp_type (StampType): 印章类型，默认同时添加电子章和骑缝章
+        config (StampConfig): 印章配置，None表示使用处理器的配置
+    """
+    input_file: str
+    stamp_file: str
+    output_file: str
+    stamp_type: StampType = StampType.BOTH
+    config: Optional[StampConfig] = None
+
+
+@dataclass
+class StampJobResult:
+    """
+    单个盖章任务的处理结果
+
+    属性:
+        job (StampJob): 对应的任务
+        success (bool): 是否处理成功
+        page_count (int): 输出文档页数
+        elapsed_seconds (float): 处理耗时，单位秒
+        save_result (SaveResult): 保存结果，失败时为None
+        error (str): 失败原因，成功时为None
+    """
+    job: StampJob
+    success: bool
+    page_count: int = 0
+    elapsed_seconds: float = 0.0
+    save_result: Optional[SaveResult] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class BatchResult:
+    """
+    批量盖章的汇总结果
+
+    属性:
+        results (list): 与输入任务顺序一致的处理结果
+        elapsed_seconds (float): 批量处理总耗时，单位秒
+    """
+    results: List[StampJobResult] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+
+    @property
+    def succeeded(self) -> int:
+        """成功的任务数"""
+        return sum(1 for result in self.results if result.success)
+
+    @property
+    def failed(self) -> int:
+        """失败的任务数"""
+        return len(self.results) - self.succeeded
+
+    @property
+    def total_pages(self) -> int:
+        """成功处理的总页数"""
+        return sum(result.page_count for result in self.results if result.success)
+
+    @property
+    def pages_per_second(self) -> float:
+        """总吞吐量，单位页/秒"""
+        return self.total_pages / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+
+def init_worker() -> None:
+    """
+    工作进程初始化函数
+    在进程启动时导入PyMuPDF和Pillow并加载图片插件，后续任务无需再次导入
+    """
+    import fitz  # noqa: F401
+    from PIL import Image
+    Image.init()
+
+
+def run_job(job: StampJob, default_config: Optional[StampConfig] = None,
+            pdf_file: Optional[str] = None) -> StampJobResult:
+    """
+    执行单个盖章任务，异常不会向外抛出，而是记录在结果中
+
+    Args:
+        job (StampJob): 盖章任务
+        default_config (StampConfig, optional): 任务未指定配置时使用的配置
+        pdf_file (str, optional): 已由批量转换生成的PDF，指定时代替Word输入文件
+
+    Returns:
+        StampJobResult: 处理结果
+    """
+    import fitz
+    from .stamp_processor import StampProcessor
+
+    start = time.perf_counter()
+    try:
+        processor = StampProcessor(job.config or default_config)
+        save_result = processor.process(
+            input_file=pdf_file or job.input_file,
+            stamp_file=job.stamp_file,
+            output_file=job.output_file,
+            stamp_type=job.stamp_type
+        )
+        with fitz.open(job.output_file) as doc:
+            page_count = len(doc)
+        return StampJobResult(
+            job=job,
+            success=True,
+            page_count=page_count,
+            elapsed_seconds=time.perf_counter() - start,
+            save_result=save_result
+        )
+    except Exception as e:
+        return StampJobResult(
+            job=job,
+            success=False,
+            elapsed_seconds=time.perf_counter() - start,
+            error=str(e)
+        )
+
+
+def process_many(jobs: List[StampJob], default_config: Optional[StampConfig] = None,
+                 max_workers: Optional[int] = None) -> BatchResult:
+    """
+    使用进程池批量处理盖章任务
+
+    单个任务失败不会中断整个批次，失败原因记录在对应的结果中。
+
+    Args:
+        jobs (list): 盖章任务列表
+        default_config (StampConfig, optional): 任务未指定配置时使用的配置
+        max_workers (int, optional): 工作进程数，默认使用CPU核数；为1时在当前进程中顺序处理
+
+    Returns:
+        BatchResult: 与任务顺序一致的处理结果及吞吐量统计
+    """
+    if max_workers is not None and max_workers <= 0:
+        raise ValueError("工作进程数必须大于0")
+    max_workers = min(max_workers or os.cpu_count() or 1, max(len(jobs), 1))
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # Word文档在一次LibreOffice调用中全部转换，转换失败的任务直接记录结果
+        pdf_files, failures = convert_word_inputs(jobs, temp_dir)
+        results = [failures.get(index) for index in range(len(jobs))]
+        pending = [index for index, result in enumerate(results) if result is None]
+
+        if max_workers == 1:
+            for index in pending:
+                results[index] = run_job(jobs[index], default_config, pdf_files.get(index))
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker) as pool:
+                futures = {index: pool.submit(run_job, jobs[index], default_config, pdf_files.get(index))
+                           for index in pending}
+                for index, future in futures.items():
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        # 工作进程异常退出等无法在任务内部捕获的错误
+                        results[index] = StampJobResult(job=jobs[index], success=False, error=str(e))
+
+    return BatchResult(results=results, elapsed_seconds=time.perf_counter() - start)
+
+
+def convert_word_inputs(jobs: List[StampJob], output_dir: str) -> tuple:
+    """
+    将任务中的Word文档批量转换为PDF
+
+    Args:
+        jobs (list): 盖章任务列表
+        output_dir (str): 转换结果目录
+
+    Returns:
+        tuple: (任务序号 -> 转换后的PDF路径, 任务序号 -> 转换失败的结果)
+    """
+    word_jobs = [index for index, job in enumerate(jobs)
+                 if job.input_file.lower().endswith(('.doc', '.docx')) and os.path.exists(job.input_file)]
+    if not word_jobs:
+        return {}, {}
+
+    from convert.file_converter import FileConverter
+    start = time.perf_counter()
+    conversions = FileConverter.word_to_pdf_batch([jobs[index].input_file for index in word_jobs], output_dir)
+    elapsed = time.perf_counter() - start
+
+    pdf_files, failures = {}, {}
+    for index, conversion in zip(word_jobs, conversions):
+        if conversion.success:
+            pdf_files[index] = conversion.output_path
+        else:
+            failures[index] = StampJobResult(job=jobs[index], success=False, elapsed_seconds=elapsed,
+                                             error=conversion.error)
+    return pdf_files, failures
@@ -0,0 +1,29 @@
+import fitz
+import pytest
+from PIL import Image, ImageDraw
+
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """生成测试PDF的工厂函数，page_sizes按页循环使用"""
+    def _make_pdf(page_count: int, page_sizes=((595, 842),), name: str = "input.pdf") -> str:
+        path = str(tmp_path / name)
+        doc = fitz.open()
+        for index in range(page_count):
+            width, height = page_sizes[index % len(page_sizes)]
+            page = doc.new_page(width=width, height=height)
+            page.insert_text((72, 72), f"page {index + 1}")
+        doc.save(path)
+        doc.close()
+        return path
+    return _make_pdf
+
+
+@pytest.fixture
+def stamp_file(tmp_path) -> str:
+    """生成带透明背景的测试印章"""
+    path = str(tmp_path / "stamp.png")
+    img = Image.new('RGBA', (200, 200), (0, 0, 0, 0))
+    ImageDraw.Draw(img).ellipse((5, 5, 195, 195), outline=(220, 0, 0, 255), width=12)
+    img.save(path)
+    return path
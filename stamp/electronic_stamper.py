@@ -1,24 +1,56 @@
+from typing import Union
 import fitz
 from .base_stamper import BaseStamper
+from .stamp_type import StampType
 from .stamp_utils import StampUtils
+from .stamp_asset_cache import stamp_asset_cache
+from .image_encoder import StampImageEncoder
+from .placement_planner import FULL_STAMP, PlacementPlan, PlacementPlanner, page_size_table
 
 class ElectronicStamper(BaseStamper):
     """电子章处理器"""
     
-    def apply_stamp(self, pdf_doc: fitz.Document, stamp_file: str) -> None:
-        stamp_size_pt = StampUtils.mm_to_points(self.config.stamp_size_mm)
-        margin_right_pt = StampUtils.mm_to_points(self.config.margin_right_mm)
-        margin_bottom_pt = StampUtils.mm_to_points(self.config.margin_bottom_mm)
-        
-        for page in pdf_doc:
-            page_rect = page.rect
-            
-            # 计算印章位置
-            x = page_rect.width - margin_right_pt - stamp_size_pt
-            y = page_rect.height - margin_bottom_pt - stamp_size_pt
-            
-            # 创建印章区域
-            rect = fitz.Rect(x, y, x + stamp_size_pt, y + stamp_size_pt)
-            
-            # 插入印章
-            page.insert_image(rect, filename=stamp_file) 
\ No newline at end of file
+    def prepare(self, pdf_doc: fitz.Document, stamp_file: Union[str, bytes], plan: PlacementPlan = None) -> None:
+        self._stamp_file = stamp_file
+        if plan is None:
+            plan = PlacementPlanner(self.config).plan(page_size_table(pdf_doc), StampType.STAMP)
+
+        # 每页的电子章矩形：页码 -> (x0, y0, x1, y1)
+        stamps = plan.slice_id == FULL_STAMP
+        self._rects = dict(zip(plan.page_index[stamps].tolist(), plan.rects[stamps].tolist()))
+
+        # 印章图片只在第一页嵌入一次，其余页面通过xref引用同一个图像对象
+        self._xref = 0
+        self.image_bytes_saved = 0
+
+        # 启用图像编码时按印章尺寸和DPI缩小后重新编码，否则按原样嵌入印章文件
+        self._encoded = None
+        if self.config.encodes_images:
+            stamp_size_pt = StampUtils.mm_to_points(self.config.stamp_size_mm)
+            self._encoded_size = StampImageEncoder.target_size(stamp_asset_cache.get_image(stamp_file).size,
+                                                               (stamp_size_pt, stamp_size_pt), self.config.stamp_dpi)
+            self._encoded = stamp_asset_cache.get_encoded(stamp_file, self._encoded_size,
+                                                          encoding=self.config.image_encoding,
+                                                          jpeg_quality=self.config.jpeg_quality)
+
+    def stamp_page(self, page: fitz.Page) -> None:
+        rect = self._rects.get(page.number)
+        if rect is None:
+            return
+        rect = fitz.Rect(rect)
+
+        # 插入印章
+        if self._xref:
+            page.insert_image(rect, xref=self._xref)
+        elif self._encoded is not None:
+            self._xref = self._encoded.insert(page, rect)
+            # 与按原样嵌入印章文件相比，嵌入PDF后的图像数据减少的字节数
+            self.image_bytes_saved = (stamp_asset_cache.get_embedded_size(self._stamp_file)
+                                      - stamp_asset_cache.get_embedded_size(self._stamp_file, self._encoded_size,
+                                                                            encoding=self.config.image_encoding,
+                                                                            jpeg_quality=self.config.jpeg_quality))
+        else:
+            if isinstance(self._stamp_file, bytes):
+                self._xref = page.insert_image(rect, stream=self._stamp_file)
+            else:
+                self._xref = page.insert_image(rect, filename=self._stamp_file)
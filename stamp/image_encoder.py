@@ -0,0 +1,177 @@
+import io
+from dataclasses import dataclass
+from enum import Enum
+from typing import Optional, Tuple
+import fitz
+import numpy as np
+from PIL import Image
+
+class ImageEncoding(Enum):
+    """
+    印章图像编码方式枚举类
+
+    定义了三种编码方式：
+    - PNG: 全彩RGBA PNG（原有行为）
+    - PALETTE: 颜色量化为少量颜色；接近单色（如红色）的印章只保留一种颜色，形状完全由透明度蒙版表示
+    - JPEG: 颜色部分编码为JPEG，透明度作为单独的软蒙版（SMask）
+    """
+    PNG = "png"          # 全彩PNG
+    PALETTE = "palette"  # 调色板量化
+    JPEG = "jpeg"        # JPEG+透明度蒙版
+
+
+@dataclass
+class EncodedImage:
+    """
+    编码后的印章图像
+
+    属性:
+        stream (bytes): 颜色部分的图像字节（PNG或JPEG），PNG编码时包含透明度
+        mask (bytes): 透明度蒙版的灰度PNG字节，插入PDF后成为SMask；不需要单独蒙版时为None
+    """
+    stream: bytes
+    mask: Optional[bytes] = None
+
+    @property
+    def nbytes(self) -> int:
+        """编码后的总字节数"""
+        return len(self.stream) + len(self.mask or b"")
+
+    def insert(self, page: fitz.Page, rect: fitz.Rect) -> int:
+        """
+        插入到页面的指定区域
+
+        Returns:
+            int: 图像的xref，其余位置可通过xref引用
+        """
+        if self.mask is None:
+            return page.insert_image(rect, stream=self.stream)
+        return page.insert_image(rect, stream=self.stream, mask=self.mask)
+
+
+class StampImageEncoder:
+    """
+    印章图像编码器
+
+    用户上传的印章常是数千像素见方的RGBA PNG，按原样嵌入会让每份盖章文件增大数MB。
+    编码前先按打印尺寸和有效DPI缩小，再按编码方式压缩颜色部分；透明像素的颜色不可见，
+    编码前统一填充为印章主色，避免无意义的颜色数据影响压缩。
+    """
+
+    # 非单色印章量化后的颜色数
+    PALETTE_COLORS = 16
+    # 透明度不低于该值的像素参与主色统计
+    VISIBLE_ALPHA = 128
+    # 与主色各通道差值不超过该值的像素视为同一种颜色
+    SINGLE_COLOR_TOLERANCE = 48
+    # 同色像素占可见像素的比例不低于该值时视为单色印章
+    SINGLE_COLOR_RATIO = 0.98
+
+    @staticmethod
+    def target_size(image_size: Tuple[int, int], rect_size_pt: Tuple[float, float],
+                    dpi: Optional[int]) -> Optional[Tuple[int, int]]:
+        """
+        计算按有效打印DPI缩小后的像素尺寸
+
+        Args:
+            image_size (tuple): 原图(宽, 高)像素
+            rect_size_pt (tuple): 印章在页面上的(宽, 高)，单位为点
+            dpi (int): 有效打印DPI，None表示不缩小
+
+        Returns:
+            tuple: 缩小后的(宽, 高)；不需要缩小时返回None，图像不会被放大
+        """
+        if dpi is None:
+            return None
+        width = min(max(1, round(rect_size_pt[0] / 72 * dpi)), image_size[0])
+        height = min(max(1, round(rect_size_pt[1] / 72 * dpi)), image_size[1])
+        if (width, height) == tuple(image_size):
+            return None
+        return width, height
+
+    @staticmethod
+    def measure(image: EncodedImage) -> int:
+        """
+        图像嵌入PDF后占用的字节数（图像及其透明度蒙版的压缩数据）
+        MuPDF会把PNG解码后在保存时重新压缩，因此在临时文档中插入并压缩保存后统计
+        """
+        with fitz.open() as pdf_doc:
+            page = pdf_doc.new_page()
+            image.insert(page, page.rect)
+            data = pdf_doc.tobytes(deflate=True)
+        with fitz.open(stream=data, filetype="pdf") as pdf_doc:
+            return sum(len(pdf_doc.xref_stream_raw(xref)) for xref in range(1, pdf_doc.xref_length())
+                       if pdf_doc.xref_get_key(xref, "Subtype") == ("name", "/Image"))
+
+    @staticmethod
+    def encode(image: Image.Image, encoding: ImageEncoding, jpeg_quality: int = 85) -> EncodedImage:
+        """
+        编码RGBA印章图像
+
+        Args:
+            image (Image.Image): RGBA图像
+            encoding (ImageEncoding): 编码方式
+            jpeg_quality (int): JPEG质量（1-95），仅JPEG编码使用
+
+        Returns:
+            EncodedImage: 编码结果
+        """
+        if encoding is ImageEncoding.PNG:
+            return EncodedImage(StampImageEncoder._png(image))
+
+        pixels = np.asarray(image)
+        alpha = pixels[..., 3]
+        mask = None if alpha.min() == 255 else StampImageEncoder._png(Image.fromarray(alpha, "L"))
+        single_color = StampImageEncoder.single_color(pixels)
+
+        if encoding is ImageEncoding.PALETTE and single_color is not None:
+            # 单色印章：颜色部分只有一种颜色，压缩后几乎不占空间
+            color = Image.new("P", image.size, 0)
+            color.putpalette(single_color)
+            return EncodedImage(StampImageEncoder._png(color), mask)
+
+        # 透明像素填充为主色，减少颜色部分的无效细节
+        rgb = pixels[..., :3].copy()
+        rgb[alpha == 0] = single_color or StampImageEncoder._main_color(pixels)
+        color = Image.fromarray(rgb, "RGB")
+        if encoding is ImageEncoding.PALETTE:
+            return EncodedImage(StampImageEncoder._png(color.quantize(StampImageEncoder.PALETTE_COLORS)), mask)
+
+        buffer = io.BytesIO()
+        color.save(buffer, format="JPEG", quality=jpeg_quality)
+        return EncodedImage(buffer.getvalue(), mask)
+
+    @staticmethod
+    def single_color(pixels: np.ndarray) -> Optional[Tuple[int, int, int]]:
+        """
+        判断印章是否接近单色
+
+        Args:
+            pixels (np.ndarray): (高, 宽, 4) 的RGBA像素
+
+        Returns:
+            tuple: 单色印章的主色(R, G, B)，多色印章返回None
+        """
+        visible = pixels[pixels[..., 3] >= StampImageEncoder.VISIBLE_ALPHA][:, :3]
+        if len(visible) == 0:
+            return 0, 0, 0  # 完全透明，颜色无关紧要
+        main_color = np.median(visible, axis=0)
+        same = (np.abs(visible.astype(np.int16) - main_color).max(axis=1) <= StampImageEncoder.SINGLE_COLOR_TOLERANCE)
+        if same.mean() < StampImageEncoder.SINGLE_COLOR_RATIO:
+            return None
+        return tuple(int(value) for value in main_color)
+
+    @staticmethod
+    def _main_color(pixels: np.ndarray) -> Tuple[int, int, int]:
+        """可见像素的中位颜色"""
+        visible = pixels[pixels[..., 3] >= StampImageEncoder.VISIBLE_ALPHA][:, :3]
+        if len(visible) == 0:
+            return 0, 0, 0
+        return tuple(int(value) for value in np.median(visible, axis=0))
+
+    @staticmethod
+    def _png(image: Image.Image) -> bytes:
+        """编码为优化压缩的PNG"""
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG", optimize=True)
+        return buffer.getvalue()
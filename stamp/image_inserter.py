@@ -1,9 +1,11 @@
 import fitz
 import os
-from PIL import Image
-import io
-from typing import Union, Tuple, Optional
+from typing import BinaryIO, Union, Tuple, Optional
 from .stamp_utils import StampUtils
+from .stamp_asset_cache import stamp_asset_cache
+from .save_profile import SaveProfile, SaveResult
+from .stamp_config import StampConfig
+from .image_encoder import StampImageEncoder
 
 class ImageInserter:
     """图片插入器，用于将图片插入到PDF的指定页面"""
@@ -17,8 +19,10 @@ class ImageInserter:
         position: Tuple[float, float] = None,
         size_mm: Union[float, Tuple[float, float]] = None,
         margin_right_mm: float = None,
-        margin_bottom_mm: float = None
-    ) -> None:
+        margin_bottom_mm: float = None,
+        save_profile: SaveProfile = SaveProfile.COMPACT,
+        config: StampConfig = None
+    ) -> SaveResult:
         """
         将图片插入到PDF指定页面的指定位置
 
@@ -32,6 +36,12 @@ class ImageInserter:
                                               可以是单个数值（等比缩放）或(宽,高)元组
             margin_right_mm (float, optional): 距右边距，单位为毫米，与position互斥
             margin_bottom_mm (float, optional): 距下边距，单位为毫米，与position互斥
+            save_profile (SaveProfile, optional): 保存方式，默认COMPACT
+            config (StampConfig, optional): 只使用其中的图像编码选项（stamp_dpi、image_encoding、jpeg_quality），
+                                            默认按原样嵌入PNG
+
+        Returns:
+            SaveResult: 保存结果（写入字节数、耗时和图像编码节省的字节数）
         """
         # 参数检查
         if not os.path.exists(pdf_file):
@@ -44,74 +54,145 @@ class ImageInserter:
         # 确保输出目录存在
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
 
+        pdf_doc = None
         try:
             # 打开PDF文件
-            pdf_doc = fitz.open(pdf_file)
-            
-            # 检查页码是否有效
-            if not 0 <= page_number < len(pdf_doc):
-                raise ValueError(f"无效的页码: {page_number}，文档共{len(pdf_doc)}页")
-
-            # 获取目标页面
-            page = pdf_doc[page_number]
+            pdf_doc = StampUtils.open_pdf(pdf_file, output_file, save_profile)
             
-            # 打开并处理图片
-            with Image.open(image_file) as img:
-                # 如果图片不是RGBA模式，转换为RGBA
-                if img.mode != 'RGBA':
-                    img = img.convert('RGBA')
-                
-                # 计算图片尺寸
-                if size_mm:
-                    if isinstance(size_mm, (int, float)):
-                        # 等比缩放
-                        width_pt = StampUtils.mm_to_points(size_mm)
-                        scale = width_pt / img.width
-                        height_pt = img.height * scale
-                    else:
-                        # 指定宽高
-                        width_pt = StampUtils.mm_to_points(size_mm[0])
-                        height_pt = StampUtils.mm_to_points(size_mm[1])
-                else:
-                    # 使用原始尺寸
-                    width_pt = img.width
-                    height_pt = img.height
-
-                # 计算插入位置
-                if position:
-                    # 使用指定位置
-                    x = StampUtils.mm_to_points(position[0])
-                    y = StampUtils.mm_to_points(position[1])
-                else:
-                    # 使用边距定位
-                    if margin_right_mm is None:
-                        x = 0  # 默认左对齐
-                    else:
-                        x = page.rect.width - width_pt - StampUtils.mm_to_points(margin_right_mm)
-                    
-                    if margin_bottom_mm is None:
-                        y = 0  # 默认顶部对齐
-                    else:
-                        y = page.rect.height - height_pt - StampUtils.mm_to_points(margin_bottom_mm)
-
-                # 定义插入区域
-                rect = fitz.Rect(x, y, x + width_pt, y + height_pt)
-
-                # 将图片保存到字节流
-                img_bytes = io.BytesIO()
-                img.save(img_bytes, format='PNG')
-                img_bytes.seek(0)
-
-                # 将图片插入到PDF
-                page.insert_image(rect, stream=img_bytes.getvalue())
+            image_bytes_saved = ImageInserter._insert(pdf_doc, image_file, page_number, position, size_mm,
+                                                      margin_right_mm, margin_bottom_mm, config)
 
             # 保存修改后的PDF
-            pdf_doc.save(output_file, garbage=4, deflate=True)
-            print(f"已成功将图片插入到第{page_number + 1}页，生成文件：{output_file}")
+            save_result = StampUtils.save_pdf(pdf_doc, output_file, save_profile)
+            save_result.image_bytes_saved = image_bytes_saved
+            print(f"已成功将图片插入到第{page_number + 1}页，生成文件：{output_file}，"
+                  f"写入{save_result.bytes_written}字节，保存耗时{save_result.elapsed_seconds:.2f}秒"
+                  f"{StampUtils.saved_message(image_bytes_saved)}")
+            return save_result
 
         except Exception as e:
+            if pdf_doc is not None:
+                pdf_doc.close()
+                pdf_doc = None
+            # 增量保存预先复制到输出路径的文件不能留作结果
+            StampUtils.discard_output(pdf_file, output_file, save_profile)
             raise Exception(f"插入图片时出错: {str(e)}")
 
         finally:
-            if 'pdf_doc' in locals():
-                pdf_doc.close() 
\ No newline at end of file
+            if pdf_doc is not None:
+                pdf_doc.close() 
+
+    @staticmethod
+    def insert_image_stream(
+        pdf_data: Union[bytes, BinaryIO],
+        image_data: Union[bytes, BinaryIO],
+        page_number: int,
+        position: Tuple[float, float] = None,
+        size_mm: Union[float, Tuple[float, float]] = None,
+        margin_right_mm: float = None,
+        margin_bottom_mm: float = None,
+        save_profile: SaveProfile = SaveProfile.COMPACT,
+        config: StampConfig = None
+    ) -> bytes:
+        """
+        在内存中将图片插入到PDF指定页面的指定位置，输入和输出都是字节
+
+        Args:
+            pdf_data (bytes or BinaryIO): 输入PDF的字节或二进制缓冲区
+            image_data (bytes or BinaryIO): 要插入的图片的字节或二进制缓冲区
+            page_number (int): 要插入的页码（从0开始）
+            其余参数与insert_image相同；内存输出不支持增量保存，按FAST处理
+
+        Returns:
+            bytes: 插入图片后的PDF字节
+        """
+        if position and (margin_right_mm is not None or margin_bottom_mm is not None):
+            raise ValueError("position参数与margin参数不能同时使用")
+        pdf_data = StampUtils.read_data(pdf_data)
+        image_data = StampUtils.read_data(image_data)
+
+        try:
+            with fitz.open(stream=pdf_data, filetype="pdf") as pdf_doc:
+                image_bytes_saved = ImageInserter._insert(pdf_doc, image_data, page_number, position, size_mm,
+                                                          margin_right_mm, margin_bottom_mm, config)
+                output_data, save_result = StampUtils.pdf_to_bytes(pdf_doc, save_profile)
+            print(f"已成功将图片插入到第{page_number + 1}页，生成{save_result.bytes_written}字节，"
+                  f"保存耗时{save_result.elapsed_seconds:.2f}秒{StampUtils.saved_message(image_bytes_saved)}")
+            return output_data
+        except Exception as e:
+            raise Exception(f"插入图片时出错: {str(e)}")
+
+    @staticmethod
+    def _insert(
+        pdf_doc: fitz.Document,
+        image_source: Union[str, bytes],
+        page_number: int,
+        position: Optional[Tuple[float, float]],
+        size_mm: Union[float, Tuple[float, float], None],
+        margin_right_mm: Optional[float],
+        margin_bottom_mm: Optional[float],
+        config: Optional[StampConfig] = None
+    ) -> int:
+        """
+        在已打开的文档上插入图片，image_source为图片文件路径或图片字节
+        :return: 图像编码节省的字节数，未启用编码时为0
+        """
+        # 检查页码是否有效
+        if not 0 <= page_number < len(pdf_doc):
+            raise ValueError(f"无效的页码: {page_number}，文档共{len(pdf_doc)}页")
+
+        # 获取目标页面
+        page = pdf_doc[page_number]
+        
+        # 获取RGBA图片，解码和转换结果由进程级素材缓存复用
+        img = stamp_asset_cache.get_image(image_source)
+
+        # 计算图片尺寸
+        if size_mm:
+            if isinstance(size_mm, (int, float)):
+                # 等比缩放
+                width_pt = StampUtils.mm_to_points(size_mm)
+                scale = width_pt / img.width
+                height_pt = img.height * scale
+            else:
+                # 指定宽高
+                width_pt = StampUtils.mm_to_points(size_mm[0])
+                height_pt = StampUtils.mm_to_points(size_mm[1])
+        else:
+            # 使用原始尺寸
+            width_pt = img.width
+            height_pt = img.height
+
+        # 计算插入位置
+        if position:
+            # 使用指定位置
+            x = StampUtils.mm_to_points(position[0])
+            y = StampUtils.mm_to_points(position[1])
+        else:
+            # 使用边距定位
+            if margin_right_mm is None:
+                x = 0  # 默认左对齐
+            else:
+                x = page.rect.width - width_pt - StampUtils.mm_to_points(margin_right_mm)
+            
+            if margin_bottom_mm is None:
+                y = 0  # 默认顶部对齐
+            else:
+                y = page.rect.height - height_pt - StampUtils.mm_to_points(margin_bottom_mm)
+
+        # 定义插入区域
+        rect = fitz.Rect(x, y, x + width_pt, y + height_pt)
+
+        # 将图片插入到PDF
+        if config is None or not config.encodes_images:
+            page.insert_image(rect, stream=stamp_asset_cache.get_png(image_source))
+            return 0
+
+        # 按插入区域和DPI缩小后重新编码
+        size = StampImageEncoder.target_size(img.size, (rect.width, rect.height), config.stamp_dpi)
+        encoded = stamp_asset_cache.get_encoded(image_source, size, encoding=config.image_encoding,
+                                                jpeg_quality=config.jpeg_quality)
+        encoded.insert(page, rect)
+        return (stamp_asset_cache.get_embedded_size(image_source)
+                - stamp_asset_cache.get_embedded_size(image_source, size, encoding=config.image_encoding,
+                                                      jpeg_quality=config.jpeg_quality))
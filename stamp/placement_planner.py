@@ -0,0 +1,220 @@
+from dataclasses import dataclass
+from typing import Tuple
+import fitz
+import numpy as np
+from .stamp_type import StampType
+from .stamp_config import StampConfig
+from .stamp_utils import StampUtils
+
+# 电子章在slice_id中的取值，骑缝章切片的编号从0开始
+FULL_STAMP = -1
+
+
+def page_size_table(pdf_doc: fitz.Document) -> np.ndarray:
+    """
+    读取文档每页的宽高
+
+    Args:
+        pdf_doc (fitz.Document): PDF文档对象
+
+    Returns:
+        np.ndarray: 形状为(页数, 2)的宽高表，与page.rect一致（已考虑页面旋转）
+    """
+    sizes = np.empty((len(pdf_doc), 2), dtype=np.float64)
+    for index in range(len(pdf_doc)):
+        rect = pdf_doc[index].rect
+        sizes[index] = (rect.width, rect.height)
+    return sizes
+
+
+@dataclass
+class PlacementPlan:
+    """
+    一份文档的全部印章位置
+
+    每个印章位置占一行，按页码排序，同一页内骑缝章在前、电子章在后，与盖章时的叠放顺序一致。
+
+    属性:
+        page_count (int): 文档页数
+        size_classes (np.ndarray): (尺寸类数, 2) 文档中出现的不同页面宽高
+        page_class (np.ndarray): (页数,) 每页所属的尺寸类
+        page_index (np.ndarray): (位置数,) 印章所在页码
+        rects (np.ndarray): (位置数, 4) 印章矩形 x0, y0, x1, y1，单位为点
+        slice_id (np.ndarray): (位置数,) 骑缝章切片编号，电子章为FULL_STAMP
+        slices (np.ndarray): (切片数, 2) 每种切片的(组页数, 组内相对索引)
+    """
+    page_count: int
+    size_classes: np.ndarray
+    page_class: np.ndarray
+    page_index: np.ndarray
+    rects: np.ndarray
+    slice_id: np.ndarray
+    slices: np.ndarray
+
+    def page_offsets(self) -> np.ndarray:
+        """每页印章位置在数组中的起止下标：第p页为[offsets[p], offsets[p + 1])"""
+        return np.searchsorted(self.page_index, np.arange(self.page_count + 1))
+
+    def to_dict(self) -> dict:
+        """转换为可JSON序列化的字典"""
+        return {
+            "page_count": self.page_count,
+            "size_classes": self.size_classes.tolist(),
+            "page_class": self.page_class.tolist(),
+            "slices": self.slices.tolist(),
+            "placements": {
+                "page_index": self.page_index.tolist(),
+                "rect": self.rects.tolist(),
+                "slice_id": self.slice_id.tolist(),
+            },
+        }
+
+
+class PlacementPlanner:
+    """
+    印章位置规划器
+
+    按页面宽高把页面分为若干尺寸类，用NumPy一次计算出整份文档所有电子章和骑缝章的矩形，
+    电子章和骑缝章处理器只需按计划逐页插入图像。计算结果与逐页计算完全一致：
+    骑缝章的垂直位置以第一页高度为参考，水平位置贴齐各页右边缘。
+    """
+
+    # 两个骑缝章之间的垂直间距（毫米）
+    SEAL_VERTICAL_SPACING_MM = 10
+    # 距离顶部的起始位置（毫米）
+    TOP_MARGIN_MM = 20
+
+    def __init__(self, config: StampConfig):
+        self.config = config
+
+    def pages_per_seal(self, total_pages: int) -> int:
+        """
+        计算每组骑缝章实际跨越的页数
+        :param total_pages: 文档总页数
+        :return: 每组页数，未指定或超过总页数时使用总页数
+        """
+        return (self.config.pages_per_seal
+                if self.config.pages_per_seal is not None and self.config.pages_per_seal <= total_pages
+                else total_pages)
+
+    def plan(self, page_sizes: np.ndarray, stamp_type: StampType) -> PlacementPlan:
+        """
+        计算整份文档的印章位置
+
+        Args:
+            page_sizes (np.ndarray): page_size_table得到的(页数, 2)宽高表
+            stamp_type (StampType): 印章类型
+
+        Returns:
+            PlacementPlan: 按页码排序的印章位置
+        """
+        page_sizes = np.asarray(page_sizes, dtype=np.float64).reshape(-1, 2)
+        page_count = len(page_sizes)
+        size_classes, page_class = np.unique(page_sizes, axis=0, return_inverse=True)
+        page_class = page_class.reshape(-1).astype(np.int32)
+
+        parts = []
+        slices = np.empty((0, 2), dtype=np.int32)
+        if stamp_type in (StampType.BOTH, StampType.SEAL):
+            seal_pages, seal_rects, seal_slices, slices = self._plan_seals(size_classes, page_class)
+            parts.append((seal_pages, seal_rects, seal_slices, 0))
+        if stamp_type in (StampType.BOTH, StampType.STAMP):
+            stamp_pages, stamp_rects = self._plan_stamps(size_classes, page_class)
+            parts.append((stamp_pages, stamp_rects, np.full(page_count, FULL_STAMP, dtype=np.int32), 1))
+
+        if parts:
+            page_index = np.concatenate([part[0] for part in parts])
+            rects = np.concatenate([part[1] for part in parts])
+            slice_id = np.concatenate([part[2] for part in parts])
+            layer = np.concatenate([np.full(len(part[0]), part[3], dtype=np.int8) for part in parts])
+            # 稳定排序：按页码，同一页内骑缝章在电子章之前，骑缝章之间保持组号、序号顺序
+            order = np.lexsort((layer, page_index))
+            page_index, rects, slice_id = page_index[order], rects[order], slice_id[order]
+        else:
+            page_index = np.empty(0, dtype=np.int32)
+            rects = np.empty((0, 4), dtype=np.float64)
+            slice_id = np.empty(0, dtype=np.int32)
+
+        return PlacementPlan(
+            page_count=page_count,
+            size_classes=size_classes,
+            page_class=page_class,
+            page_index=page_index.astype(np.int32),
+            rects=rects,
+            slice_id=slice_id.astype(np.int32),
+            slices=slices,
+        )
+
+    def _plan_stamps(self, size_classes: np.ndarray, page_class: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """电子章：每页右下角一个，按尺寸类计算后展开到各页"""
+        stamp_size_pt = StampUtils.mm_to_points(self.config.stamp_size_mm)
+        x = size_classes[:, 0] - StampUtils.mm_to_points(self.config.margin_right_mm) - stamp_size_pt
+        y = size_classes[:, 1] - StampUtils.mm_to_points(self.config.margin_bottom_mm) - stamp_size_pt
+        class_rects = np.stack([x, y, x + stamp_size_pt, y + stamp_size_pt], axis=1)
+        return np.arange(len(page_class), dtype=np.int32), class_rects[page_class]
+
+    def _plan_seals(self, size_classes: np.ndarray, page_class: np.ndarray) -> tuple:
+        """
+        骑缝章：文档分为若干组，每组的最后一页同时是下一组的第一页，组内每页贴一条切片
+
+        Returns:
+            tuple: (页码, 矩形, 切片编号, 切片表)
+        """
+        total_pages = len(page_class)
+        empty = (np.empty(0, dtype=np.int32), np.empty((0, 4)), np.empty(0, dtype=np.int32),
+                 np.empty((0, 2), dtype=np.int32))
+        if total_pages < 2:
+            return empty  # 单页文档不需要骑缝章
+
+        seal_size_pt = StampUtils.mm_to_points(self.config.stamp_size_mm)
+        seal_count = self.config.seal_count
+        pages_per_seal = self.pages_per_seal(total_pages)
+
+        # 计算需要多少组骑缝章（考虑重叠页面），向上取整确保覆盖所有页面
+        if pages_per_seal > 1:
+            seal_groups = (total_pages + pages_per_seal - 2) // (pages_per_seal - 1)
+        else:
+            seal_groups = 1
+
+        # 每组的起始页、结束页（不包含）和组页数，最后一组包含剩余的全部页面
+        groups = np.arange(seal_groups)
+        start = groups * (pages_per_seal - 1)
+        end = np.minimum(start + pages_per_seal, total_pages)
+        pages_in_group = end - start
+        pages_in_group[-1] = total_pages - start[-1]
+        slice_width = np.trunc(seal_size_pt / pages_in_group)
+
+        # 每组每个骑缝章的垂直中心位置，以第一页高度为参考，超出页面底部时从顶部循环
+        seal_spacing_pt = StampUtils.mm_to_points(self.SEAL_VERTICAL_SPACING_MM)
+        top_margin_pt = StampUtils.mm_to_points(self.TOP_MARGIN_MM)
+        page_height = size_classes[page_class[0], 1]
+        base_y_position = (seal_size_pt * 1.5) * (np.arange(seal_count) + 1)
+        raw_y_position = base_y_position[None, :] + (groups * (seal_size_pt + seal_spacing_pt))[:, None]
+        period = page_height - seal_size_pt - top_margin_pt
+        cycles = np.trunc(raw_y_position / period)
+        y_position = np.where(raw_y_position + seal_size_pt > page_height,
+                              top_margin_pt + (raw_y_position - cycles * period),
+                              raw_y_position)
+
+        # 展开为(组, 组内页, 骑缝章)三重循环顺序的位置列表
+        pages_covered = end - start
+        counts = pages_covered * seal_count
+        group_of = np.repeat(groups, counts)
+        offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        relative_index = offset // seal_count
+        seal_index = offset % seal_count
+        page_index = start[group_of] + relative_index
+
+        # 相同(组页数, 相对索引)的切片内容一致，编为同一个切片
+        keys = np.stack([pages_in_group[group_of], relative_index], axis=1)
+        slices, slice_id = np.unique(keys, axis=0, return_inverse=True)
+
+        width = slice_width[group_of]
+        x = size_classes[page_class[page_index], 0] - width
+        y = y_position[group_of, seal_index] - (seal_size_pt / 2)
+        rects = np.stack([x, y, x + width, y + seal_size_pt], axis=1)
+
+        # 按页码稳定排序，同一页上先放前一组的骑缝章
+        order = np.argsort(page_index, kind="stable")
+        return (page_index[order].astype(np.int32), rects[order], slice_id.reshape(-1)[order].astype(np.int32),
+                slices.astype(np.int32))
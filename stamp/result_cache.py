@@ -0,0 +1,60 @@
+import dataclasses
+import hashlib
+import json
+from enum import Enum
+from typing import Optional
+
+import fitz
+
+from common.disk_cache import DiskLRUCache
+
+from .save_profile import SaveProfile
+from .stamp_config import StampConfig
+from .stamp_type import StampType
+
+
+class StampResultCache(DiskLRUCache):
+    """
+    盖章结果的磁盘缓存
+
+    客户端经常重复提交同一份文件和同一枚印章（重试、多人先后点击盖章）。缓存以输入文件内容、
+    印章内容、StampConfig各字段、印章类型和保存方式的哈希为键，保存上次生成的PDF，
+    命中时直接复制结果，跳过转换、盖章和保存。保存时不生成新的文件ID，相同输入的输出逐字节一致，
+    因此缓存结果与重新处理的结果完全相同。
+
+    存储和淘汰由DiskLRUCache负责。
+    """
+
+    # 默认磁盘预算：1GB
+    DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+    # 缓存键版本，盖章或保存方式的输出发生变化时递增，使旧结果失效
+    KEY_VERSION = 1
+
+    @classmethod
+    def make_key(cls, input_file: str, stamp_file: str, config: StampConfig, stamp_type: StampType,
+                 save_profile: Optional[SaveProfile] = None) -> str:
+        """
+        计算缓存键
+
+        Args:
+            input_file (str): 输入文件路径（PDF或Word文档）
+            stamp_file (str): 印章图片文件路径
+            config (StampConfig): 印章配置
+            stamp_type (StampType): 印章类型
+            save_profile (SaveProfile, optional): 实际使用的保存方式，默认使用配置中的save_profile
+
+        Returns:
+            str: 十六进制SHA-256缓存键
+        """
+        fields = dataclasses.asdict(config)
+        fields["save_profile"] = save_profile or config.save_profile
+        digest = hashlib.sha256()
+        digest.update(json.dumps({
+            "version": cls.KEY_VERSION,
+            "mupdf": fitz.VersionBind,
+            "input": cls.file_digest(input_file),
+            "stamp": cls.file_digest(stamp_file),
+            "config": fields,
+            "stamp_type": stamp_type,
+        }, sort_keys=True, default=lambda value: value.value if isinstance(value, Enum) else str(value)).encode("utf-8"))
+        return digest.hexdigest()
@@ -0,0 +1,37 @@
+from dataclasses import dataclass
+from enum import Enum
+from typing import Optional
+
+class SaveProfile(Enum):
+    """
+    PDF保存方式枚举类
+
+    定义了三种保存方式：
+    - FAST: 轻量垃圾回收，只删除未引用的对象，保存速度最快
+    - COMPACT: 完整垃圾回收并合并重复对象，输出文件最小（原有行为）
+    - INCREMENTAL: 增量追加，只在原文件字节之后写入修改过的对象
+    """
+    FAST = "fast"                # 快速保存
+    COMPACT = "compact"          # 压缩保存
+    INCREMENTAL = "incremental"  # 增量保存
+
+
+@dataclass
+class SaveResult:
+    """
+    PDF保存结果数据类
+
+    属性:
+        output_file (str): 输出文件路径，输出到内存时为None
+        profile (SaveProfile): 实际使用的保存方式
+        bytes_written (int): 本次写入的字节数，增量保存时只计算追加部分
+        elapsed_seconds (float): 保存耗时，单位秒
+        from_cache (bool): 结果是否直接取自盖章结果缓存
+        image_bytes_saved (int): 印章图像编码（缩小DPI、量化、JPEG）相比按原样嵌入节省的图像字节数
+    """
+    output_file: Optional[str]
+    profile: SaveProfile
+    bytes_written: int
+    elapsed_seconds: float
+    from_cache: bool = False
+    image_bytes_saved: int = 0
@@ -0,0 +1,15 @@
+from enum import Enum
+
+class SealRenderer(Enum):
+    """
+    骑缝章切片的绘制方式枚举类
+
+    定义了两种绘制方式：
+    - CROP: 按组页数把印章裁剪为多张切片PNG，每种切片分别嵌入（原有行为）
+    - CLIP: 整枚印章只嵌入一次，各页通过表单XObject的裁剪区域和偏移显示各自的切片，不产生逐页的位图数据
+
+    CLIP方式每个骑缝章位置会增加一个很小的表单对象，组页数很大、切片只有1~2点宽时，
+    裁剪出的切片PNG本身已经很小，输出文件可能反而略大，见benchmarks/bench_seal_renderer.py。
+    """
+    CROP = "crop"  # 裁剪切片
+    CLIP = "clip"  # 共享图像+裁剪区域
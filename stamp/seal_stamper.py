@@ -1,112 +1,148 @@
+from typing import Union
 import fitz
-from PIL import Image
-import io
 from .base_stamper import BaseStamper
+from .stamp_type import StampType
+from .stamp_config import StampConfig
+from .seal_renderer import SealRenderer
 from .stamp_utils import StampUtils
+from .stamp_asset_cache import stamp_asset_cache
+from .image_encoder import EncodedImage, StampImageEncoder
+from .placement_planner import FULL_STAMP, PlacementPlan, PlacementPlanner, page_size_table
 
 class SealStamper(BaseStamper):
     """骑缝章处理器"""
-    
-    # 两个骑缝章之间的垂直间距（毫米）
-    SEAL_VERTICAL_SPACING_MM = 10
-    # 距离顶部的起始位置（毫米）
-    TOP_MARGIN_MM = 20
 
-    def apply_stamp(self, pdf_doc: fitz.Document, stamp_file: str) -> None:
-        # 将印章尺寸从毫米转换为PDF点数
+    def __init__(self, config: StampConfig):
+        super().__init__(config)
+        # CLIP方式使用的单页印章文档，首次盖章时创建，close时关闭
+        self._seal_doc = None
+
+    def pages_per_seal(self, total_pages: int) -> int:
+        """
+        计算每组骑缝章实际跨越的页数
+        :param total_pages: 文档总页数
+        :return: 每组页数，未指定或超过总页数时使用总页数
+        """
+        return PlacementPlanner(self.config).pages_per_seal(total_pages)
+
+    def prepare(self, pdf_doc: fitz.Document, stamp_file: Union[str, bytes], plan: PlacementPlan = None) -> None:
+        self._stamp_file = stamp_file
+        if plan is None:
+            plan = PlacementPlanner(self.config).plan(page_size_table(pdf_doc), StampType.SEAL)
+
+        # 每页的骑缝章位置：页码 -> [(矩形, 切片编号), ...]，版面由规划器一次算好
+        self._placements = {}
+        seals = plan.slice_id != FULL_STAMP
+        for page_index, rect, slice_id in zip(plan.page_index[seals].tolist(), plan.rects[seals].tolist(),
+                                              plan.slice_id[seals].tolist()):
+            self._placements.setdefault(page_index, []).append((rect, slice_id))
+        # 切片编号 -> (组页数, 组内相对索引)
+        self._slices = plan.slices.tolist()
+        # 切片缓存：切片编号 -> 已插入图像的xref
+        self._slice_xrefs = {}
+        # 上次未调用close时先关闭旧的单页印章文档
+        self.close()
+
+        # 印章图像的像素尺寸，解码、RGBA转换和缩放由进程级素材缓存完成
         seal_size_pt = StampUtils.mm_to_points(self.config.stamp_size_mm)
-        # 获取PDF文档的总页数
-        total_pages = len(pdf_doc)
-
-        if total_pages < 2:
-            return  # 单页文档不需要骑缝章
-
-        # 确定每个骑缝章处理的页数
-        pages_per_seal = (self.config.pages_per_seal
-                         if self.config.pages_per_seal is not None and self.config.pages_per_seal <= total_pages
-                         else total_pages)
-
-        # 计算需要多少组骑缝章（考虑重叠页面）
-        if pages_per_seal > 1:
-            # 计算实际需要的组数，向上取整确保覆盖所有页面
-            seal_groups = (total_pages + pages_per_seal - 2) // (pages_per_seal - 1)
-        else:
-            seal_groups = 1
-
-        # 打开印章图片文件
-        with Image.open(stamp_file) as img:
-            # 确保图像模式为RGBA以支持透明度
-            if img.mode != 'RGBA':
-                img = img.convert('RGBA')
-
-            # 调整印章图像大小
-            img = img.resize((int(seal_size_pt * 2), int(seal_size_pt * 2)), Image.Resampling.LANCZOS)
-
-            # 计算骑缝章垂直间距
-            seal_spacing_pt = StampUtils.mm_to_points(self.SEAL_VERTICAL_SPACING_MM)
-            top_margin_pt = StampUtils.mm_to_points(self.TOP_MARGIN_MM)
-
-            # 处理每组骑缝章
-            for group in range(seal_groups):
-                # 计算当前组的起始页和结束页
-                # 每组的最后一页会成为下一组的第一页
-                start_page = group * (pages_per_seal - 1)
-                end_page = min(start_page + pages_per_seal, total_pages)
-                pages_in_group = end_page - start_page
-
-                # 如果是最后一组且页数不足，调整页数
-                if group == seal_groups - 1:
-                    pages_in_group = total_pages - start_page
-
-                # 计算每页的骑缝章宽度
-                slice_width = int(seal_size_pt / pages_in_group)
-
-                # 为每个骑缝章组添加指定数量的骑缝章
-                for seal_index in range(self.config.seal_count):
-                    # 计算基础垂直位置
-                    base_y_position = (seal_size_pt * 1.5) * (seal_index + 1)
-                    
-                    # 根据组号增加垂直偏移，确保新组的骑缝章在上一组下方
-                    raw_y_position = base_y_position + (group * (seal_size_pt + seal_spacing_pt))
-
-                    # 获取第一页的高度作为参考
-                    page_height = pdf_doc[0].rect.height
-                    
-                    # 如果位置超出页面底部，重新从顶部开始计算
-                    if raw_y_position + seal_size_pt > page_height:
-                        # 计算需要回到顶部的次数
-                        cycles = int(raw_y_position / (page_height - seal_size_pt - top_margin_pt))
-                        # 计算实际的Y位置
-                        y_position = top_margin_pt + (raw_y_position - cycles * (page_height - seal_size_pt - top_margin_pt))
-                    else:
-                        y_position = raw_y_position
-
-                    # 在每页上应用骑缝章
-                    for page_index in range(start_page, end_page):
-                        page = pdf_doc[page_index]
-                        page_rect = page.rect
-
-                        # 计算当前页在组中的相对索引
-                        relative_index = page_index - start_page
-                        
-                        # 计算图像切片的左右边界
-                        left = int(relative_index * img.width / pages_in_group)
-                        right = int((relative_index + 1) * img.width / pages_in_group)
-
-                        # 裁剪图像以适应当前页
-                        slice_img = img.crop((left, 0, right, img.height))
-
-                        # 将裁剪后的图像保存到字节流中
-                        img_bytes = io.BytesIO()
-                        slice_img.save(img_bytes, format='PNG', optimize=True, quality=95)
-                        img_bytes.seek(0)
-
-                        # 计算图像在页面上的位置
-                        x = page_rect.width - slice_width
-                        y = y_position - (seal_size_pt / 2)
-
-                        # 定义图像插入的矩形区域
-                        rect = fitz.Rect(x, y, x + slice_width, y + seal_size_pt)
-
-                        # 在页面上插入图像
-                        page.insert_image(rect, stream=img_bytes.getvalue())
\ No newline at end of file
+        self._default_img_size = (int(seal_size_pt * 2), int(seal_size_pt * 2))
+        self._img_size = self._default_img_size
+        if self.config.stamp_dpi is not None:
+            # 按有效打印DPI确定像素尺寸，不放大原图，也不超过原有的默认尺寸，只会缩小嵌入的图像
+            source_size = stamp_asset_cache.get_image(stamp_file).size
+            target_size = (StampImageEncoder.target_size(source_size, (seal_size_pt, seal_size_pt),
+                                                         self.config.stamp_dpi) or source_size)
+            self._img_size = tuple(min(target, default) for target, default in zip(target_size,
+                                                                                   self._default_img_size))
+        self.image_bytes_saved = 0
+
+    def stamp_page(self, page: fitz.Page) -> None:
+        placements = self._placements.get(page.number)
+        if not placements:
+            return
+
+        for rect, slice_id in placements:
+            rect = fitz.Rect(rect)
+            if self.config.seal_renderer is SealRenderer.CLIP:
+                # 整枚印章所在的页面只复制进文档一次，各页以裁剪区域引用，切片拉伸到目标矩形
+                page.show_pdf_page(rect, self._seal_page(), 0, clip=self._slice_clip(*self._slices[slice_id]),
+                                   keep_proportion=False)
+                continue
+            # 相同(组页数, 相对索引)的切片内容完全一致，只编码并嵌入一次，
+            # 之后通过xref引用已插入的图像
+            xref = self._slice_xrefs.get(slice_id)
+            if xref:
+                page.insert_image(rect, xref=xref)
+            else:
+                pages_in_group, relative_index = self._slices[slice_id]
+                encoded = self._encode_slice(pages_in_group, relative_index)
+                self._slice_xrefs[slice_id] = encoded.insert(page, rect)
+                if self.config.encodes_images:
+                    self._count_saved(self._slice_box(pages_in_group, relative_index),
+                                      self._slice_box(pages_in_group, relative_index, self._default_img_size))
+
+    def close(self) -> None:
+        """关闭CLIP方式创建的单页印章文档，印章页面已复制进目标文档，关闭后不影响保存"""
+        if self._seal_doc is not None:
+            self._seal_doc.close()
+        self._seal_doc = None
+
+    def _slice_box(self, pages_in_group: int, relative_index: int, img_size: tuple = None) -> tuple:
+        """
+        计算印章在组内某一页上的切片区域
+        :param pages_in_group: 当前组的页数
+        :param relative_index: 当前页在组中的相对索引
+        :param img_size: 缩放后印章图像的像素尺寸，默认为当前使用的尺寸
+        :return: 缩放后印章图像上的像素区域(左, 上, 右, 下)
+        """
+        width, height = img_size or self._img_size
+        # 计算图像切片的左右边界
+        left = int(relative_index * width / pages_in_group)
+        right = int((relative_index + 1) * width / pages_in_group)
+        return left, 0, right, height
+
+    def _encode_slice(self, pages_in_group: int, relative_index: int) -> EncodedImage:
+        """
+        获取印章在组内某一页上的切片图像
+        :param pages_in_group: 当前组的页数
+        :param relative_index: 当前页在组中的相对索引
+        :return: 按配置编码的切片，默认为PNG
+        """
+        # 裁剪图像以适应当前页，编码结果在进程内复用
+        box = self._slice_box(pages_in_group, relative_index)
+        return stamp_asset_cache.get_encoded(self._stamp_file, self._img_size, box,
+                                             self.config.image_encoding, self.config.jpeg_quality)
+
+    def _count_saved(self, box: tuple = None, default_box: tuple = None) -> None:
+        """
+        累计编码节省的字节数，以默认尺寸下同一区域按原有方式嵌入的大小为基准
+        :param box: 当前尺寸下的图像区域，None表示整枚印章
+        :param default_box: 默认尺寸下的同一区域
+        """
+        original_size = stamp_asset_cache.get_embedded_size(self._stamp_file, self._default_img_size, default_box)
+        encoded_size = stamp_asset_cache.get_embedded_size(self._stamp_file, self._img_size, box,
+                                                           self.config.image_encoding, self.config.jpeg_quality)
+        self.image_bytes_saved += original_size - encoded_size
+
+    def _slice_clip(self, pages_in_group: int, relative_index: int) -> fitz.Rect:
+        """切片区域换算到单页印章文档中的坐标（点），与CROP方式裁剪的像素列一致"""
+        left, top, right, bottom = self._slice_box(pages_in_group, relative_index)
+        scale = StampUtils.mm_to_points(self.config.stamp_size_mm) / self._img_size[0]
+        return fitz.Rect(left * scale, top * scale, right * scale, bottom * scale)
+
+    def _seal_page(self) -> fitz.Document:
+        """
+        获取只包含整枚印章的单页PDF，页面大小与印章尺寸一致
+        印章图像只嵌入一次，show_pdf_page会把该页面作为共享的表单XObject复制进目标文档
+        """
+        if self._seal_doc is None:
+            seal_size_pt = StampUtils.mm_to_points(self.config.stamp_size_mm)
+            self._seal_doc = fitz.open()
+            seal_page = self._seal_doc.new_page(width=seal_size_pt, height=seal_size_pt)
+            encoded = stamp_asset_cache.get_encoded(self._stamp_file, self._img_size,
+                                                    encoding=self.config.image_encoding,
+                                                    jpeg_quality=self.config.jpeg_quality)
+            encoded.insert(seal_page, seal_page.rect)
+            if self.config.encodes_images:
+                self._count_saved()
+        return self._seal_doc
@@ -0,0 +1,145 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple
+import fitz
+from .stamp_type import StampType
+from .stamp_config import StampConfig
+from .save_profile import SaveProfile, SaveResult
+from .stamp_utils import StampUtils
+from .batch_processor import init_worker
+from .placement_planner import PlacementPlanner, page_size_table
+
+# 每个分片的最少页数，页数太少时并行收益抵不过拆分与合并的开销
+MIN_SHARD_PAGES = 100
+
+
+def plan_shards(total_pages: int, pages_per_seal: int, shard_count: int) -> List[Tuple[int, int]]:
+    """
+    按骑缝章分组边界把文档划分为连续的页段
+
+    第group组骑缝章从 group * (pages_per_seal - 1) 页开始，分片边界只落在组的起始页上，
+    这样同一组的切片图像尽量在同一个分片中嵌入。
+
+    Args:
+        total_pages (int): 文档总页数
+        pages_per_seal (int): 每组骑缝章实际跨越的页数
+        shard_count (int): 期望的分片数
+
+    Returns:
+        list: [(起始页, 结束页), ...]，结束页不包含在分片内
+    """
+    step = max(pages_per_seal - 1, 1)
+    group_starts = list(range(0, total_pages, step))
+    shard_count = max(1, min(shard_count, len(group_starts)))
+    boundaries = sorted({group_starts[len(group_starts) * index // shard_count] for index in range(shard_count)})
+    boundaries.append(total_pages)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def stamp_shard(pdf_file: str, stamp_file: str, shard_file: str, stamp_type: StampType,
+                config: StampConfig, start: int, end: int) -> int:
+    """
+    在工作进程中为[start, end)页段盖章并保存为独立的分片文件
+
+    版面按整份文档规划（总页数、分组和第一页高度），因此分片中的印章位置与整份处理完全一致。
+
+    Args:
+        pdf_file (str): 完整的输入PDF文件路径
+        stamp_file (str): 印章图片文件路径
+        shard_file (str): 分片输出文件路径
+        stamp_type (StampType): 印章类型
+        config (StampConfig): 印章配置
+        start (int): 起始页（包含）
+        end (int): 结束页（不包含）
+
+    Returns:
+        int: 本分片中印章图像编码节省的字节数
+    """
+    from .stamp_processor import StampProcessor
+
+    stampers = StampProcessor(config)._get_stampers(stamp_type)
+    with fitz.open(pdf_file) as pdf_doc:
+        plan = PlacementPlanner(config).plan(page_size_table(pdf_doc), stamp_type)
+        try:
+            for stamper in stampers:
+                stamper.prepare(pdf_doc, stamp_file, plan)
+            for page_index in range(start, end):
+                page = pdf_doc[page_index]
+                for stamper in stampers:
+                    stamper.stamp_page(page)
+        finally:
+            for stamper in stampers:
+                stamper.close()
+
+        # 只保留本分片的页面，未引用的对象在保存时被清除
+        pdf_doc.select(list(range(start, end)))
+        pdf_doc.save(shard_file, **StampUtils.SAVE_OPTIONS[SaveProfile.FAST])
+    return sum(stamper.image_bytes_saved for stamper in stampers)
+
+
+def process_sharded(processor, pdf_file: str, stamp_file: str, output_file: str, stamp_type: StampType,
+                    max_workers: int = None, save_profile: SaveProfile = SaveProfile.COMPACT) -> SaveResult:
+    """
+    分片并行处理单个PDF文档
+
+    合并时按顺序插入各分片页面，并复制原文档的元数据和书签。
+
+    Args:
+        processor (StampProcessor): 提供印章配置和处理器的主处理器
+        pdf_file (str): 输入PDF文件路径
+        stamp_file (str): 印章图片文件路径
+        output_file (str): 输出PDF文件路径
+        stamp_type (StampType): 印章类型
+        max_workers (int, optional): 工作进程数，默认使用CPU核数
+        save_profile (SaveProfile): 保存方式，增量保存按FAST处理
+
+    Returns:
+        SaveResult: 合并后输出文件的保存结果
+    """
+    if max_workers is not None and max_workers <= 0:
+        raise ValueError("工作进程数必须大于0")
+
+    with fitz.open(pdf_file) as pdf_doc:
+        total_pages = len(pdf_doc)
+
+    shard_count = min(max_workers or os.cpu_count() or 1, total_pages // MIN_SHARD_PAGES)
+    if shard_count < 2:
+        return processor.process(pdf_file, stamp_file, output_file, stamp_type, save_profile)
+
+    # 合并后的文档是新文档，无法在原文件上增量追加
+    if save_profile == SaveProfile.INCREMENTAL:
+        save_profile = SaveProfile.FAST
+
+    if stamp_type in [StampType.BOTH, StampType.SEAL]:
+        pages_per_seal = processor.seal_stamper.pages_per_seal(total_pages)
+    else:
+        pages_per_seal = 2  # 仅电子章时每页独立，任意页都可以作为分片边界
+    shards = plan_shards(total_pages, pages_per_seal, shard_count)
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(output_file) or None) as shard_dir:
+        shard_files = [os.path.join(shard_dir, f"shard_{index}.pdf") for index in range(len(shards))]
+        with ProcessPoolExecutor(max_workers=len(shards), initializer=init_worker) as pool:
+            futures = [
+                pool.submit(stamp_shard, pdf_file, stamp_file, shard_file, stamp_type, processor.config, start, end)
+                for shard_file, (start, end) in zip(shard_files, shards)
+            ]
+            # 各分片分别嵌入印章图像，节省的字节数按分片累加
+            image_bytes_saved = sum(future.result() for future in futures)
+
+        # 按页码顺序合并分片
+        with fitz.open(pdf_file) as source_doc, fitz.open() as output_doc:
+            for shard_file in shard_files:
+                with fitz.open(shard_file) as shard_doc:
+                    output_doc.insert_pdf(shard_doc)
+            output_doc.set_metadata(source_doc.metadata)
+            toc = source_doc.get_toc(simple=False)
+            if toc:
+                output_doc.set_toc(toc)
+            save_result = StampUtils.save_pdf(output_doc, output_file, save_profile)
+            save_result.image_bytes_saved = image_bytes_saved
+
+    print(f"已成功添加印章（{len(shards)}个分片），生成文件：{output_file}，"
+          f"写入{save_result.bytes_written}字节，保存耗时{save_result.elapsed_seconds:.2f}秒"
+          f"{StampUtils.saved_message(image_bytes_saved)}")
+    return save_result
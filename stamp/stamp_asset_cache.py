@@ -0,0 +1,298 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple, Union
+from PIL import Image
+from .image_encoder import EncodedImage, ImageEncoding, StampImageEncoder
+
+# 印章来源：图片文件路径或图片字节
+StampSource = Union[str, bytes]
+# 尺寸参数：(宽, 高)像素，None表示原始尺寸
+SizeKey = Optional[Tuple[int, int]]
+# 裁剪区域：(左, 上, 右, 下)像素，None表示整张图片
+BoxKey = Optional[Tuple[int, int, int, int]]
+
+
+@dataclass
+class StampAsset:
+    """
+    缓存的印章素材
+
+    属性:
+        image (Image.Image): 解码后的RGBA图像（按尺寸参数缩放后）
+        png (dict): 已编码的PNG字节，键为(裁剪区域, 是否优化)
+        encoded (dict): 其他编码方式的结果，键为(裁剪区域, 编码方式, JPEG质量)
+        embedded_sizes (dict): 嵌入PDF后占用的字节数，键为(裁剪区域, 编码方式, JPEG质量)
+    """
+    image: Image.Image
+    png: Dict[Tuple[BoxKey, bool], bytes] = field(default_factory=dict)
+    encoded: Dict[Tuple[BoxKey, ImageEncoding, int], EncodedImage] = field(default_factory=dict)
+    embedded_sizes: Dict[Tuple[BoxKey, Optional[ImageEncoding], int], int] = field(default_factory=dict)
+
+    @property
+    def nbytes(self) -> int:
+        """素材占用的内存字节数（估算）"""
+        return (self.image.width * self.image.height * 4 + sum(len(data) for data in self.png.values())
+                + sum(encoded.nbytes for encoded in self.encoded.values()))
+
+
+class StampAssetCache:
+    """
+    进程级印章素材缓存
+
+    同一枚印章在每次请求中都要重新解码、转换为RGBA并缩放，而租户常用的印章只有少数几枚。
+    缓存以图片内容哈希加尺寸参数为键，保存解码后的图像和编码好的PNG字节，
+    按内存预算进行LRU淘汰。返回的图像为共享对象，调用方不得修改。
+
+    锁只保护缓存索引和统计，解码、缩放、编码和计算哈希都在锁外进行：大尺寸印章的编码需要数秒，
+    不会阻塞其他线程对已缓存素材的查找。每次公开方法的调用按最终结果是否已缓存计一次命中或未命中。
+    """
+
+    # 默认内存预算：256MB
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+    # 最多记住的文件哈希数量
+    MAX_FILE_DIGESTS = 1024
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        if max_bytes <= 0:
+            raise ValueError("缓存内存预算必须大于0")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple[str, SizeKey], StampAsset]" = OrderedDict()
+        self._total_bytes = 0
+        # 文件路径 -> (修改时间, 文件大小, 内容哈希)，避免重复读取和计算哈希
+        self._file_digests: "OrderedDict[str, Tuple[int, int, str]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get_image(self, source: StampSource, size: SizeKey = None) -> Image.Image:
+        """
+        获取解码后的RGBA印章图像
+
+        Args:
+            source (str or bytes): 印章图片文件路径或图片字节
+            size (tuple, optional): 目标尺寸(宽, 高)，使用LANCZOS缩放；None表示原始尺寸
+
+        Returns:
+            Image.Image: RGBA图像（共享对象，不得修改）
+        """
+        _, entry, hit = self._get_entry(source, size)
+        self._count(hit)
+        return entry.image
+
+    def get_png(self, source: StampSource, size: SizeKey = None, box: BoxKey = None,
+                optimize: bool = False) -> bytes:
+        """
+        获取编码为PNG的印章图像
+
+        Args:
+            source (str or bytes): 印章图片文件路径或图片字节
+            size (tuple, optional): 目标尺寸(宽, 高)；None表示原始尺寸
+            box (tuple, optional): 在缩放后图像上的裁剪区域；None表示整张图片
+            optimize (bool): 是否启用PNG优化压缩
+
+        Returns:
+            bytes: PNG字节
+        """
+        data, hit = self._get_png(source, size, box, optimize)
+        self._count(hit)
+        return data
+
+    def get_encoded(self, source: StampSource, size: SizeKey = None, box: BoxKey = None,
+                    encoding: ImageEncoding = ImageEncoding.PNG, jpeg_quality: int = 85) -> EncodedImage:
+        """
+        获取按指定方式编码的印章图像
+
+        Args:
+            source (str or bytes): 印章图片文件路径或图片字节
+            size (tuple, optional): 目标尺寸(宽, 高)；None表示原始尺寸
+            box (tuple, optional): 在缩放后图像上的裁剪区域；None表示整张图片
+            encoding (ImageEncoding): 编码方式，PNG与get_png(optimize=True)共用同一份结果
+            jpeg_quality (int): JPEG质量，仅JPEG编码使用
+
+        Returns:
+            EncodedImage: 编码结果
+        """
+        encoded, hit = self._get_encoded(source, size, box, encoding, jpeg_quality)
+        self._count(hit)
+        return encoded
+
+    def get_embedded_size(self, source: StampSource, size: SizeKey = None, box: BoxKey = None,
+                          encoding: Optional[ImageEncoding] = None, jpeg_quality: int = 85) -> int:
+        """
+        获取图像嵌入PDF后占用的字节数，用于计算编码节省的字节数
+
+        Args:
+            source (str or bytes): 印章图片文件路径或图片字节
+            size (tuple, optional): 目标尺寸(宽, 高)；None表示原始尺寸
+            box (tuple, optional): 在缩放后图像上的裁剪区域；None表示整张图片
+            encoding (ImageEncoding, optional): 编码方式；None表示原有方式：
+                                                size和box都为None时按原始文件嵌入，否则按优化压缩的PNG嵌入
+            jpeg_quality (int): JPEG质量，仅JPEG编码使用
+
+        Returns:
+            int: 嵌入后的字节数
+        """
+        size_key = (box, encoding, jpeg_quality)
+        _, entry, _ = self._get_entry(source, size)
+        with self._lock:
+            embedded_size = entry.embedded_sizes.get(size_key)
+        if embedded_size is not None:
+            self._count(True)
+            return embedded_size
+
+        if encoding is not None:
+            image, _ = self._get_encoded(source, size, box, encoding, jpeg_quality)
+        elif size is None and box is None:
+            if isinstance(source, bytes):
+                image = EncodedImage(source)
+            else:
+                with open(source, 'rb') as f:
+                    image = EncodedImage(f.read())
+        else:
+            image = EncodedImage(self._get_png(source, size, box, True)[0])
+        embedded_size = StampImageEncoder.measure(image)
+
+        with self._lock:
+            entry.embedded_sizes[size_key] = embedded_size
+        self._count(False)
+        return embedded_size
+
+    def stats(self) -> dict:
+        """返回缓存统计信息"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        """清空缓存和统计"""
+        with self._lock:
+            self._entries.clear()
+            self._file_digests.clear()
+            self._total_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _get_entry(self, source: StampSource, size: SizeKey) -> Tuple[tuple, StampAsset, bool]:
+        """
+        查找或创建缓存条目，不计入统计
+        :return: (缓存键, 条目, 是否已缓存)
+        """
+        key = (self._digest(source), tuple(size) if size else None)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return key, entry, True
+
+        if size:
+            # 缩放版本从原始尺寸的解码图像生成，原图同样进入缓存
+            image = self._get_entry(source, None)[1].image.resize(tuple(size), Image.Resampling.LANCZOS)
+        else:
+            data = source if isinstance(source, bytes) else None
+            with Image.open(io.BytesIO(data) if data is not None else source) as img:
+                # 确保图像模式为RGBA以支持透明度
+                image = img.convert('RGBA') if img.mode != 'RGBA' else img.copy()
+
+        with self._lock:
+            # 其他线程可能同时生成了同一条目，使用先放入缓存的一份
+            existing = self._entries.get(key)
+            if existing is not None:
+                self._entries.move_to_end(key)
+                return key, existing, False
+            entry = StampAsset(image=image)
+            self._entries[key] = entry
+            self._total_bytes += entry.nbytes
+            self._evict()
+        return key, entry, False
+
+    def _get_png(self, source: StampSource, size: SizeKey, box: BoxKey, optimize: bool) -> Tuple[bytes, bool]:
+        """获取PNG字节，不计入统计，返回(PNG字节, 是否已缓存)"""
+        key, entry, _ = self._get_entry(source, size)
+        png_key = (box, optimize)
+        with self._lock:
+            data = entry.png.get(png_key)
+        if data is not None:
+            return data, True
+
+        img = entry.image.crop(box) if box else entry.image
+        img_bytes = io.BytesIO()
+        img.save(img_bytes, format='PNG', optimize=optimize)
+        data = img_bytes.getvalue()
+        with self._lock:
+            data = entry.png.setdefault(png_key, data)
+            self._account(key, entry, len(data))
+        return data, False
+
+    def _get_encoded(self, source: StampSource, size: SizeKey, box: BoxKey, encoding: ImageEncoding,
+                     jpeg_quality: int) -> Tuple[EncodedImage, bool]:
+        """获取编码结果，不计入统计，返回(编码结果, 是否已缓存)"""
+        if encoding is ImageEncoding.PNG:
+            data, hit = self._get_png(source, size, box, True)
+            return EncodedImage(data), hit
+
+        key, entry, _ = self._get_entry(source, size)
+        encoded_key = (box, encoding, jpeg_quality)
+        with self._lock:
+            encoded = entry.encoded.get(encoded_key)
+        if encoded is not None:
+            return encoded, True
+
+        img = entry.image.crop(box) if box else entry.image
+        encoded = StampImageEncoder.encode(img, encoding, jpeg_quality)
+        with self._lock:
+            encoded = entry.encoded.setdefault(encoded_key, encoded)
+            self._account(key, entry, encoded.nbytes)
+        return encoded, False
+
+    def _account(self, key: tuple, entry: StampAsset, nbytes: int) -> None:
+        """把新编码结果的大小计入内存占用，调用方需持有锁；条目在编码期间已被淘汰时不计入"""
+        if self._entries.get(key) is entry:
+            self._total_bytes += nbytes
+            self._evict()
+
+    def _digest(self, source: StampSource) -> str:
+        """计算印章内容哈希，文件未修改时复用上次结果"""
+        if isinstance(source, bytes):
+            return hashlib.sha256(source).hexdigest()
+
+        stat = os.stat(source)
+        with self._lock:
+            cached = self._file_digests.get(source)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        with open(source, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        with self._lock:
+            self._file_digests[source] = (stat.st_mtime_ns, stat.st_size, digest)
+            self._file_digests.move_to_end(source)
+            if len(self._file_digests) > self.MAX_FILE_DIGESTS:
+                self._file_digests.popitem(last=False)
+        return digest
+
+    def _evict(self) -> None:
+        """超出内存预算时按最近最少使用顺序淘汰条目，至少保留最新的一个，调用方需持有锁"""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry.nbytes
+            self.evictions += 1
+
+
+# 进程级共享的印章素材缓存
+stamp_asset_cache = StampAssetCache()
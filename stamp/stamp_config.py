@@ -1,4 +1,8 @@
 from dataclasses import dataclass
+from typing import Optional
+from .save_profile import SaveProfile
+from .seal_renderer import SealRenderer
+from .image_encoder import ImageEncoding
 
 @dataclass
 class StampConfig:
@@ -13,12 +17,27 @@ class StampConfig:
         margin_bottom_mm (float): 电子章距下边距，单位毫米，默认60mm
         seal_count (int): 骑缝章数量，默认3个
         pages_per_seal (int): 每个骑缝章跨越的页数，默认None（使用总页数）
+        save_profile (SaveProfile): 输出文件的保存方式，默认COMPACT
+        seal_renderer (SealRenderer): 骑缝章切片的绘制方式，默认CROP
+        stamp_dpi (int): 印章图像的有效打印DPI，高于该分辨率的图像按印章尺寸缩小，默认None（不缩小）
+        image_encoding (ImageEncoding): 印章图像的编码方式，默认PNG
+        jpeg_quality (int): JPEG编码的质量（1-95），默认85
     """
     stamp_size_mm: float = 40.0        # 印章尺寸（直径），单位毫米
     margin_right_mm: float = 60.0      # 电子章距右边距，单位毫米
     margin_bottom_mm: float = 60.0     # 电子章距下边距，单位毫米
     seal_count: int = 1                # 骑缝章数量
     pages_per_seal: int = 12         # 每个骑缝章跨越的页数
+    save_profile: SaveProfile = SaveProfile.COMPACT  # 输出文件的保存方式
+    seal_renderer: SealRenderer = SealRenderer.CROP  # 骑缝章切片的绘制方式
+    stamp_dpi: Optional[int] = None    # 印章图像的有效打印DPI
+    image_encoding: ImageEncoding = ImageEncoding.PNG  # 印章图像的编码方式
+    jpeg_quality: int = 85             # JPEG编码的质量
+
+    @property
+    def encodes_images(self) -> bool:
+        """是否启用了印章图像编码（指定了DPI或非PNG编码），未启用时按原有方式嵌入图像"""
+        return self.stamp_dpi is not None or self.image_encoding is not ImageEncoding.PNG
 
     def __post_init__(self):
         """
@@ -30,6 +49,10 @@ class StampConfig:
         2. 边距不能为负数
         3. 骑缝章数量必须大于0
         4. 如果指定了跨页数，必须大于0
+        5. 保存方式必须是SaveProfile枚举类型
+        6. 骑缝章绘制方式必须是SealRenderer枚举类型
+        7. 如果指定了DPI，必须大于0
+        8. 编码方式必须是ImageEncoding枚举类型，JPEG质量在1到95之间
         
         Raises:
             ValueError: 当任何参数不满足要求时抛出
@@ -43,4 +66,14 @@ class StampConfig:
         if self.seal_count <= 0:
             raise ValueError("骑缝章数量必须大于0")
         if self.pages_per_seal is not None and self.pages_per_seal <= 0:
-            raise ValueError("每个骑缝章跨越的页数必须大于0") 
\ No newline at end of file
+            raise ValueError("每个骑缝章跨越的页数必须大于0")
+        if not isinstance(self.save_profile, SaveProfile):
+            raise ValueError("save_profile必须是SaveProfile枚举类型")
+        if not isinstance(self.seal_renderer, SealRenderer):
+            raise ValueError("seal_renderer必须是SealRenderer枚举类型")
+        if self.stamp_dpi is not None and self.stamp_dpi <= 0:
+            raise ValueError("印章图像DPI必须大于0")
+        if not isinstance(self.image_encoding, ImageEncoding):
+            raise ValueError("image_encoding必须是ImageEncoding枚举类型")
+        if not 1 <= self.jpeg_quality <= 95:
+            raise ValueError("JPEG质量必须在1到95之间")
\ No newline at end of file
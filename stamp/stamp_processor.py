@@ -1,30 +1,232 @@
 import logging
 import fitz
 import os
+import time
+from typing import BinaryIO, Union
 from .stamp_type import StampType
 from .stamp_config import StampConfig
+from .save_profile import SaveProfile, SaveResult
+from .stamp_utils import StampUtils
 from .electronic_stamper import ElectronicStamper
 from .seal_stamper import SealStamper
+from .placement_planner import PlacementPlan, PlacementPlanner, page_size_table
+from .result_cache import StampResultCache
 
 class StampProcessor:
     """印章处理器主类"""
     
-    def __init__(self, config: StampConfig = None):
+    def __init__(self, config: StampConfig = None, result_cache: StampResultCache = None):
+        """
+        :param config: 印章配置
+        :param result_cache: 盖章结果缓存，指定后process对相同的输入直接返回上次的结果
+        """
         self.config = config or StampConfig()
+        self.result_cache = result_cache
         self.electronic_stamper = ElectronicStamper(self.config)
         self.seal_stamper = SealStamper(self.config)
     
-    def process(self, input_file: str, stamp_file: str, output_file: str, stamp_type: StampType) -> None:
+    def process(self, input_file: str, stamp_file: str, output_file: str, stamp_type: StampType,
+                save_profile: SaveProfile = None) -> SaveResult:
         """
         处理文件添加印章
         :param input_file: 输入文件路径（支持PDF或Word文档）
         :param stamp_file: 印章图片文件路径
         :param output_file: 输出PDF文件路径
         :param stamp_type: 印章类型
+        :param save_profile: 保存方式，默认使用配置中的save_profile
+        :return: 保存结果（写入字节数和耗时）
+        """
+        save_profile = self._check_arguments(input_file, stamp_file, output_file, stamp_type, save_profile)
+
+        # 相同的输入、印章、配置和类型直接使用缓存的结果
+        cache_key = None
+        if self.result_cache is not None:
+            start = time.perf_counter()
+            cache_key = self.result_cache.make_key(input_file, stamp_file, self.config, stamp_type, save_profile)
+            if self.result_cache.get(cache_key, output_file):
+                save_result = SaveResult(
+                    output_file=output_file,
+                    profile=save_profile,
+                    bytes_written=os.path.getsize(output_file),
+                    elapsed_seconds=time.perf_counter() - start,
+                    from_cache=True
+                )
+                print(f"盖章结果缓存命中，生成文件：{output_file}，写入{save_result.bytes_written}字节")
+                return save_result
+
+        # 处理Word文档
+        pdf_file, temp_pdf = self._to_pdf(input_file, output_file)
+            
+        pdf_doc = None
+        try:
+            pdf_doc = StampUtils.open_pdf(pdf_file, output_file, save_profile)  # 打开输入的PDF文件
+            image_bytes_saved = self._stamp_document(pdf_doc, stamp_file, stamp_type)
+            
+            # 保存最终的PDF文件
+            save_result = StampUtils.save_pdf(pdf_doc, output_file, save_profile)  # 保存最终输出文件
+            save_result.image_bytes_saved = image_bytes_saved
+            pdf_doc.close()  # 关闭PDF文档
+            if cache_key is not None:
+                self.result_cache.put(cache_key, output_file)
+            print(f"已成功添加印章，生成文件：{output_file}，"
+                  f"写入{save_result.bytes_written}字节，保存耗时{save_result.elapsed_seconds:.2f}秒"
+                  f"{StampUtils.saved_message(image_bytes_saved)}")
+            return save_result
+
+        except Exception as e:
+            if pdf_doc is not None and not pdf_doc.is_closed:
+                pdf_doc.close()
+            # 增量保存预先复制到输出路径的文件不能留作结果
+            StampUtils.discard_output(pdf_file, output_file, save_profile)
+            raise Exception(f"处理文件时出错: {str(e)}")
+        
+        finally:
+            # 清理临时文件
+            self._remove_temp_pdf(temp_pdf)
+
+    def plan(self, input_file: str, stamp_type: StampType) -> PlacementPlan:
+        """
+        试运行：只计算印章位置，不修改文档、不需要印章图片
+        :param input_file: 输入文件路径（支持PDF或Word文档，Word文档需要先转换）
+        :param stamp_type: 印章类型
+        :return: 整份文档的印章位置，可通过to_dict()转换为JSON
         """
         if not isinstance(stamp_type, StampType):
             raise ValueError("stamp_type必须是StampType枚举类型")
-        # 检查输出文件路径是否为空
+        if not os.path.exists(input_file):
+            raise FileNotFoundError(f"输入文件不存在: {input_file}")
+        if input_file.lower().endswith(('.doc', '.docx')):
+            from convert.file_converter import FileConverter
+            with open(input_file, 'rb') as f:
+                data = FileConverter.word_to_pdf_bytes(f.read(), suffix=os.path.splitext(input_file)[1])
+            pdf_doc = fitz.open(stream=data, filetype="pdf")
+        else:
+            pdf_doc = fitz.open(input_file)
+        with pdf_doc:
+            return PlacementPlanner(self.config).plan(page_size_table(pdf_doc), stamp_type)
+
+    def process_stream(self, input_data: Union[bytes, BinaryIO], stamp_data: Union[bytes, BinaryIO],
+                       stamp_type: StampType, filetype: str = "pdf", save_profile: SaveProfile = None) -> bytes:
+        """
+        在内存中处理文件添加印章，输入和输出都是字节，PDF输入全程不落盘
+        :param input_data: 输入文件的字节或二进制缓冲区（支持PDF或Word文档）
+        :param stamp_data: 印章图片的字节或二进制缓冲区
+        :param stamp_type: 印章类型
+        :param filetype: 输入文件类型：pdf、doc或docx
+        :param save_profile: 保存方式，默认使用配置中的save_profile；内存输出不支持增量保存，按FAST处理
+        :return: 盖章后的PDF字节
+        """
+        if not isinstance(stamp_type, StampType):
+            raise ValueError("stamp_type必须是StampType枚举类型")
+        save_profile = save_profile or self.config.save_profile
+        if not isinstance(save_profile, SaveProfile):
+            raise ValueError("save_profile必须是SaveProfile枚举类型")
+        filetype = filetype.lower().lstrip('.')
+        if filetype not in ('pdf', 'doc', 'docx'):
+            raise ValueError("输入文件必须是pdf、doc或docx格式")
+        input_data = StampUtils.read_data(input_data)
+        stamp_data = StampUtils.read_data(stamp_data)
+        if not input_data:
+            raise ValueError("输入文件内容不能为空")
+        if not stamp_data:
+            raise ValueError("印章文件内容不能为空")
+
+        # Word文档需要借助LibreOffice转换，转换过程使用临时目录
+        if filetype in ('doc', 'docx'):
+            from convert.file_converter import FileConverter
+            input_data = FileConverter.word_to_pdf_bytes(input_data, suffix=f".{filetype}")
+
+        try:
+            with fitz.open(stream=input_data, filetype="pdf") as pdf_doc:
+                image_bytes_saved = self._stamp_document(pdf_doc, stamp_data, stamp_type)
+                output_data, save_result = StampUtils.pdf_to_bytes(pdf_doc, save_profile)
+            print(f"已成功添加印章，生成{save_result.bytes_written}字节，保存耗时{save_result.elapsed_seconds:.2f}秒"
+                  f"{StampUtils.saved_message(image_bytes_saved)}")
+            return output_data
+        except Exception as e:
+            raise Exception(f"处理文件时出错: {str(e)}")
+
+    def process_sharded(self, input_file: str, stamp_file: str, output_file: str, stamp_type: StampType,
+                        max_workers: int = None, save_profile: SaveProfile = None) -> SaveResult:
+        """
+        将大文档按骑缝章分组边界拆分为多个页段，在多个进程中并行盖章后按顺序合并
+        输出的版面与process完全一致；页数较少或只有一个工作进程时直接调用process
+        :param input_file: 输入文件路径（支持PDF或Word文档）
+        :param stamp_file: 印章图片文件路径
+        :param output_file: 输出PDF文件路径
+        :param stamp_type: 印章类型
+        :param max_workers: 工作进程数（即最多分片数），默认使用CPU核数
+        :param save_profile: 保存方式，默认使用配置中的save_profile；分片合并后不支持增量保存，按FAST处理
+        :return: 合并后输出文件的保存结果
+        """
+        from .shard_processor import process_sharded
+        save_profile = self._check_arguments(input_file, stamp_file, output_file, stamp_type, save_profile)
+        pdf_file, temp_pdf = self._to_pdf(input_file, output_file)
+        try:
+            return process_sharded(self, pdf_file, stamp_file, output_file, stamp_type, max_workers, save_profile)
+        finally:
+            self._remove_temp_pdf(temp_pdf)
+
+    def process_many(self, jobs: list, max_workers: int = None):
+        """
+        使用进程池批量处理盖章任务，单个任务失败不会中断整个批次
+        :param jobs: StampJob任务列表，未指定配置的任务使用当前处理器的配置
+        :param max_workers: 工作进程数，默认使用CPU核数
+        :return: BatchResult，包含每个任务的结果和总吞吐量（页/秒）
+        """
+        from .batch_processor import process_many
+        return process_many(jobs, default_config=self.config, max_workers=max_workers)
+
+    def _stamp_document(self, pdf_doc: fitz.Document, stamp_file: Union[str, bytes], stamp_type: StampType) -> int:
+        """
+        在已打开的文档上盖章
+        :param pdf_doc: PDF文档对象
+        :param stamp_file: 印章图片文件路径或图片字节
+        :param stamp_type: 印章类型
+        :return: 印章图像编码节省的字节数
+        """
+        stampers = self._get_stampers(stamp_type)
+        # 整份文档的印章位置一次算好，各处理器只按计划插入图像
+        plan = PlacementPlanner(self.config).plan(page_size_table(pdf_doc), stamp_type)
+        # 所有印章在同一个文档对象上完成，只遍历一次页面，最后只保存一次
+        try:
+            for stamper in stampers:
+                stamper.prepare(pdf_doc, stamp_file, plan)
+            for page in pdf_doc:
+                # 先盖骑缝章再盖电子章，与逐个印章处理时的叠放顺序一致
+                for stamper in stampers:
+                    stamper.stamp_page(page)
+        finally:
+            for stamper in stampers:
+                stamper.close()
+        return sum(stamper.image_bytes_saved for stamper in stampers)
+
+    def _get_stampers(self, stamp_type: StampType) -> list:
+        """
+        按盖章顺序返回印章类型对应的处理器
+        :param stamp_type: 印章类型
+        :return: 印章处理器列表
+        """
+        stampers = []
+        # 如果印章类型是骑缝章或同时包含电子章和骑缝章
+        if stamp_type in [StampType.BOTH, StampType.SEAL]:
+            stampers.append(self.seal_stamper)
+        # 如果印章类型是电子章或同时包含电子章和骑缝章
+        if stamp_type in [StampType.BOTH, StampType.STAMP]:
+            stampers.append(self.electronic_stamper)
+        return stampers
+
+    def _check_arguments(self, input_file: str, stamp_file: str, output_file: str, stamp_type: StampType,
+                         save_profile: SaveProfile) -> SaveProfile:
+        """
+        检查处理参数并确保输出目录存在
+        :return: 实际使用的保存方式
+        """
+        if not isinstance(stamp_type, StampType):
+            raise ValueError("stamp_type必须是StampType枚举类型")
+        save_profile = save_profile or self.config.save_profile
+        if not isinstance(save_profile, SaveProfile):
+            raise ValueError("save_profile必须是SaveProfile枚举类型")
         # 检查输出文件路径是否为空
         if not output_file:
             raise ValueError("输出文件路径不能为空")
@@ -36,65 +238,37 @@ class StampProcessor:
             raise FileNotFoundError(f"印章文件不存在: {stamp_file}")
         # 确保输出目录存在
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        # 处理Word文档
-        temp_pdf = None  
-        if input_file.lower().endswith(('.doc', '.docx')):
-            from convert.file_converter import FileConverter
-            # 创建临时PDF文件路径
-            temp_pdf = os.path.join(
-                os.path.dirname(output_file),
-                f"{os.path.basename(os.path.splitext(input_file)[0])}.pdf"
-            )
-    
-            # 转换为PDF
-            pdf_file = FileConverter.word_to_pdf(
-                input_path=input_file,
-                output_path=temp_pdf,
-                overwrite=True
-            )
-        else:
-            pdf_file = input_file
-            
-        temp_output = None  # 临时输出文件路径初始化为None
-        try:
-            pdf_doc = fitz.open(pdf_file)  # 打开输入的PDF文件
-            # 如果印章类型是骑缝章或同时包含电子章和骑缝章
-            if stamp_type in [StampType.BOTH, StampType.SEAL]:
-                if stamp_type == StampType.BOTH:
-                    # 如果是同时包含电子章和骑缝章，先处理骑缝章并保存临时文件
-                    temp_output = output_file.replace('.pdf', '_temp.pdf')  # 生成临时文件名
-                    self.seal_stamper.apply_stamp(pdf_doc, stamp_file)  # 应用骑缝章
-                    pdf_doc.save(temp_output, garbage=4, deflate=True)  # 保存到临时文件
-                    pdf_doc.close()  # 关闭当前PDF文档
-                    # 重新打开临时文件以继续处理电子章
-                    pdf_doc = fitz.open(temp_output)  # 打开临时文件
-                else:
-                    # 如果仅处理骑缝章，直接应用骑缝章
-                    self.seal_stamper.apply_stamp(pdf_doc, stamp_file)  # 仅应用骑缝章
-            
-            # 如果印章类型是电子章或同时包含电子章和骑缝章
-            if stamp_type in [StampType.BOTH, StampType.STAMP]:
-                # 应用电子章
-                self.electronic_stamper.apply_stamp(pdf_doc, stamp_file)  # 应用电子章
-            
-            # 保存最终的PDF文件
-            pdf_doc.save(output_file, garbage=4, deflate=True)  # 保存最终输出文件
-            pdf_doc.close()  # 关闭PDF文档
-            print(f"已成功添加印章，生成文件：{output_file}")
-            
-        except Exception as e:
-            raise Exception(f"处理文件时出错: {str(e)}")
-        
-        finally:
-            # 清理临时文件
-            if temp_output and os.path.exists(temp_output):
-                try:
-                    os.remove(temp_output)
-                except Exception as e:
-                    print(f"警告：清理临时输出文件失败: {str(e)}")
-                    
-            if temp_pdf and os.path.exists(temp_pdf):
-                try:
-                    os.remove(temp_pdf)
-                except Exception as e:
-                    print(f"警告：清理临时PDF文件失败: {str(e)}")
\ No newline at end of file
+        return save_profile
+
+    @staticmethod
+    def _to_pdf(input_file: str, output_file: str) -> tuple:
+        """
+        Word文档先转换为PDF，PDF文档直接使用
+        :return: (待处理的PDF文件路径, 需要清理的临时PDF路径或None)
+        """
+        if not input_file.lower().endswith(('.doc', '.docx')):
+            return input_file, None
+
+        from convert.file_converter import FileConverter
+        # 创建临时PDF文件路径
+        temp_pdf = os.path.join(
+            os.path.dirname(output_file),
+            f"{os.path.basename(os.path.splitext(input_file)[0])}.pdf"
+        )
+
+        # 转换为PDF
+        pdf_file = FileConverter.word_to_pdf(
+            input_path=input_file,
+            output_path=temp_pdf,
+            overwrite=True
+        )
+        return pdf_file, temp_pdf
+
+    @staticmethod
+    def _remove_temp_pdf(temp_pdf: str) -> None:
+        """清理Word转换生成的临时PDF文件"""
+        if temp_pdf and os.path.exists(temp_pdf):
+            try:
+                os.remove(temp_pdf)
+            except Exception as e:
+                print(f"警告：清理临时PDF文件失败: {str(e)}")
@@ -1,8 +1,23 @@
+import os
+import shutil
+import time
+from typing import BinaryIO, Tuple, Union
+import fitz
+from .save_profile import SaveProfile, SaveResult
+
 class StampUtils:
     """
     印章工具类
     提供印章处理过程中需要的通用工具方法
     """
+
+    # 各保存方式对应的MuPDF保存参数；no_new_id保证相同输入得到逐字节相同的输出
+    SAVE_OPTIONS = {
+        SaveProfile.FAST: {"garbage": 1, "deflate": True, "no_new_id": True},
+        SaveProfile.COMPACT: {"garbage": 4, "deflate": True, "no_new_id": True},
+        SaveProfile.INCREMENTAL: {"incremental": True, "deflate": True, "encryption": fitz.PDF_ENCRYPT_KEEP,
+                                  "no_new_id": True},
+    }
     
     @staticmethod
     def mm_to_points(mm: float) -> float:
@@ -25,4 +40,136 @@ class StampUtils:
             >>> StampUtils.mm_to_points(25.4)
             72.0
         """
-        return mm * 72 / 25.4
\ No newline at end of file
+        return mm * 72 / 25.4
+
+    @staticmethod
+    def saved_message(image_bytes_saved: int) -> str:
+        """处理完成提示中印章图像编码节省字节数的部分，未节省时为空"""
+        return f"，图像编码节省{image_bytes_saved}字节" if image_bytes_saved > 0 else ""
+
+    @staticmethod
+    def open_pdf(pdf_file: str, output_file: str, profile: SaveProfile) -> fitz.Document:
+        """
+        按保存方式打开待处理的PDF文档
+
+        增量保存只能写回文档自身的文件，因此先把输入文件复制到输出路径，
+        再打开输出文件进行处理；其他保存方式直接打开输入文件。
+
+        Args:
+            pdf_file (str): 输入PDF文件路径
+            output_file (str): 输出PDF文件路径
+            profile (SaveProfile): 保存方式
+
+        Returns:
+            fitz.Document: 打开的PDF文档对象
+        """
+        if profile != SaveProfile.INCREMENTAL:
+            return fitz.open(pdf_file)
+        if os.path.abspath(pdf_file) != os.path.abspath(output_file):
+            shutil.copyfile(pdf_file, output_file)
+        return fitz.open(output_file)
+
+    @staticmethod
+    def discard_output(pdf_file: str, output_file: str, profile: SaveProfile) -> None:
+        """
+        处理失败时删除open_pdf留下的输出文件
+
+        增量保存在处理前已把输入复制到输出路径，失败后该副本只有部分修改或没有印章，不能留作结果；
+        原地处理（输出路径就是输入文件）时不删除。其他保存方式在处理成功前不会写入输出路径。
+
+        Args:
+            pdf_file (str): 输入PDF文件路径
+            output_file (str): 输出PDF文件路径
+            profile (SaveProfile): 保存方式
+        """
+        if profile != SaveProfile.INCREMENTAL or os.path.abspath(pdf_file) == os.path.abspath(output_file):
+            return
+        for path in (output_file, f"{output_file}.tmp"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    @staticmethod
+    def save_pdf(pdf_doc: fitz.Document, output_file: str, profile: SaveProfile) -> SaveResult:
+        """
+        按保存方式保存PDF文档，并统计写入字节数和耗时
+
+        增量保存要求文档由open_pdf打开；如果文档无法增量保存（例如打开时经过修复），
+        则退回到快速保存。
+
+        Args:
+            pdf_doc (fitz.Document): PDF文档对象
+            output_file (str): 输出PDF文件路径
+            profile (SaveProfile): 保存方式
+
+        Returns:
+            SaveResult: 保存结果
+        """
+        start = time.perf_counter()
+        if profile == SaveProfile.INCREMENTAL:
+            if os.path.abspath(pdf_doc.name) != os.path.abspath(output_file):
+                raise ValueError("增量保存只能写回文档自身的文件")
+            if pdf_doc.can_save_incrementally():
+                size_before = os.path.getsize(output_file)
+                pdf_doc.save(output_file, **StampUtils.SAVE_OPTIONS[profile])
+                return SaveResult(
+                    output_file=output_file,
+                    profile=profile,
+                    bytes_written=os.path.getsize(output_file) - size_before,
+                    elapsed_seconds=time.perf_counter() - start
+                )
+            # 无法增量保存时，先完整写入临时文件再替换原文件
+            profile = SaveProfile.FAST
+            temp_file = f"{output_file}.tmp"
+            pdf_doc.save(temp_file, **StampUtils.SAVE_OPTIONS[profile])
+            os.replace(temp_file, output_file)
+        else:
+            pdf_doc.save(output_file, **StampUtils.SAVE_OPTIONS[profile])
+
+        return SaveResult(
+            output_file=output_file,
+            profile=profile,
+            bytes_written=os.path.getsize(output_file),
+            elapsed_seconds=time.perf_counter() - start
+        )
+
+    @staticmethod
+    def read_data(data: Union[bytes, bytearray, memoryview, BinaryIO]) -> bytes:
+        """
+        读取字节或二进制缓冲区中的全部内容
+
+        Args:
+            data: 字节数据或支持read()的二进制缓冲区
+
+        Returns:
+            bytes: 数据内容
+        """
+        if hasattr(data, 'read'):
+            data = data.read()
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            raise ValueError("数据必须是bytes或二进制缓冲区")
+        return bytes(data)
+
+    @staticmethod
+    def pdf_to_bytes(pdf_doc: fitz.Document, profile: SaveProfile) -> Tuple[bytes, SaveResult]:
+        """
+        按保存方式将PDF文档输出为字节，并统计字节数和耗时
+
+        内存输出没有原文件可供追加，增量保存按快速保存处理。
+
+        Args:
+            pdf_doc (fitz.Document): PDF文档对象
+            profile (SaveProfile): 保存方式
+
+        Returns:
+            tuple: (PDF字节, 保存结果)
+        """
+        if profile == SaveProfile.INCREMENTAL:
+            profile = SaveProfile.FAST
+        start = time.perf_counter()
+        data = pdf_doc.tobytes(**StampUtils.SAVE_OPTIONS[profile])
+        return data, SaveResult(
+            output_file=None,
+            profile=profile,
+            bytes_written=len(data),
+            elapsed_seconds=time.perf_counter() - start
+        )
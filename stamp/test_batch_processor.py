@@ -0,0 +1,35 @@
+import os
+
+import fitz
+
+from stamp.batch_processor import StampJob, process_many
+from stamp.stamp_config import StampConfig
+from stamp.stamp_type import StampType
+
+
+def test_process_pool_isolates_failures(tmp_path, make_pdf, stamp_file):
+    """多进程处理时单个任务失败不影响其他任务，结果与任务顺序一致"""
+    page_counts = [3, 5, 0, 2, 4, 6]
+    jobs = []
+    for index, page_count in enumerate(page_counts):
+        if page_count:
+            input_file = make_pdf(page_count, name=f"input{index}.pdf")
+        else:
+            input_file = str(tmp_path / f"input{index}.pdf")
+            with open(input_file, "wb") as f:
+                f.write(b"not a pdf")
+        jobs.append(StampJob(input_file, stamp_file, str(tmp_path / "out" / f"output{index}.pdf"),
+                             StampType.SEAL if index % 2 else StampType.BOTH))
+
+    result = process_many(jobs, default_config=StampConfig(seal_count=2), max_workers=3)
+
+    assert [job_result.job for job_result in result.results] == jobs
+    assert [job_result.success for job_result in result.results] == [bool(count) for count in page_counts]
+    assert [job_result.page_count for job_result in result.results] == page_counts
+    assert result.succeeded == 5 and result.failed == 1 and result.total_pages == sum(page_counts)
+    assert "处理文件时出错" in result.results[2].error and result.results[2].save_result is None
+    assert not os.path.exists(jobs[2].output_file)
+    for job, page_count in zip(jobs, page_counts):
+        if page_count:
+            with fitz.open(job.output_file) as doc:
+                assert len(doc) == page_count and all(page.get_images() for page in doc)
@@ -0,0 +1,40 @@
+import fitz
+import pytest
+
+from stamp.stamp_config import StampConfig
+from stamp.stamp_processor import StampProcessor
+from stamp.stamp_type import StampType
+
+
+def _count_images(doc: fitz.Document) -> int:
+    """统计文档中的图像对象数量（不含透明度蒙版）"""
+    images = set()
+    smasks = set()
+    for xref in range(1, doc.xref_length()):
+        if doc.xref_get_key(xref, "Subtype") != ("name", "/Image"):
+            continue
+        images.add(xref)
+        smask = doc.xref_get_key(xref, "SMask")
+        if smask[0] == "xref":
+            smasks.add(int(smask[1].split()[0]))
+    return len(images - smasks)
+
+
+@pytest.mark.parametrize("page_count", [1, 5, 60])
+def test_stamp_image_embedded_once(tmp_path, make_pdf, stamp_file, page_count):
+    """无论页数多少，电子章图像只嵌入一次"""
+    input_file = make_pdf(page_count)
+    output_file = str(tmp_path / "output.pdf")
+
+    StampProcessor(StampConfig()).process(
+        input_file=input_file,
+        stamp_file=stamp_file,
+        output_file=output_file,
+        stamp_type=StampType.STAMP
+    )
+
+    with fitz.open(output_file) as doc:
+        assert _count_images(doc) == 1
+        page_xrefs = {image[0] for page in doc for image in page.get_images()}
+        assert len(page_xrefs) == 1
+        assert all(len(page.get_image_info()) == 1 for page in doc)
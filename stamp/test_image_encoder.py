@@ -0,0 +1,138 @@
+import io
+import os
+
+import fitz
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from stamp.image_encoder import ImageEncoding, StampImageEncoder
+from stamp.image_inserter import ImageInserter
+from stamp.seal_renderer import SealRenderer
+from stamp.stamp_config import StampConfig
+from stamp.stamp_processor import StampProcessor
+from stamp.stamp_type import StampType
+from stamp.stamp_utils import StampUtils
+
+
+@pytest.fixture
+def large_stamp_file(tmp_path) -> str:
+    """1200像素见方、带抗锯齿边缘的红色印章"""
+    path = str(tmp_path / "large_stamp.png")
+    img = Image.new('RGBA', (1200, 1200), (220, 0, 0, 0))
+    ImageDraw.Draw(img).ellipse((30, 30, 1170, 1170), outline=(220, 0, 0, 255), width=60)
+    img = img.resize((1199, 1199), Image.Resampling.LANCZOS)
+    img.save(path)
+    return path
+
+
+def _images(path: str) -> list:
+    """输出文件中的图像：(xref, 宽, 过滤器, 蒙版xref)"""
+    with fitz.open(path) as doc:
+        return [(xref, int(doc.xref_get_key(xref, "Width")[1]), doc.xref_get_key(xref, "Filter")[1],
+                 doc.xref_get_key(xref, "SMask")[1])
+                for xref in range(1, doc.xref_length())
+                if doc.xref_get_key(xref, "Subtype") == ("name", "/Image")]
+
+
+def test_target_size_never_upscales():
+    size_pt = (StampUtils.mm_to_points(40), StampUtils.mm_to_points(40))
+    assert StampImageEncoder.target_size((3000, 3000), size_pt, 300) == (472, 472)
+    assert StampImageEncoder.target_size((200, 200), size_pt, 300) is None
+    assert StampImageEncoder.target_size((3000, 3000), size_pt, None) is None
+
+
+def test_single_color_seal_keeps_only_alpha(large_stamp_file):
+    """单色印章量化后颜色部分只有一种颜色，形状保留在透明度蒙版中"""
+    image = Image.open(large_stamp_file).convert('RGBA')
+    png = StampImageEncoder.encode(image, ImageEncoding.PNG)
+    palette = StampImageEncoder.encode(image, ImageEncoding.PALETTE)
+    jpeg = StampImageEncoder.encode(image, ImageEncoding.JPEG)
+
+    assert palette.mask is not None and jpeg.mask is not None
+    assert palette.nbytes < png.nbytes
+    with Image.open(io.BytesIO(palette.stream)) as color:
+        assert len(color.getcolors()) == 1
+    assert jpeg.stream.startswith(b"\xff\xd8")
+
+
+def test_multicolor_seal_is_quantized():
+    image = Image.new('RGBA', (64, 64), (0, 0, 0, 0))
+    pixels = np.zeros((64, 64, 4), dtype=np.uint8)
+    pixels[..., 0] = np.arange(64)[None, :] * 4
+    pixels[..., 2] = np.arange(64)[:, None] * 4
+    pixels[..., 3] = 255
+    image = Image.fromarray(pixels, 'RGBA')
+    assert StampImageEncoder.single_color(pixels) is None
+
+    encoded = StampImageEncoder.encode(image, ImageEncoding.PALETTE)
+    assert encoded.mask is None  # 完全不透明，不需要蒙版
+    with Image.open(io.BytesIO(encoded.stream)) as color:
+        assert len(color.getcolors()) <= StampImageEncoder.PALETTE_COLORS
+
+
+@pytest.mark.parametrize("encoding", [ImageEncoding.PALETTE, ImageEncoding.JPEG])
+@pytest.mark.parametrize("renderer", list(SealRenderer))
+def test_encoded_stamp_is_smaller_and_reported(tmp_path, make_pdf, large_stamp_file, encoding, renderer):
+    """缩小到打印DPI并重新编码后输出变小，节省的字节数记录在保存结果中，渲染结果与原有方式一致"""
+    input_file = make_pdf(12)
+    original_file = str(tmp_path / "original.pdf")
+    encoded_file = str(tmp_path / "encoded.pdf")
+    original = StampProcessor(StampConfig(seal_renderer=renderer)).process(
+        input_file, large_stamp_file, original_file, StampType.BOTH)
+    config = StampConfig(seal_renderer=renderer, stamp_dpi=150, image_encoding=encoding)
+    result = StampProcessor(config).process(input_file, large_stamp_file, encoded_file, StampType.BOTH)
+
+    assert original.image_bytes_saved == 0
+    assert result.image_bytes_saved > 0
+    assert result.bytes_written < original.bytes_written
+    images = _images(encoded_file)
+    # 电子章缩小到150DPI（40mm约236像素），每个图像都带有透明度蒙版
+    assert max(width for _, width, _, _ in images) == 236
+    smasks = {smask for _, _, _, smask in images if smask != "null"}
+    colors = [smask for xref, _, _, smask in images if f"{xref} 0 R" not in smasks]
+    assert colors and "null" not in colors
+    if encoding is ImageEncoding.JPEG:
+        assert "/DCTDecode" in {filter_name for _, _, filter_name, _ in images}
+
+    with fitz.open(original_file) as original_doc, fitz.open(encoded_file) as encoded_doc:
+        for original_page, encoded_page in zip(original_doc, encoded_doc):
+            original_pixels = np.frombuffer(original_page.get_pixmap(dpi=72).samples, np.uint8).astype(int)
+            encoded_pixels = np.frombuffer(encoded_page.get_pixmap(dpi=72).samples, np.uint8).astype(int)
+            assert np.abs(original_pixels - encoded_pixels).mean() < 1
+
+
+def test_image_inserter_uses_config_encoding(tmp_path, make_pdf, large_stamp_file):
+    input_file = make_pdf(1)
+    config = StampConfig(stamp_dpi=150, image_encoding=ImageEncoding.PALETTE)
+    result = ImageInserter.insert_image(input_file, large_stamp_file, str(tmp_path / "out.pdf"), 0,
+                                        size_mm=40, config=config)
+    assert result.image_bytes_saved > 0
+
+
+def test_invalid_encoding_options():
+    with pytest.raises(ValueError):
+        StampConfig(stamp_dpi=0)
+    with pytest.raises(ValueError):
+        StampConfig(image_encoding="jpeg")
+    with pytest.raises(ValueError):
+        StampConfig(jpeg_quality=100)
+
+
+@pytest.mark.parametrize("encoding", [ImageEncoding.PNG, ImageEncoding.PALETTE])
+def test_seal_dpi_never_enlarges_slices(make_pdf, tmp_path, encoding):
+    """高DPI时骑缝章切片不超过原有的默认尺寸，输出不大于默认配置"""
+    large_stamp = str(tmp_path / "large_stamp.png")
+    img = Image.new('RGBA', (3000, 3000), (0, 0, 0, 0))
+    ImageDraw.Draw(img).ellipse((60, 60, 2940, 2940), outline=(220, 0, 0, 255), width=150)
+    img.save(large_stamp)
+    input_file = make_pdf(24)
+
+    default_file = str(tmp_path / "default.pdf")
+    StampProcessor(StampConfig()).process(input_file, large_stamp, default_file, StampType.SEAL)
+    output_file = str(tmp_path / "output.pdf")
+    save_result = StampProcessor(StampConfig(stamp_dpi=300, image_encoding=encoding)).process(
+        input_file, large_stamp, output_file, StampType.SEAL)
+
+    assert save_result.image_bytes_saved >= 0
+    assert os.path.getsize(output_file) <= os.path.getsize(default_file)
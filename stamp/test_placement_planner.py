@@ -0,0 +1,69 @@
+import hashlib
+import json
+
+import fitz
+
+from stamp.placement_planner import FULL_STAMP, PlacementPlanner, page_size_table
+from stamp.stamp_config import StampConfig
+from stamp.stamp_processor import StampProcessor
+from stamp.stamp_type import StampType
+from stamp.stamp_utils import StampUtils
+
+
+def test_stamp_rects_follow_page_size(make_pdf):
+    """电子章贴齐每页右下角，不同尺寸的页面分为不同尺寸类"""
+    config = StampConfig()
+    with fitz.open(make_pdf(4, page_sizes=((595, 842), (842, 595)))) as doc:
+        plan = PlacementPlanner(config).plan(page_size_table(doc), StampType.STAMP)
+        page_rects = [page.rect for page in doc]
+
+    assert plan.size_classes.tolist() == [[595, 842], [842, 595]]
+    assert plan.page_class.tolist() == [0, 1, 0, 1]
+    assert plan.page_index.tolist() == [0, 1, 2, 3]
+    assert (plan.slice_id == FULL_STAMP).all()
+    size = StampUtils.mm_to_points(config.stamp_size_mm)
+    for rect, page_rect in zip(plan.rects, page_rects):
+        x = page_rect.width - StampUtils.mm_to_points(config.margin_right_mm) - size
+        y = page_rect.height - StampUtils.mm_to_points(config.margin_bottom_mm) - size
+        assert rect.tolist() == [x, y, x + size, y + size]
+
+
+def test_seal_groups_share_boundary_page(make_pdf):
+    """骑缝章每组的最后一页同时是下一组的第一页，同一页上骑缝章在电子章之前"""
+    config = StampConfig(pages_per_seal=3, seal_count=2)
+    with fitz.open(make_pdf(6)) as doc:
+        plan = PlacementPlanner(config).plan(page_size_table(doc), StampType.BOTH)
+
+    offsets = plan.page_offsets()
+    # 6页、每组3页：第0-2、2-4、4-5页三组，第2、4页各有两组骑缝章
+    seals_per_page = [int((plan.slice_id[offsets[p]:offsets[p + 1]] != FULL_STAMP).sum()) for p in range(6)]
+    assert seals_per_page == [2, 2, 4, 2, 4, 2]
+    for p in range(6):
+        assert plan.slice_id[offsets[p + 1] - 1] == FULL_STAMP
+    # 前两组页数相同共用切片，最后一组只有2页
+    assert plan.slices.tolist() == [[2, 0], [2, 1], [3, 0], [3, 1], [3, 2]]
+    # 骑缝章切片贴齐页面右边缘
+    seal_rects = plan.rects[plan.slice_id != FULL_STAMP]
+    assert (seal_rects[:, 2] == 595).all()
+
+
+def test_dry_run_returns_json_without_touching_file(make_pdf):
+    """试运行只返回印章位置，不修改输入文件"""
+    input_file = make_pdf(3)
+    with open(input_file, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+
+    plan = StampProcessor(StampConfig()).plan(input_file, StampType.BOTH)
+    data = json.loads(json.dumps(plan.to_dict()))
+
+    assert data["page_count"] == 3
+    assert len(data["placements"]["rect"]) == len(data["placements"]["page_index"])
+    with open(input_file, "rb") as f:
+        assert hashlib.sha256(f.read()).hexdigest() == digest
+
+
+def test_single_page_has_no_seal(make_pdf):
+    with fitz.open(make_pdf(1)) as doc:
+        plan = PlacementPlanner(StampConfig()).plan(page_size_table(doc), StampType.SEAL)
+    assert len(plan.page_index) == 0
+    assert plan.to_dict()["placements"]["rect"] == []
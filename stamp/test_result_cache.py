@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+from stamp.result_cache import StampResultCache
+from stamp.save_profile import SaveProfile
+from stamp.stamp_config import StampConfig
+from stamp.stamp_processor import StampProcessor
+from stamp.stamp_type import StampType
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("save_profile", list(SaveProfile))
+def test_output_is_deterministic(tmp_path, make_pdf, stamp_file, save_profile):
+    """相同输入重复处理得到逐字节相同的输出，缓存结果与重新处理的结果一致"""
+    input_file = make_pdf(5)
+    processor = StampProcessor(StampConfig(save_profile=save_profile))
+    first = str(tmp_path / "first.pdf")
+    second = str(tmp_path / "second.pdf")
+    processor.process(input_file, stamp_file, first, StampType.BOTH)
+    processor.process(input_file, stamp_file, second, StampType.BOTH)
+    assert _read(first) == _read(second)
+
+
+def test_cache_hit_skips_processing(tmp_path, monkeypatch, make_pdf, stamp_file):
+    """命中缓存时不再盖章，直接返回上次的结果"""
+    input_file = make_pdf(5)
+    cache = StampResultCache(str(tmp_path / "cache"))
+    processor = StampProcessor(StampConfig(), result_cache=cache)
+
+    first = processor.process(input_file, stamp_file, str(tmp_path / "first.pdf"), StampType.BOTH)
+    assert not first.from_cache
+
+    def fail(*args, **kwargs):
+        raise AssertionError("命中缓存时不应重新盖章")
+    monkeypatch.setattr(processor, "_stamp_document", fail)
+    second = processor.process(input_file, stamp_file, str(tmp_path / "second.pdf"), StampType.BOTH)
+
+    assert second.from_cache
+    assert _read(str(tmp_path / "first.pdf")) == _read(str(tmp_path / "second.pdf"))
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_key_covers_inputs_config_and_type(tmp_path, make_pdf, stamp_file):
+    """输入内容、配置字段、印章类型或保存方式不同时缓存键不同，文件名不影响缓存键"""
+    input_file = make_pdf(3)
+    other_input = make_pdf(4, name="other.pdf")
+    config = StampConfig()
+    key = StampResultCache.make_key(input_file, stamp_file, config, StampType.BOTH)
+
+    renamed = str(tmp_path / "renamed.pdf")
+    with open(renamed, "wb") as f:
+        f.write(_read(input_file))
+    assert StampResultCache.make_key(renamed, stamp_file, config, StampType.BOTH) == key
+
+    assert StampResultCache.make_key(other_input, stamp_file, config, StampType.BOTH) != key
+    assert StampResultCache.make_key(input_file, stamp_file, StampConfig(seal_count=2), StampType.BOTH) != key
+    assert StampResultCache.make_key(input_file, stamp_file, config, StampType.SEAL) != key
+    assert StampResultCache.make_key(input_file, stamp_file, config, StampType.BOTH, SaveProfile.FAST) != key
+
+
+def test_evicts_least_recently_used(tmp_path, make_pdf, stamp_file):
+    """超出磁盘预算时淘汰最久未使用的结果"""
+    cache_dir = str(tmp_path / "cache")
+    inputs = [make_pdf(count, name=f"input{count}.pdf") for count in (1, 2, 3)]
+    output_file = str(tmp_path / "output.pdf")
+    processor = StampProcessor(StampConfig(), result_cache=StampResultCache(cache_dir))
+    processor.process(inputs[0], stamp_file, output_file, StampType.STAMP)
+    size = os.path.getsize(output_file)
+
+    cache = StampResultCache(cache_dir, max_bytes=size * 2 + size // 2)
+    processor.result_cache = cache
+    keys = [StampResultCache.make_key(path, stamp_file, processor.config, StampType.STAMP) for path in inputs]
+    processor.process(inputs[1], stamp_file, output_file, StampType.STAMP)
+    # 先使用第一个结果，使第二个结果成为最久未使用的
+    os.utime(os.path.join(cache_dir, f"{keys[1]}.pdf"), ns=(0, 0))
+    assert cache.get(keys[0], output_file)
+    processor.process(inputs[2], stamp_file, output_file, StampType.STAMP)
+
+    assert cache.stats()["evictions"] >= 1
+    assert cache.get(keys[2], output_file)
+    assert not cache.get(keys[1], output_file)
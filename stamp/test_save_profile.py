@@ -0,0 +1,79 @@
+import os
+
+import fitz
+import pytest
+
+from stamp.image_inserter import ImageInserter
+from stamp.save_profile import SaveProfile
+from stamp.stamp_config import StampConfig
+from stamp.stamp_processor import StampProcessor
+from stamp.stamp_type import StampType
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _break_xref(path: str) -> None:
+    """破坏交叉引用表的偏移量，打开时需要修复，无法增量保存"""
+    data = _read(path)
+    with open(path, "wb") as f:
+        f.write(data[:data.rindex(b"startxref")] + b"startxref\n999999\n%%EOF\n")
+
+
+@pytest.mark.parametrize("save_profile", list(SaveProfile))
+def test_save_profiles(tmp_path, make_pdf, stamp_file, save_profile):
+    """各保存方式都生成带印章的输出，增量保存只在原文件之后追加修改"""
+    input_file = make_pdf(3)
+    output_file = str(tmp_path / "out" / "output.pdf")
+    result = StampProcessor(StampConfig(save_profile=save_profile)).process(
+        input_file, stamp_file, output_file, StampType.BOTH)
+
+    assert result.profile == save_profile and result.output_file == output_file
+    with fitz.open(output_file) as doc:
+        assert all(page.get_images() for page in doc)
+    if save_profile == SaveProfile.INCREMENTAL:
+        assert _read(output_file).startswith(_read(input_file))
+        assert result.bytes_written == os.path.getsize(output_file) - os.path.getsize(input_file)
+    else:
+        assert result.bytes_written == os.path.getsize(output_file)
+
+
+def test_incremental_falls_back_to_fast(tmp_path, make_pdf, stamp_file):
+    """打开时经过修复的文档无法增量保存，退回到快速保存并替换输出文件"""
+    input_file = make_pdf(2)
+    _break_xref(input_file)
+    output_file = str(tmp_path / "out" / "output.pdf")
+    result = StampProcessor(StampConfig()).process(input_file, stamp_file, output_file, StampType.STAMP,
+                                                   save_profile=SaveProfile.INCREMENTAL)
+
+    assert result.profile == SaveProfile.FAST
+    assert result.bytes_written == os.path.getsize(output_file)
+    assert not os.path.exists(f"{output_file}.tmp")
+    with fitz.open(output_file) as doc:
+        assert not doc.is_repaired and all(page.get_images() for page in doc)
+
+
+def test_failed_incremental_removes_output(tmp_path, make_pdf, stamp_file, monkeypatch):
+    """增量保存处理失败时删除预先复制到输出路径的文件，原地处理时保留输入文件"""
+    input_file = make_pdf(2)
+    original = _read(input_file)
+    output_file = str(tmp_path / "out" / "output.pdf")
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("盖章失败")
+
+    monkeypatch.setattr(StampProcessor, "_stamp_document", fail)
+    processor = StampProcessor(StampConfig(save_profile=SaveProfile.INCREMENTAL))
+    with pytest.raises(Exception, match="盖章失败"):
+        processor.process(input_file, stamp_file, output_file, StampType.BOTH)
+    assert not os.path.exists(output_file)
+
+    with pytest.raises(Exception, match="盖章失败"):
+        processor.process(input_file, stamp_file, input_file, StampType.BOTH)
+    assert _read(input_file) == original
+
+    with pytest.raises(Exception, match="无效的页码"):
+        ImageInserter.insert_image(input_file, stamp_file, output_file, 9, save_profile=SaveProfile.INCREMENTAL)
+    assert not os.path.exists(output_file)
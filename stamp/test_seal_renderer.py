@@ -0,0 +1,74 @@
+import fitz
+import numpy as np
+import pytest
+
+from stamp.seal_renderer import SealRenderer
+from stamp.stamp_config import StampConfig
+from stamp.stamp_processor import StampProcessor
+from stamp.stamp_type import StampType
+
+
+def _stamp(tmp_path, input_file, stamp_file, renderer: SealRenderer, stamp_type=StampType.SEAL) -> str:
+    output_file = str(tmp_path / f"output_{renderer.value}.pdf")
+    config = StampConfig(seal_count=3, pages_per_seal=5, seal_renderer=renderer)
+    StampProcessor(config).process(input_file, stamp_file, output_file, stamp_type)
+    return output_file
+
+
+def _image_count(path: str) -> int:
+    """统计图像对象数量（含透明度蒙版）"""
+    with fitz.open(path) as doc:
+        return sum(1 for xref in range(1, doc.xref_length())
+                   if doc.xref_get_key(xref, "Subtype") == ("name", "/Image"))
+
+
+def test_clip_embeds_seal_once(tmp_path, make_pdf, stamp_file):
+    """CLIP方式只嵌入一次整枚印章（图像及其透明度蒙版），不随页数增加"""
+    input_file = make_pdf(12)
+    crop_file = _stamp(tmp_path, input_file, stamp_file, SealRenderer.CROP)
+    clip_file = _stamp(tmp_path, input_file, stamp_file, SealRenderer.CLIP)
+
+    assert _image_count(clip_file) == 2
+    assert _image_count(crop_file) > 2
+
+
+@pytest.mark.parametrize("stamp_type", [StampType.SEAL, StampType.BOTH])
+def test_clip_matches_crop_rendering(tmp_path, make_pdf, stamp_file, stamp_type):
+    """两种方式渲染结果一致，只有边缘抗锯齿的细微差别"""
+    input_file = make_pdf(12, page_sizes=((595, 842), (842, 595)))
+    crop_file = _stamp(tmp_path, input_file, stamp_file, SealRenderer.CROP, stamp_type)
+    clip_file = _stamp(tmp_path, input_file, stamp_file, SealRenderer.CLIP, stamp_type)
+
+    with fitz.open(crop_file) as crop_doc, fitz.open(clip_file) as clip_doc:
+        for crop_page, clip_page in zip(crop_doc, clip_doc):
+            crop_pixels = np.frombuffer(crop_page.get_pixmap(dpi=72).samples, np.uint8).astype(int)
+            clip_pixels = np.frombuffer(clip_page.get_pixmap(dpi=72).samples, np.uint8).astype(int)
+            assert np.abs(crop_pixels - clip_pixels).mean() < 1
+
+
+def test_seal_renderer_must_be_enum():
+    with pytest.raises(ValueError):
+        StampConfig(seal_renderer="clip")
+
+
+def test_clip_closes_seal_document(tmp_path, make_pdf, stamp_file):
+    """CLIP方式创建的单页印章文档在盖章完成后关闭，处理器重复使用时也不会遗留"""
+    input_file = make_pdf(6)
+    processor = StampProcessor(StampConfig(seal_renderer=SealRenderer.CLIP))
+    seal_docs = []
+    seal_page = processor.seal_stamper._seal_page
+
+    def record_seal_page():
+        doc = seal_page()
+        if doc not in seal_docs:
+            seal_docs.append(doc)
+        return doc
+
+    processor.seal_stamper._seal_page = record_seal_page
+    for index in range(2):
+        processor.process(input_file, stamp_file, str(tmp_path / f"output_{index}.pdf"), StampType.SEAL)
+
+    assert len(seal_docs) == 2
+    assert all(doc.is_closed for doc in seal_docs)
+    assert processor.seal_stamper._seal_doc is None
+    assert _image_count(str(tmp_path / "output_1.pdf")) == 2
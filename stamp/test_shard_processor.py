@@ -0,0 +1,47 @@
+import fitz
+import pytest
+
+from stamp import shard_processor
+from stamp.shard_processor import plan_shards
+from stamp.stamp_config import StampConfig
+from stamp.stamp_processor import StampProcessor
+from stamp.stamp_type import StampType
+
+
+def _image_boxes(doc: fitz.Document) -> list:
+    """返回每页图像的位置列表"""
+    return [[tuple(round(v, 3) for v in info["bbox"]) for info in page.get_image_info()] for page in doc]
+
+
+def _page_drawing(doc: fitz.Document, page: fitz.Page) -> tuple:
+    """返回页面的内容流和按名称引用的图像数据"""
+    images = [(image[7], doc.xref_stream_raw(image[0]), doc.xref_stream_raw(image[1]) if image[1] else b"")
+              for image in page.get_images()]
+    return page.read_contents(), images
+
+
+def test_plan_shards_aligned_to_seal_groups():
+    """分片边界落在骑缝章分组的起始页上，并覆盖全部页面"""
+    shards = plan_shards(total_pages=1000, pages_per_seal=12, shard_count=4)
+    assert shards[0][0] == 0 and shards[-1][1] == 1000
+    assert all(prev[1] == nxt[0] for prev, nxt in zip(shards, shards[1:]))
+    assert all(start % 11 == 0 for start, _ in shards)
+
+
+@pytest.mark.parametrize("stamp_type", list(StampType))
+def test_sharded_layout_matches_serial(tmp_path, monkeypatch, make_pdf, stamp_file, stamp_type):
+    """分片并行处理的版面与整份处理完全一致"""
+    monkeypatch.setattr(shard_processor, "MIN_SHARD_PAGES", 10)
+    input_file = make_pdf(45, page_sizes=((595, 842), (842, 595)))
+    processor = StampProcessor(StampConfig(seal_count=3, pages_per_seal=12))
+
+    serial_file = str(tmp_path / "serial.pdf")
+    sharded_file = str(tmp_path / "sharded.pdf")
+    processor.process(input_file, stamp_file, serial_file, stamp_type)
+    processor.process_sharded(input_file, stamp_file, sharded_file, stamp_type, max_workers=3)
+
+    with fitz.open(serial_file) as serial_doc, fitz.open(sharded_file) as sharded_doc:
+        assert len(serial_doc) == len(sharded_doc)
+        assert _image_boxes(serial_doc) == _image_boxes(sharded_doc)
+        for serial_page, sharded_page in zip(serial_doc, sharded_doc):
+            assert _page_drawing(serial_doc, serial_page) == _page_drawing(sharded_doc, sharded_page)
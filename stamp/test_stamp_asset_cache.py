@@ -0,0 +1,112 @@
+import io
+import threading
+
+from PIL import Image
+
+from stamp.image_encoder import ImageEncoding
+from stamp.stamp_asset_cache import StampAssetCache
+
+
+def _png(color, size=(100, 100)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGBA", size, color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+RED = _png((255, 0, 0, 255))
+BLUE = _png((0, 0, 255, 255))
+GREEN = _png((0, 255, 0, 255))
+
+
+def _counts(cache: StampAssetCache) -> tuple:
+    stats = cache.stats()
+    return stats["hits"], stats["misses"]
+
+
+def test_each_lookup_counted_once():
+    """每次公开查找只计一次命中或未命中"""
+    cache = StampAssetCache()
+    cache.get_png(RED, (50, 50))
+    assert _counts(cache) == (0, 1)
+    cache.get_png(RED, (50, 50))
+    assert _counts(cache) == (1, 1)
+    # 原始尺寸图像在生成缩放版本时已解码
+    cache.get_image(RED)
+    assert _counts(cache) == (2, 1)
+    cache.get_encoded(RED, (50, 50), encoding=ImageEncoding.JPEG)
+    cache.get_encoded(RED, (50, 50), encoding=ImageEncoding.JPEG)
+    assert _counts(cache) == (3, 2)
+    cache.get_embedded_size(RED, (50, 50), encoding=ImageEncoding.PALETTE)
+    cache.get_embedded_size(RED, (50, 50), encoding=ImageEncoding.PALETTE)
+    assert _counts(cache) == (4, 3)
+
+
+def test_size_and_box_keys(tmp_path):
+    """尺寸和裁剪区域不同的请求分别缓存，文件和字节来源按内容共用条目"""
+    cache = StampAssetCache()
+    assert cache.get_image(RED, (40, 20)).size == (40, 20)
+    assert cache.get_image(RED, (20, 40)).size == (20, 40)
+    assert _counts(cache) == (0, 2)
+
+    left = cache.get_png(RED, (40, 20), box=(0, 0, 20, 20))
+    right = cache.get_png(RED, (40, 20), box=(20, 0, 40, 20))
+    whole = cache.get_png(RED, (40, 20))
+    assert _counts(cache) == (0, 5)
+    assert Image.open(io.BytesIO(left)).size == (20, 20)
+    assert Image.open(io.BytesIO(whole)).size == (40, 20)
+    assert left == right != whole
+    assert cache.get_png(RED, (40, 20), box=(0, 0, 20, 20), optimize=True) != left
+
+    path = tmp_path / "stamp.png"
+    path.write_bytes(RED)
+    assert cache.get_image(str(path), (40, 20)) is cache.get_image(RED, (40, 20))
+    # 文件内容修改后重新解码
+    path.write_bytes(_png((0, 0, 255, 255), (120, 100)))
+    assert cache.get_image(str(path)).size == (120, 100)
+
+
+def test_eviction_under_memory_budget():
+    """超出内存预算时淘汰最久未使用的条目"""
+    image_bytes = 100 * 100 * 4
+    cache = StampAssetCache(max_bytes=image_bytes * 2 + 1)
+    red = cache.get_image(RED)
+    cache.get_image(BLUE)
+    assert cache.get_image(RED) is red
+    cache.get_image(GREEN)
+
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["entries"] == 2
+    assert stats["bytes"] <= stats["max_bytes"]
+    assert cache.get_image(RED) is red
+    misses = cache.stats()["misses"]
+    cache.get_image(BLUE)
+    assert cache.stats()["misses"] == misses + 1
+
+    # 编码结果同样计入内存占用，超出预算后淘汰红色印章
+    png = cache.get_png(BLUE)
+    stats = cache.stats()
+    assert stats["entries"] == 1 and stats["bytes"] == image_bytes + len(png)
+
+
+def test_encoding_runs_outside_lock(monkeypatch):
+    """编码PNG期间其他线程可以获取缓存锁"""
+    cache = StampAssetCache()
+    original_save = Image.Image.save
+    lock_free = []
+
+    def probe():
+        acquired = cache._lock.acquire(blocking=False)
+        if acquired:
+            cache._lock.release()
+        lock_free.append(acquired)
+
+    def save(self, *args, **kwargs):
+        thread = threading.Thread(target=probe)
+        thread.start()
+        thread.join()
+        return original_save(self, *args, **kwargs)
+
+    monkeypatch.setattr(Image.Image, "save", save)
+    cache.get_png(RED, (50, 50))
+    cache.get_encoded(RED, (50, 50), encoding=ImageEncoding.JPEG)
+    assert lock_free and all(lock_free)
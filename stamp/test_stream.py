@@ -0,0 +1,104 @@
+import io
+import os
+
+import fitz
+import pytest
+
+from convert.file_converter import FileConverter
+from stamp.image_inserter import ImageInserter
+from stamp.stamp_config import StampConfig
+from stamp.stamp_processor import StampProcessor
+from stamp.stamp_type import StampType
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _image_boxes(pdf) -> list:
+    """每页图像的位置，pdf为PDF字节或文件路径"""
+    with (fitz.open(stream=pdf, filetype="pdf") if isinstance(pdf, bytes) else fitz.open(pdf)) as doc:
+        return [[tuple(round(v, 2) for v in info["bbox"]) for info in page.get_image_info()] for page in doc]
+
+
+@pytest.mark.parametrize("stamp_type", list(StampType))
+def test_process_stream_matches_process(tmp_path, make_pdf, stamp_file, stamp_type):
+    """内存处理的版面与文件处理一致，输入可以是字节或二进制缓冲区"""
+    input_file = make_pdf(4)
+    processor = StampProcessor(StampConfig(pages_per_seal=2))
+    output_file = str(tmp_path / "output.pdf")
+    processor.process(input_file, stamp_file, output_file, stamp_type)
+
+    from_bytes = processor.process_stream(_read(input_file), _read(stamp_file), stamp_type)
+    with open(input_file, "rb") as pdf, open(stamp_file, "rb") as stamp:
+        from_buffer = processor.process_stream(pdf, io.BytesIO(stamp.read()), stamp_type)
+    assert from_bytes.startswith(b"%PDF")
+    assert _image_boxes(from_bytes) == _image_boxes(from_buffer) == _image_boxes(output_file)
+
+
+def test_process_stream_word_input(tmp_path, make_pdf, stamp_file, monkeypatch):
+    """Word输入经word_to_pdf_bytes在临时目录中转换后盖章，临时文件随后删除"""
+    converted = _read(make_pdf(2, name="converted.pdf"))
+    inputs = []
+
+    def word_to_pdf(input_path, output_path=None):
+        inputs.append((input_path, _read(input_path)))
+        output_path = output_path or os.path.splitext(input_path)[0] + ".pdf"
+        with open(output_path, "wb") as f:
+            f.write(converted)
+        return output_path
+
+    monkeypatch.setattr(FileConverter, "word_to_pdf", staticmethod(word_to_pdf))
+    output = StampProcessor(StampConfig()).process_stream(b"word document", _read(stamp_file),
+                                                          StampType.STAMP, filetype=".DOCX")
+
+    assert [(os.path.basename(path), data) for path, data in inputs] == [("document.docx", b"word document")]
+    assert not os.path.exists(os.path.dirname(inputs[0][0]))
+    assert [len(boxes) for boxes in _image_boxes(output)] == [1, 1]
+
+
+def test_process_stream_errors(make_pdf, stamp_file, monkeypatch):
+    processor = StampProcessor(StampConfig())
+    pdf_data = _read(make_pdf(1))
+    stamp_data = _read(stamp_file)
+    with pytest.raises(ValueError):
+        processor.process_stream(pdf_data, stamp_data, StampType.STAMP, filetype="txt")
+    with pytest.raises(ValueError):
+        processor.process_stream(b"", stamp_data, StampType.STAMP)
+    with pytest.raises(ValueError):
+        processor.process_stream(pdf_data, b"", StampType.STAMP)
+    with pytest.raises(ValueError):
+        processor.process_stream(pdf_data, stamp_data, "stamp")
+    with pytest.raises(Exception, match="处理文件时出错"):
+        processor.process_stream(b"not a pdf", stamp_data, StampType.STAMP)
+
+    def fail(input_path, output_path=None):
+        raise RuntimeError("转换失败")
+
+    monkeypatch.setattr(FileConverter, "word_to_pdf", staticmethod(fail))
+    with pytest.raises(RuntimeError, match="转换失败"):
+        processor.process_stream(b"word document", stamp_data, StampType.STAMP, filetype="doc")
+
+
+def test_insert_image_stream_matches_insert_image(tmp_path, make_pdf, stamp_file):
+    input_file = make_pdf(3)
+    output_file = str(tmp_path / "output.pdf")
+    ImageInserter.insert_image(input_file, stamp_file, output_file, 1, size_mm=30,
+                               margin_right_mm=20, margin_bottom_mm=20)
+    with open(stamp_file, "rb") as stamp:
+        output = ImageInserter.insert_image_stream(_read(input_file), stamp, 1, size_mm=30,
+                                                   margin_right_mm=20, margin_bottom_mm=20)
+    assert _image_boxes(output) == _image_boxes(output_file)
+    assert [len(boxes) for boxes in _image_boxes(output)] == [0, 1, 0]
+
+
+def test_insert_image_stream_errors(make_pdf, stamp_file):
+    pdf_data = _read(make_pdf(1))
+    stamp_data = _read(stamp_file)
+    with pytest.raises(ValueError):
+        ImageInserter.insert_image_stream(pdf_data, stamp_data, 0, position=(10, 10), margin_right_mm=10)
+    with pytest.raises(Exception, match="无效的页码"):
+        ImageInserter.insert_image_stream(pdf_data, stamp_data, 5)
+    with pytest.raises(ValueError):
+        ImageInserter.insert_image_stream("not bytes", stamp_data, 0)